@@ -1,13 +1,28 @@
+import json
+from datetime import date, timedelta
+from typing import Optional
+
+import click
 from dotenv import load_dotenv
-from flask import Flask, jsonify, make_response, Response, request
+from flask import Flask, jsonify, make_response, Response, request, stream_with_context
+from flask.cli import AppGroup
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 
 from config import ProductionConfig
 
 from stockapp.db import db
-from stockapp.models.stock_model import Stocks
-from stockapp.models.portfolio_model import PortfolioModel
+from stockapp.models.stock_model import Stocks, fill_to_dict
+from stockapp.models import portfolio_model, stock_model, trade_model
+from stockapp.models.account_model import Accounts
+from stockapp.models.portfolio_model import HOLDING_FIELDS, PRICED_FIELDS, BatchRejected, ConcurrentUpdateError, portfolios
+from stockapp.models.trade_model import Trades
 from stockapp.models.user_model import Users
+from stockapp.providers import registry
+from stockapp.utils import cache, call_budget, conditional, http_client, order_queue, price_refresher, price_stream, single_flight, symbol_index
+from stockapp.utils.analytics import MAX_SERIES_POINTS
+from stockapp.utils.call_budget import BudgetExceeded, Priority, upstream_context
+from stockapp.utils.conditional import conditional_json, make_etag
+from stockapp.utils.order_queue import QueueFull
 from stockapp.utils.logger import configure_logger
 
 
@@ -20,6 +35,14 @@ def create_app(config_class=ProductionConfig):
     app.config.from_object(config_class)
 
     db.init_app(app)  # Initialize db with app
+    registry.init_app(app)  # Select the market-data provider
+    cache.init_app(app)  # Size the shared quote cache
+    conditional.init_app(app)  # Salt entity tags alike on every worker
+    http_client.init_app(app)  # Pool and timeout settings for upstream calls
+    single_flight.init_app(app)  # Window for re-raising failed upstream fetches
+    call_budget.init_app(app)  # Upstream plan limits
+    price_stream.init_app(app)  # Poll interval and per-client buffering of the price stream
+    symbol_index.init_app(app)  # Listed symbols for search and upfront validation
     with app.app_context():
         db.create_all()  # Recreate all tables
 
@@ -38,7 +61,35 @@ def create_app(config_class=ProductionConfig):
             "message": "Authentication required"
         }), 401)
 
-    portfolio_model = PortfolioModel()
+    stock_model.init_app(app)  # Oldest quote an order may be filled at
+    portfolio_model.init_app(app)  # Bound the per-worker cache of user portfolios
+    price_refresher.init_app(app, held_symbols=portfolios.held_symbols)
+    order_queue.init_app(app)  # Worker pool for orders submitted with "async"
+
+    ####################################################
+    #
+    # Ledger Commands
+    #
+    ####################################################
+
+    ledger_cli = AppGroup("ledger", help="Maintain the trade ledger and the portfolios projected from it.")
+    app.cli.add_command(ledger_cli)
+
+    @ledger_cli.command("snapshot")
+    def snapshot_ledger() -> None:
+        """Snapshot every account with new ledger entries; run periodically to keep rebuilds short."""
+        count = trade_model.take_snapshots()
+        click.echo(f"Stored {count} ledger snapshots")
+
+    @ledger_cli.command("rebuild")
+    @click.option("--user-id", type=int, help="Rebuild one user's portfolio instead of every portfolio.")
+    def rebuild_ledger(user_id) -> None:
+        """Rewrite positions and cash balances by replaying the ledger from the latest snapshots."""
+        owners = [user_id] if user_id is not None else Trades.owners()
+        for owner in owners:
+            trade_model.rebuild_projections(owner)
+        portfolios.clear()
+        click.echo(f"Rebuilt {len(owners)} portfolios from the ledger")
 
     ####################################################
     #
@@ -223,19 +274,26 @@ def create_app(config_class=ProductionConfig):
 
     @app.route('/api/reset-users', methods=['DELETE'])
     def reset_users() -> Response:
-        """Recreate the users table to delete all users.
+        """Delete all users, together with their accounts, positions and ledgers.
 
         Returns:
-            JSON response indicating the success of recreating the Users table.
+            JSON response indicating the success of deleting the users.
 
         Raises:
-            500 error if there is an issue recreating the Users table.
+            500 error if there is an issue deleting the users.
         """
         try:
             app.logger.info("Received request to recreate Users table")
             with app.app_context():
-                Users.__table__.drop(db.engine)
-                Users.__table__.create(db.engine)
+                # Portfolios belong to the deleted users and must not pass to reused ids.
+                # Rows referencing users.id go first, and the users are deleted rather than
+                # the table dropped, since the other tables' foreign keys depend on it.
+                Stocks.query.filter(Stocks.user_id.isnot(None)).delete()
+                trade_model.purge_users()
+                Accounts.query.delete()
+                Users.query.delete()
+                db.session.commit()
+            portfolios.clear()
             app.logger.info("Users table recreated successfully")
             return make_response(jsonify({
                 "status": "success",
@@ -269,8 +327,11 @@ def create_app(config_class=ProductionConfig):
         try:
             app.logger.info("Received request to recreate Stocks table")
             with app.app_context():
+                # Record the removals so the ledger still accounts for every share
+                trade_model.close_positions()
                 Stocks.__table__.drop(db.engine)
                 Stocks.__table__.create(db.engine)
+            portfolios.clear()
             app.logger.info("Stocks table recreated successfully")
             return make_response(jsonify({
                 "status": "success",
@@ -293,23 +354,39 @@ def create_app(config_class=ProductionConfig):
         Path Parameter:
             - symbol (str): The stock symbol to look up.
 
+        Request Headers:
+            - If-None-Match (str, optional): ETag of a previous response.
+
         Returns:
-            JSON response containing the stock details if found.
+            JSON response containing the stock details if found, tagged with an ETag
+            once the quote, overview and daily bars are cached, or 304 if unchanged.
 
         Raises:
             400 error if the stock is not found.
+            429 error if the upstream call budget cannot price the request in time.
             500 error if there is an issue retrieving the stock information.
         """
         try:
             app.logger.info(f"Received request to look up stock with symbol '{symbol}'")
 
-            stock_info = Stocks.look_up_stock(symbol)
+            # Taken before the lookup, so a quote refreshed meanwhile can only make the tag older than the body
+            state = Stocks.lookup_state(symbol)
 
-            app.logger.info(f"Successfully retrieved stock info for {symbol}")
-            return make_response(jsonify({
-                "status": "success",
-                "stock": stock_info
-            }), 200)
+            def render() -> dict:
+                with upstream_context(Priority.LOOKUP, current_user.username):
+                    stock_info = Stocks.look_up_stock(symbol)
+                app.logger.info(f"Successfully retrieved stock info for {symbol}")
+                return {
+                    "status": "success",
+                    "stock": stock_info
+                }
+
+            # On a cold cache the body is tagged from the quote and overview it was rendered from
+            return conditional_json(
+                make_etag("lookup", *state) if state else None,
+                render,
+                tag_rendered=lambda body: make_etag("lookup", *Stocks.rendered_lookup_state(body["stock"])),
+            )
 
         except ValueError as e:
             app.logger.warning(f"Stock lookup failed for {symbol}: {e}")
@@ -317,6 +394,12 @@ def create_app(config_class=ProductionConfig):
                 "status": "error",
                 "message": str(e)
             }), 400)
+        except BudgetExceeded as e:
+            app.logger.warning(f"Stock lookup for {symbol} shed: {e}")
+            return make_response(jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 429, {"Retry-After": str(int(e.retry_after) + 1)})
         except Exception as e:
             app.logger.error(f"Error looking up stock {symbol}: {e}")
             return make_response(jsonify({
@@ -325,6 +408,173 @@ def create_app(config_class=ProductionConfig):
                 "details": str(e)
             }), 500)
 
+    @app.route('/api/stock-analytics/<string:symbol>', methods=['GET'])
+    @login_required
+    def stock_analytics(symbol: str) -> Response:
+        """Route to get return, volatility, moving average and drawdown statistics.
+
+        Path Parameter:
+            - symbol (str): The stock symbol to analyse.
+
+        Query Parameters:
+            - points (int, optional): Days of per-day series to include, defaults to 30.
+
+        Returns:
+            JSON response containing the statistics and the recent per-day series.
+
+        Raises:
+            400 error if the symbol is unknown or points is invalid.
+            429 error if the upstream call budget cannot fetch the history in time.
+            500 error if there is an issue computing the statistics.
+        """
+        try:
+            points = request.args.get("points", 30, type=int)
+            if points is None or not 0 <= points <= MAX_SERIES_POINTS:
+                return make_response(jsonify({
+                    "status": "error",
+                    "message": f"points must be between 0 and {MAX_SERIES_POINTS}"
+                }), 400)
+
+            with upstream_context(Priority.LOOKUP, current_user.username):
+                analytics = Stocks.get_analytics(symbol)
+
+            series = {name: values[len(values) - points:] if points else [] for name, values in analytics["series"].items()}
+            return make_response(jsonify({
+                "status": "success",
+                "analytics": dict(analytics, series=series)
+            }), 200)
+
+        except ValueError as e:
+            app.logger.warning(f"Stock analytics failed for {symbol}: {e}")
+            return make_response(jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 400)
+        except BudgetExceeded as e:
+            app.logger.warning(f"Stock analytics for {symbol} shed: {e}")
+            return make_response(jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 429, {"Retry-After": str(int(e.retry_after) + 1)})
+        except Exception as e:
+            app.logger.error(f"Error computing analytics for {symbol}: {e}")
+            return make_response(jsonify({
+                "status": "error",
+                "message": "An internal error occurred while computing stock analytics",
+                "details": str(e)
+            }), 500)
+
+    @app.route('/api/search-symbols', methods=['GET'])
+    @login_required
+    def search_symbols() -> Response:
+        """Route to autocomplete stock symbols and company names.
+
+        Searches the in-memory symbol listing, so no upstream call is made.
+
+        Query Parameters:
+            - q (str): Prefix of a symbol or company name.
+            - limit (int, optional): Maximum number of results, defaults to 10.
+
+        Returns:
+            JSON response containing the matching listings, symbol matches first.
+
+        Raises:
+            400 error if the query is missing or the limit is invalid.
+            503 error if the symbol listing has not been loaded yet.
+            500 error if there is an issue searching the listing.
+        """
+        try:
+            query = request.args.get("q", "").strip()
+            if not query:
+                return make_response(jsonify({
+                    "status": "error",
+                    "message": "Query parameter 'q' is required"
+                }), 400)
+
+            max_results = app.config.get("SYMBOL_SEARCH_MAX_RESULTS", 50)
+            limit = request.args.get("limit", 10, type=int)
+            if limit is None or not 0 < limit <= max_results:
+                return make_response(jsonify({
+                    "status": "error",
+                    "message": f"limit must be between 1 and {max_results}"
+                }), 400)
+
+            if not symbol_index.symbol_index.loaded:
+                return make_response(jsonify({
+                    "status": "error",
+                    "message": "The symbol listing is still loading, try again shortly"
+                }), 503, {"Retry-After": "30"})
+
+            return make_response(jsonify({
+                "status": "success",
+                "results": symbol_index.symbol_index.search(query, limit=limit)
+            }), 200)
+
+        except Exception as e:
+            app.logger.error(f"Error searching symbols for '{request.args.get('q')}': {e}")
+            return make_response(jsonify({
+                "status": "error",
+                "message": "An internal error occurred while searching symbols",
+                "details": str(e)
+            }), 500)
+
+    @app.route('/api/quotes', methods=['GET'])
+    @login_required
+    def get_quotes() -> Response:
+        """Route to get current quotes for several symbols in one request.
+
+        Cached quotes are served directly and the rest are fetched concurrently, so a
+        watchlist costs one request instead of one lookup per symbol.
+
+        Query Parameters:
+            - symbols (str): Comma-separated stock symbols, at most QUOTES_MAX_SYMBOLS.
+
+        Returns:
+            JSON response mapping each symbol to its quote, and listing the symbols
+            that could not be priced.
+
+        Raises:
+            400 error if no symbols or too many symbols are given.
+            500 error if there is an issue retrieving the quotes.
+        """
+        try:
+            symbols = []
+            for symbol in request.args.get("symbols", "").split(","):
+                symbol = symbol.strip().upper()
+                if symbol and symbol not in symbols:
+                    symbols.append(symbol)
+
+            if not symbols:
+                return make_response(jsonify({
+                    "status": "error",
+                    "message": "At least one symbol is required"
+                }), 400)
+
+            max_symbols = app.config.get("QUOTES_MAX_SYMBOLS", 50)
+            if len(symbols) > max_symbols:
+                return make_response(jsonify({
+                    "status": "error",
+                    "message": f"At most {max_symbols} symbols can be quoted per request"
+                }), 400)
+
+            app.logger.info(f"Received request for {len(symbols)} quotes")
+            with upstream_context(Priority.LOOKUP, current_user.username):
+                quotes = Stocks.get_stock_prices(symbols)
+
+            return make_response(jsonify({
+                "status": "success",
+                "quotes": quotes,
+                "missing": [symbol for symbol in symbols if symbol not in quotes]
+            }), 200)
+
+        except Exception as e:
+            app.logger.error(f"Error getting quotes: {e}")
+            return make_response(jsonify({
+                "status": "error",
+                "message": "An internal error occurred while getting quotes",
+                "details": str(e)
+            }), 500)
+
     ############################################################
     #
     # Portfolio
@@ -344,6 +594,7 @@ def create_app(config_class=ProductionConfig):
 
         Raises:
             400 error if the amount is invalid.
+            409 error if the account kept changing concurrently through every retry.
             500 error if there is an issue processing the deposit.
         """
         try:
@@ -356,11 +607,15 @@ def create_app(config_class=ProductionConfig):
                     "message": "Amount must be a positive number"
                 }), 400)
 
-            portfolio_model.deposit_cash(float(amount))
+            def deposit(portfolio):
+                portfolio.deposit_cash(float(amount))
+                return portfolio.cash_balance
+
+            new_balance = portfolios.update(current_user.id, deposit)
             return make_response(jsonify({
                 "status": "success",
                 "message": f"Successfully deposited ${amount:.2f}",
-                "new_balance": portfolio_model.cash_balance
+                "new_balance": new_balance
             }), 200)
 
         except ValueError as e:
@@ -368,6 +623,12 @@ def create_app(config_class=ProductionConfig):
                 "status": "error",
                 "message": str(e)
             }), 400)
+        except ConcurrentUpdateError as e:
+            app.logger.warning(f"Deposit conflicted: {e}")
+            return make_response(jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 409)
         except Exception as e:
             app.logger.error(f"Error depositing cash: {e}")
             return make_response(jsonify({
@@ -389,6 +650,7 @@ def create_app(config_class=ProductionConfig):
 
         Raises:
             400 error if the amount is invalid or exceeds balance.
+            409 error if the account kept changing concurrently through every retry.
             500 error if there is an issue processing the withdrawal.
         """
         try:
@@ -401,11 +663,15 @@ def create_app(config_class=ProductionConfig):
                     "message": "Amount must be a positive number"
                 }), 400)
 
-            portfolio_model.withdraw_cash(float(amount))
+            def withdraw(portfolio):
+                portfolio.withdraw_cash(float(amount))
+                return portfolio.cash_balance
+
+            new_balance = portfolios.update(current_user.id, withdraw)
             return make_response(jsonify({
                 "status": "success",
                 "message": f"Successfully withdrew ${amount:.2f}",
-                "new_balance": portfolio_model.cash_balance
+                "new_balance": new_balance
             }), 200)
 
         except ValueError as e:
@@ -413,6 +679,12 @@ def create_app(config_class=ProductionConfig):
                 "status": "error",
                 "message": str(e)
             }), 400)
+        except ConcurrentUpdateError as e:
+            app.logger.warning(f"Withdrawal conflicted: {e}")
+            return make_response(jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 409)
         except Exception as e:
             app.logger.error(f"Error withdrawing cash: {e}")
             return make_response(jsonify({
@@ -421,6 +693,34 @@ def create_app(config_class=ProductionConfig):
                 "details": str(e)
             }), 500)
 
+    def queue_order(action: str, symbol: str, shares: int, ordered: bool) -> Response:
+        """Submits a validated buy or sell to the order queue and answers 202 with its status URL.
+
+        Raises:
+            ValueError: If the symbol is not valid.
+        """
+        if not order_queue.order_queue.running:
+            return make_response(jsonify({
+                "status": "error",
+                "message": "Orders are not being accepted for background execution"
+            }), 503)
+
+        try:
+            order = order_queue.order_queue.submit(
+                current_user.id, current_user.username, action, symbol_index.symbol_index.validate(symbol), shares, bool(ordered)
+            )
+        except QueueFull as e:
+            app.logger.warning(f"Order from {current_user.username} shed: {e}")
+            return make_response(jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 503, {"Retry-After": "5"})
+
+        return make_response(jsonify({
+            "status": "accepted",
+            "order": order.to_dict()
+        }), 202, {"Location": f"/api/orders/{order.order_id}"})
+
     @app.route('/api/buy-stock', methods=['POST'])
     @login_required
     def buy_stock() -> Response:
@@ -429,13 +729,18 @@ def create_app(config_class=ProductionConfig):
         Expected JSON Input:
             - symbol (str): The stock symbol to buy.
             - shares (int): The number of shares to buy.
+            - async (bool, optional): Queue the order and answer 202 at once instead of executing it.
+            - ordered (bool, optional): With async, run after this account's earlier queued orders. Defaults to true.
 
         Returns:
-            JSON response indicating the success of the purchase.
+            JSON response indicating the success of the purchase, or 202 with the queued order.
 
         Raises:
             400 error if the input is invalid or insufficient funds.
+            429 error if the upstream call budget cannot price the request in time.
+            409 error if the account kept changing concurrently through every retry.
             500 error if there is an issue processing the purchase.
+            503 error if async orders are not being accepted.
         """
         try:
             data = request.get_json()
@@ -454,35 +759,24 @@ def create_app(config_class=ProductionConfig):
                     "message": "Shares must be a positive number"
                 }), 400)
 
-            # Get current price
-            stock_info = Stocks.get_stock_price(symbol)
-            total_cost = stock_info["price"] * shares
+            if data.get("async"):
+                return queue_order("buy", symbol, shares, data.get("ordered", True))
 
-            # Check if user has enough cash
-            if total_cost > portfolio_model.cash_balance:
-                return make_response(jsonify({
-                    "status": "error",
-                    "message": "Insufficient funds for this purchase"
-                }), 400)
+            # Price the order once; the same quote checks cash and fills the order
+            with upstream_context(Priority.TRADE, current_user.username):
+                quote = Stocks.get_stock_price(symbol, max_age=Stocks.order_quote_max_age_seconds)
 
-            # Process the purchase
-            Stocks.buy_stock(symbol, shares)
-            portfolio_model.withdraw_cash(total_cost)
-
-            # Update holdings in portfolio model
-            if symbol in portfolio_model.holdings:
-                portfolio_model.holdings[symbol]["shares"] += shares
-            else:
-                portfolio_model.holdings[symbol] = {
-                    "shares": shares,
-                    "buy_price": stock_info["price"]
-                }
+            # Process the purchase; raises ValueError if cash does not cover it
+            fill, remaining_balance = portfolios.update(
+                current_user.id, lambda portfolio: (portfolio.buy_stock(symbol, shares, quote), portfolio.cash_balance)
+            )
+            fill = fill_to_dict(fill)
 
             return make_response(jsonify({
                 "status": "success",
-                "message": f"Successfully bought {shares} shares of {symbol} at ${stock_info['price']:.2f} per share",
-                "total_cost": total_cost,
-                "remaining_balance": portfolio_model.cash_balance
+                "message": f"Successfully bought {shares} shares of {fill['symbol']} at ${fill['price']:.2f} per share",
+                "total_cost": fill["total"],
+                "remaining_balance": remaining_balance
             }), 200)
 
         except ValueError as e:
@@ -490,6 +784,18 @@ def create_app(config_class=ProductionConfig):
                 "status": "error",
                 "message": str(e)
             }), 400)
+        except BudgetExceeded as e:
+            app.logger.warning(f"Stock purchase shed: {e}")
+            return make_response(jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 429, {"Retry-After": str(int(e.retry_after) + 1)})
+        except ConcurrentUpdateError as e:
+            app.logger.warning(f"Stock purchase conflicted: {e}")
+            return make_response(jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 409)
         except Exception as e:
             app.logger.error(f"Error buying stock: {e}")
             return make_response(jsonify({
@@ -506,13 +812,18 @@ def create_app(config_class=ProductionConfig):
         Expected JSON Input:
             - symbol (str): The stock symbol to sell.
             - shares (int): The number of shares to sell.
+            - async (bool, optional): Queue the order and answer 202 at once instead of executing it.
+            - ordered (bool, optional): With async, run after this account's earlier queued orders. Defaults to true.
 
         Returns:
-            JSON response indicating the success of the sale.
+            JSON response indicating the success of the sale, or 202 with the queued order.
 
         Raises:
             400 error if the input is invalid or insufficient shares.
+            429 error if the upstream call budget cannot price the request in time.
+            409 error if the account kept changing concurrently through every retry.
             500 error if there is an issue processing the sale.
+            503 error if async orders are not being accepted.
         """
         try:
             data = request.get_json()
@@ -531,31 +842,31 @@ def create_app(config_class=ProductionConfig):
                     "message": "Shares must be a positive number"
                 }), 400)
 
-            # Check if user owns enough shares
-            if symbol not in portfolio_model.holdings or portfolio_model.holdings[symbol]["shares"] < shares:
+            # Queued sells are checked against the shares held once the orders ahead of them ran
+            if data.get("async"):
+                return queue_order("sell", symbol, shares, data.get("ordered", True))
+
+            # Check if user owns enough shares before spending an upstream call
+            holding = portfolios.refresh(current_user.id).holdings.get(symbol.upper())
+            if holding is None or holding["shares"] < shares:
                 return make_response(jsonify({
                     "status": "error",
                     "message": f"You don't own enough shares of {symbol} to sell"
                 }), 400)
 
-            # Get current price
-            stock_info = Stocks.get_stock_price(symbol)
-            total_proceeds = stock_info["price"] * shares
-
-            # Process the sale
-            Stocks.sell_stock(symbol, shares)
-            portfolio_model.deposit_cash(total_proceeds)
-
-            # Update holdings in portfolio model
-            portfolio_model.holdings[symbol]["shares"] -= shares
-            if portfolio_model.holdings[symbol]["shares"] == 0:
-                del portfolio_model.holdings[symbol]
+            # Price the order once and fill the sale at that quote
+            with upstream_context(Priority.TRADE, current_user.username):
+                quote = Stocks.get_stock_price(symbol, max_age=Stocks.order_quote_max_age_seconds)
+            fill, new_balance = portfolios.update(
+                current_user.id, lambda portfolio: (portfolio.sell_stock(symbol, shares, quote), portfolio.cash_balance)
+            )
+            fill = fill_to_dict(fill)
 
             return make_response(jsonify({
                 "status": "success",
-                "message": f"Successfully sold {shares} shares of {symbol} at ${stock_info['price']:.2f} per share",
-                "total_proceeds": total_proceeds,
-                "new_balance": portfolio_model.cash_balance
+                "message": f"Successfully sold {shares} shares of {fill['symbol']} at ${fill['price']:.2f} per share",
+                "total_proceeds": fill["total"],
+                "new_balance": new_balance
             }), 200)
 
         except ValueError as e:
@@ -563,6 +874,18 @@ def create_app(config_class=ProductionConfig):
                 "status": "error",
                 "message": str(e)
             }), 400)
+        except BudgetExceeded as e:
+            app.logger.warning(f"Stock sale shed: {e}")
+            return make_response(jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 429, {"Retry-After": str(int(e.retry_after) + 1)})
+        except ConcurrentUpdateError as e:
+            app.logger.warning(f"Stock sale conflicted: {e}")
+            return make_response(jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 409)
         except Exception as e:
             app.logger.error(f"Error selling stock: {e}")
             return make_response(jsonify({
@@ -571,33 +894,416 @@ def create_app(config_class=ProductionConfig):
                 "details": str(e)
             }), 500)
 
+    @app.route('/api/orders', methods=['POST'])
+    @login_required
+    def place_orders() -> Response:
+        """Route to buy and sell several stocks in one all-or-nothing batch.
+
+        Every distinct symbol is priced in one concurrent pass. Orders are checked in
+        the order given against the cash and shares left by the orders before them,
+        so sells placed first can fund later buys, and are committed in one transaction.
+
+        Expected JSON Input:
+            - orders (list): At most BATCH_ORDERS_MAX orders, each with:
+                - action (str): "buy" or "sell".
+                - symbol (str): The stock symbol.
+                - shares (int): The number of shares.
+
+        Returns:
+            JSON response with one result per order and the remaining cash balance.
+
+        Raises:
+            400 error if the input is invalid or any order is rejected; then no order is executed.
+            429 error if the upstream call budget cannot price the batch in time.
+            409 error if the account kept changing concurrently through every retry.
+            500 error if there is an issue processing the orders.
+        """
+        try:
+            data = request.get_json(silent=True) or {}
+            orders = data.get("orders")
+            max_orders = app.config.get("BATCH_ORDERS_MAX", 100)
+
+            if not isinstance(orders, list) or not orders:
+                return make_response(jsonify({
+                    "status": "error",
+                    "message": "orders must be a non-empty list"
+                }), 400)
+
+            if len(orders) > max_orders:
+                return make_response(jsonify({
+                    "status": "error",
+                    "message": f"At most {max_orders} orders can be placed per request"
+                }), 400)
+
+            for index, order in enumerate(orders):
+                if (
+                    not isinstance(order, dict)
+                    or order.get("action") not in ("buy", "sell")
+                    or not isinstance(order.get("symbol"), str) or not order["symbol"].strip()
+                    or not isinstance(order.get("shares"), int) or isinstance(order["shares"], bool)
+                    or order["shares"] <= 0
+                ):
+                    return make_response(jsonify({
+                        "status": "error",
+                        "message": f"Order {index} needs an action of buy or sell, a symbol and a positive whole number of shares"
+                    }), 400)
+
+            orders = [dict(order, symbol=order["symbol"].strip().upper()) for order in orders]
+            app.logger.info(f"Received a batch of {len(orders)} orders from {current_user.username}")
+
+            # One concurrent pass prices every distinct symbol in the batch
+            with upstream_context(Priority.TRADE, current_user.username):
+                quotes = Stocks.get_stock_prices({order["symbol"] for order in orders}, max_age=Stocks.order_quote_max_age_seconds)
+
+            results, remaining_balance = portfolios.update(
+                current_user.id, lambda portfolio: (portfolio.execute_orders(orders, quotes), portfolio.cash_balance)
+            )
+
+            return make_response(jsonify({
+                "status": "success",
+                "results": results,
+                "remaining_balance": remaining_balance
+            }), 200)
+
+        except BatchRejected as e:
+            return make_response(jsonify({
+                "status": "error",
+                "message": str(e),
+                "results": e.results
+            }), 400)
+        except ValueError as e:
+            return make_response(jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 400)
+        except BudgetExceeded as e:
+            app.logger.warning(f"Order batch shed: {e}")
+            return make_response(jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 429, {"Retry-After": str(int(e.retry_after) + 1)})
+        except ConcurrentUpdateError as e:
+            app.logger.warning(f"Order batch conflicted: {e}")
+            return make_response(jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 409)
+        except Exception as e:
+            app.logger.error(f"Error placing orders: {e}")
+            return make_response(jsonify({
+                "status": "error",
+                "message": "An internal error occurred while processing orders",
+                "details": str(e)
+            }), 500)
+
+    @app.route('/api/orders/<string:order_id>', methods=['GET'])
+    @login_required
+    def get_order(order_id: str) -> Response:
+        """Route to poll an order submitted with async.
+
+        Path Parameter:
+            - order_id (str): The order_id from the 202 response.
+
+        Returns:
+            JSON response containing the order, its status and, once filled, the fill.
+
+        Raises:
+            404 error if the order is unknown, finished over ORDER_QUEUE_KEEP_SECONDS ago or not the user's.
+            500 error if there is an issue retrieving the order.
+        """
+        try:
+            order = order_queue.order_queue.get(order_id, current_user.id)
+            if order is None:
+                return make_response(jsonify({
+                    "status": "error",
+                    "message": f"No order {order_id}"
+                }), 404)
+
+            return make_response(jsonify({
+                "status": "success",
+                "order": order.to_dict()
+            }), 200)
+
+        except Exception as e:
+            app.logger.error(f"Error retrieving order {order_id}: {e}")
+            return make_response(jsonify({
+                "status": "error",
+                "message": "An internal error occurred while retrieving the order",
+                "details": str(e)
+            }), 500)
+
     @app.route('/api/view-portfolio', methods=['GET'])
     @login_required
     def view_portfolio() -> Response:
         """Route to view the current portfolio holdings and value.
 
+        Holdings are ordered by the prices already known, and only the returned page
+        is priced and serialized.
+
+        Query Parameters:
+            - limit (int, optional): Holdings per page, at most PORTFOLIO_MAX_PAGE_SIZE. Defaults to all holdings.
+            - cursor (str, optional): The previous page's next_cursor.
+            - sort (str, optional): symbol (default), value or percent_change; prefix with - for descending.
+            - fields (str, optional): Comma-separated holding fields to return, defaults to all.
+
+        Request Headers:
+            - If-None-Match (str, optional): ETag of a previous response.
+
         Returns:
-            JSON response containing the portfolio details and valuation.
+            JSON response containing the page of holdings, the cursor of the next page and the valuation,
+            tagged with an ETag, or 304 if neither the portfolio nor its prices changed since that tag.
+
+        Raises:
+            400 error if a parameter or the cursor is invalid.
+            500 error if there is an issue retrieving the portfolio.
         """
         try:
-            portfolio_summary = portfolio_model.view_portfolio()
-            portfolio_value = portfolio_model.calculate_portfolio_value()
+            max_page_size = app.config.get("PORTFOLIO_MAX_PAGE_SIZE", 500)
+            try:
+                limit = int(request.args["limit"]) if "limit" in request.args else None
+            except ValueError:
+                return make_response(jsonify({
+                    "status": "error",
+                    "message": "limit must be an integer"
+                }), 400)
+
+            if limit is not None and not 1 <= limit <= max_page_size:
+                return make_response(jsonify({
+                    "status": "error",
+                    "message": f"limit must be between 1 and {max_page_size}"
+                }), 400)
+
+            sort = request.args.get("sort", "symbol")
+            descending = sort.startswith("-")
+            sort = sort[1:] if descending else sort
+            fields = [field.strip() for field in request.args.get("fields", ",".join(HOLDING_FIELDS)).split(",")]
+            unknown = [field for field in fields if field not in HOLDING_FIELDS]
+            if unknown:
+                return make_response(jsonify({
+                    "status": "error",
+                    "message": f"Unknown fields: {', '.join(unknown)}. Choose from {', '.join(HOLDING_FIELDS)}"
+                }), 400)
+
+            portfolio = portfolios.get(current_user.id)
+            # A portfolio reloaded into the store has no prices yet; cached quotes restore
+            # them, so holdings rank by value and the valuation covers every holding the
+            # process can price without an upstream call
+            portfolio.apply_cached_prices()
+            try:
+                page, next_cursor = portfolio.page_holdings(sort, descending, limit, request.args.get("cursor"))
+            except ValueError as e:
+                return make_response(jsonify({
+                    "status": "error",
+                    "message": str(e)
+                }), 400)
+
+            if PRICED_FIELDS.intersection(fields):
+                # While the refresher runs, fresh quotes reach the portfolio as they arrive
+                # and only holdings never priced need a lookup
+                to_price = page
+                if price_refresher.price_refresher.running:
+                    unpriced = set(portfolio.unpriced_symbols)
+                    to_price = [symbol for symbol in page if symbol in unpriced]
+            else:
+                to_price = []
+
+            def render() -> dict:
+                portfolio_summary = portfolio.view_portfolio(portfolio.prices, symbols=page)
+                if len(fields) < len(HOLDING_FIELDS):
+                    portfolio_summary["portfolio"] = [
+                        {field: holding[field] for field in fields} for holding in portfolio_summary["portfolio"]
+                    ]
+                return {
+                    "status": "success",
+                    "holdings": portfolio_summary,
+                    "next_cursor": next_cursor,
+                    "portfolio_value": portfolio.get_valuation(),
+                    "cash_balance": portfolio.cash_balance,
+                    "cash_balance_cents": portfolio.cash_cents
+                }
+
+            def tag() -> Optional[str]:
+                # Quotes are read before the portfolio state, so a change made meanwhile can
+                # only make the tag older than the body
+                quotes = Stocks.cached_quote_versions(to_price)
+                if quotes is None:
+                    return None
+                return make_etag(
+                    "portfolio", *portfolio.state, quotes, tuple(sorted(portfolio.unpriced_symbols)),
+                    sort, descending, limit, request.args.get("cursor"), fields,
+                )
+
+            # A tag built from the cached quotes answers a revalidation without pricing
+            # anything; the page is only priced when the tag does not match
+            etag = tag()
+            if etag is None or not request.if_none_match.contains_weak(etag):
+                if to_price:
+                    with upstream_context(Priority.VALUATION, current_user.username):
+                        portfolio.update_prices(to_price)
+                etag = tag()
+            return conditional_json(etag, render, private=True)
+
+        except Exception as e:
+            app.logger.error(f"Error viewing portfolio: {e}")
+            return make_response(jsonify({
+                "status": "error",
+                "message": "An internal error occurred while retrieving portfolio",
+                "details": str(e)
+            }), 500)
+
+    @app.route('/api/portfolio-history', methods=['GET'])
+    @login_required
+    def portfolio_history() -> Response:
+        """Route to get the portfolio's daily value over a date range.
+
+        Query Parameters:
+            - start (str, optional): First day as YYYY-MM-DD, defaults to a year before end.
+            - end (str, optional): Last day as YYYY-MM-DD, defaults to today.
+
+        Returns:
+            JSON response containing the dates and the holdings and total value series.
+
+        Raises:
+            400 error if a date is malformed or start is after end.
+            500 error if there is an issue computing the history.
+        """
+        try:
+            try:
+                end = date.fromisoformat(request.args["end"]) if "end" in request.args else date.today()
+                start = date.fromisoformat(request.args["start"]) if "start" in request.args else end - timedelta(days=365)
+            except ValueError:
+                return make_response(jsonify({
+                    "status": "error",
+                    "message": "start and end must be dates in YYYY-MM-DD format"
+                }), 400)
+
+            if start > end:
+                return make_response(jsonify({
+                    "status": "error",
+                    "message": "start must not be after end"
+                }), 400)
+
+            with upstream_context(Priority.VALUATION, current_user.username):
+                history = portfolios.get(current_user.id).get_value_history(start, end)
 
             return make_response(jsonify({
                 "status": "success",
-                "holdings": portfolio_summary,
-                "portfolio_value": portfolio_value,
-                "cash_balance": portfolio_model.cash_balance
+                "history": history
             }), 200)
 
         except Exception as e:
-            app.logger.error(f"Error viewing portfolio: {e}")
+            app.logger.error(f"Error computing portfolio history: {e}")
             return make_response(jsonify({
                 "status": "error",
-                "message": "An internal error occurred while retrieving portfolio",
+                "message": "An internal error occurred while computing portfolio history",
                 "details": str(e)
             }), 500)
 
+    @app.route('/api/trades', methods=['GET'])
+    @login_required
+    def get_trades() -> Response:
+        """Route to read the user's ledger of fills, deposits and withdrawals.
+
+        Entries are read straight from the append-only ledger, newest first.
+
+        Query Parameters:
+            - limit (int, optional): Entries per page, at most TRADES_MAX_PAGE_SIZE (default 100).
+            - before (int, optional): Only entries older than this id, from the previous page's next_before.
+
+        Returns:
+            JSON response containing the entries and the id to page back from.
+
+        Raises:
+            400 error if limit or before is invalid.
+            500 error if there is an issue reading the ledger.
+        """
+        try:
+            max_page_size = app.config.get("TRADES_MAX_PAGE_SIZE", 500)
+            try:
+                limit = int(request.args.get("limit", min(100, max_page_size)))
+                before = int(request.args["before"]) if "before" in request.args else None
+            except ValueError:
+                return make_response(jsonify({
+                    "status": "error",
+                    "message": "limit and before must be integers"
+                }), 400)
+
+            if not 1 <= limit <= max_page_size:
+                return make_response(jsonify({
+                    "status": "error",
+                    "message": f"limit must be between 1 and {max_page_size}"
+                }), 400)
+
+            entries = Trades.get_entries(current_user.id, limit, before_id=before)
+            return make_response(jsonify({
+                "status": "success",
+                "trades": [entry.to_dict() for entry in entries],
+                "next_before": entries[-1].id if len(entries) == limit else None
+            }), 200)
+
+        except Exception as e:
+            app.logger.error(f"Error reading trades: {e}")
+            return make_response(jsonify({
+                "status": "error",
+                "message": "An internal error occurred while reading trades",
+                "details": str(e)
+            }), 500)
+
+    @app.route('/api/price-stream', methods=['GET'])
+    @login_required
+    def stream_prices() -> Response:
+        """Route to stream price and portfolio value updates as Server-Sent Events.
+
+        Updates come from one shared poller, so any number of open streams cost one
+        price fetch per symbol per interval. A "prices" event is sent whenever a
+        followed price changes, and a keepalive comment otherwise.
+
+        Query Parameters:
+            - symbols (str, optional): Comma-separated symbols to follow. Defaults to
+              the portfolio holdings.
+
+        Returns:
+            A text/event-stream response of "prices" events carrying the prices, and
+            the portfolio value when following the holdings.
+        """
+        requested = [symbol.strip().upper() for symbol in request.args.get("symbols", "").split(",") if symbol.strip()]
+        max_symbols = app.config.get("QUOTES_MAX_SYMBOLS", 50)
+        if len(requested) > max_symbols:
+            return make_response(jsonify({
+                "status": "error",
+                "message": f"At most {max_symbols} symbols can be streamed per connection"
+            }), 400)
+
+        user_id = current_user.id
+        # Called from the poller thread, so it reads only the cached portfolio
+        symbols = (lambda: requested) if requested else (lambda: portfolios.held_symbols(user_id))
+        keepalive_seconds = app.config.get("PRICE_STREAM_KEEPALIVE_SECONDS", 15)
+        app.logger.info(f"Opening price stream for {current_user.username}")
+
+        def events():
+            subscription = price_stream.price_stream.subscribe(symbols)
+            price_stream.price_stream.start()
+            try:
+                yield "retry: 5000\n\n"
+                while True:
+                    # Keeps the portfolio cached for the poller while the stream is open
+                    portfolio = portfolios.get(user_id)
+                    update = subscription.get(timeout=keepalive_seconds)
+                    if update is None:
+                        yield ": keepalive\n\n"
+                        continue
+                    if not requested:
+                        portfolio.apply_prices(update["prices"])
+                        update["portfolio_value"] = portfolio.get_valuation()
+                    yield f"event: prices\ndata: {json.dumps(update)}\n\n"
+            finally:
+                price_stream.price_stream.unsubscribe(subscription)
+
+        return Response(stream_with_context(events()), mimetype="text/event-stream", headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        })
+
     return app
 
 if __name__ == '__main__':
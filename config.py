@@ -13,6 +13,48 @@ class ProductionConfig():
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = False
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', "sqlite:////app/db/app.db")  # Production database URI from environment
+    MARKET_DATA_PROVIDER = os.getenv("MARKET_DATA_PROVIDER", "alpha_vantage")  # "alpha_vantage" or "fixtures"
+    MARKET_DATA_FIXTURES_DIR = os.getenv("MARKET_DATA_FIXTURES_DIR")  # Defaults to the bundled fixtures
+    MARKET_DATA_FIXTURE_LATENCY_MS = float(os.getenv("MARKET_DATA_FIXTURE_LATENCY_MS", 0))  # Simulated upstream latency
+    SYMBOL_LISTING_FILE = os.getenv("SYMBOL_LISTING_FILE")  # Bundled LISTING_STATUS CSV, else fetched from the provider
+    SYMBOL_INDEX_ENABLED = os.getenv("SYMBOL_INDEX_ENABLED", "true").lower() == "true"
+    SYMBOL_INDEX_REFRESH_SECONDS = int(os.getenv("SYMBOL_INDEX_REFRESH_SECONDS", 24 * 3600))
+    SYMBOL_SEARCH_MAX_RESULTS = int(os.getenv("SYMBOL_SEARCH_MAX_RESULTS", 50))
+    UNKNOWN_SYMBOL_TTL_SECONDS = int(os.getenv("UNKNOWN_SYMBOL_TTL_SECONDS", 3600))  # How long a symbol without data is rejected
+    PORTFOLIO_CACHE_MAX_ENTRIES = int(os.getenv("PORTFOLIO_CACHE_MAX_ENTRIES", 1000))  # Hot user portfolios per worker
+    PORTFOLIO_CACHE_TTL_SECONDS = float(os.getenv("PORTFOLIO_CACHE_TTL_SECONDS", 60))  # Bounds staleness across workers
+    PORTFOLIO_DRIFT_CHECK_SECONDS = float(os.getenv("PORTFOLIO_DRIFT_CHECK_SECONDS", 300))  # Full recompute of a portfolio's running valuation
+    QUOTE_CACHE_TTL_SECONDS = int(os.getenv("TTL_SECONDS", 60))  # How long a fetched quote is reused
+    QUOTE_CACHE_MAX_ENTRIES = int(os.getenv("QUOTE_CACHE_MAX_ENTRIES", 1024))  # LRU bound on cached quotes
+    QUOTE_CACHE_STALE_SECONDS = int(os.getenv("QUOTE_CACHE_STALE_SECONDS", 300))  # Expired quotes served while refreshing
+    QUOTES_MAX_SYMBOLS = int(os.getenv("QUOTES_MAX_SYMBOLS", 50))  # Symbols accepted by one /api/quotes request
+    ORDER_QUOTE_MAX_AGE_SECONDS = float(os.getenv("ORDER_QUOTE_MAX_AGE_SECONDS", 15))  # Oldest quote an order may be filled at
+    BATCH_ORDERS_MAX = int(os.getenv("BATCH_ORDERS_MAX", 100))  # Orders accepted by one /api/orders request
+    ORDER_QUEUE_ENABLED = os.getenv("ORDER_QUEUE_ENABLED", "false").lower() == "true"  # Accept "async" orders; in-process only, so single-worker deployments
+    ORDER_QUEUE_WORKERS = int(os.getenv("ORDER_QUEUE_WORKERS", 4))  # Threads executing queued orders
+    ORDER_QUEUE_MAX_PENDING = int(os.getenv("ORDER_QUEUE_MAX_PENDING", 1000))  # Orders queued or running before submissions get 503
+    ORDER_QUEUE_KEEP_SECONDS = float(os.getenv("ORDER_QUEUE_KEEP_SECONDS", 3600))  # How long finished orders can be polled
+    TRADES_MAX_PAGE_SIZE = int(os.getenv("TRADES_MAX_PAGE_SIZE", 500))  # Ledger entries returned by one /api/trades request
+    PORTFOLIO_MAX_PAGE_SIZE = int(os.getenv("PORTFOLIO_MAX_PAGE_SIZE", 500))  # Holdings returned by one /api/view-portfolio page
+    PRICE_REFRESHER_ENABLED = os.getenv("PRICE_REFRESHER_ENABLED", "true").lower() == "true"
+    PRICE_REFRESH_INTERVAL_SECONDS = float(os.getenv("PRICE_REFRESH_INTERVAL_SECONDS", 5))
+    PRICE_REFRESH_AHEAD_SECONDS = float(os.getenv("PRICE_REFRESH_AHEAD_SECONDS", 10))  # Refresh quotes this close to expiry
+    PRICE_STREAM_INTERVAL_SECONDS = float(os.getenv("PRICE_STREAM_INTERVAL_SECONDS", 5))  # Shared poller period
+    PRICE_STREAM_QUEUE_SIZE = int(os.getenv("PRICE_STREAM_QUEUE_SIZE", 16))  # Updates buffered per slow client
+    PRICE_STREAM_KEEPALIVE_SECONDS = float(os.getenv("PRICE_STREAM_KEEPALIVE_SECONDS", 15))
+    OVERVIEW_CACHE_TTL_SECONDS = int(os.getenv("OVERVIEW_CACHE_TTL_SECONDS", 3 * 24 * 3600))  # Company info
+    RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 300))  # Rendered polling responses
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 2048))
+    UPSTREAM_FAILURE_TTL_SECONDS = float(os.getenv("UPSTREAM_FAILURE_TTL_SECONDS", 5))  # Window a failed fetch is re-raised
+    UPSTREAM_CALLS_PER_MINUTE = int(os.getenv("ALPHA_VANTAGE_CALLS_PER_MINUTE", 75))  # Plan limit, 0 for unlimited
+    UPSTREAM_CALLS_PER_DAY = int(os.getenv("ALPHA_VANTAGE_CALLS_PER_DAY", 0))  # Plan limit, 0 for unlimited
+    UPSTREAM_USER_SHARE = float(os.getenv("UPSTREAM_USER_SHARE", 0.25))  # Per-user share of the minute budget
+    HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", 10))  # Per-host pools kept alive
+    HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", 32))  # Keep-alive connections per host
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 3.05))
+    HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 10))
+    HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", 3))  # Retries on 5xx and 429
+    HTTP_BACKOFF_SECONDS = float(os.getenv("HTTP_BACKOFF_SECONDS", 0.5))  # Base of the jittered backoff
 
 class TestConfig():
     """Testing configuration."""
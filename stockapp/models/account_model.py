@@ -0,0 +1,22 @@
+from stockapp.db import db
+
+
+class Accounts(db.Model):
+    """Represents the cash side of a user's brokerage account.
+
+    Positions are kept per user in the Stocks table; together they make up the
+    user's portfolio, loaded and saved by PortfolioModel. Balances are whole cents.
+
+    Updates are optimistic: each one checks and bumps ``version``, so a balance
+    computed from a row another worker has since changed fails with StaleDataError
+    instead of overwriting it.
+    """
+
+    __tablename__ = "Accounts"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    cash_cents = db.Column(db.BigInteger, nullable=False, default=0)
+    original_cash_cents = db.Column(db.BigInteger, nullable=False, default=0)
+    version = db.Column(db.Integer, nullable=False)
+
+    __mapper_args__ = {"version_id_col": version}
@@ -0,0 +1,202 @@
+import logging
+from datetime import date, datetime
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from stockapp.db import db
+from stockapp.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+class DailyPrices(db.Model):
+    """Represents one daily OHLCV bar of a stock.
+
+    Bars are keyed by (symbol, date), so reading a symbol's history is an indexed
+    range scan. The table is backfilled once per symbol and then extended with only
+    the missing days.
+    """
+
+    __tablename__ = "DailyPrices"
+
+    symbol = db.Column(db.String, primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    open = db.Column(db.Float, nullable=False)
+    high = db.Column(db.Float, nullable=False)
+    low = db.Column(db.Float, nullable=False)
+    close = db.Column(db.Float, nullable=False)
+    adjusted_close = db.Column(db.Float, nullable=True)
+    volume = db.Column(db.BigInteger, nullable=False)
+
+    def to_dict(self) -> dict:
+        """
+        Converts the bar into the dict shape returned by the API
+
+        Returns:
+            dict: Date, open, high, low, close and volume
+        """
+        return {
+            "date": self.date.isoformat(),
+            "open": self.open,
+            "high": self.high,
+            "low": self.low,
+            "close": self.close,
+            "volume": self.volume,
+        }
+
+    ##################################################
+    ## Daily Price Retrieval Functions
+    ##################################################
+
+    @classmethod
+    def latest_date(cls, symbol: str) -> Optional[date]:
+        """
+        Returns the date of the most recent stored bar for a symbol
+
+        Args:
+            symbol (str): Upper-cased stock symbol
+
+        Returns:
+            date: The latest bar date, or None if nothing is stored
+        """
+        return db.session.query(db.func.max(cls.date)).filter(cls.symbol == symbol).scalar()
+
+    @classmethod
+    def get_history(
+        cls,
+        symbol: str,
+        limit: Optional[int] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> List["DailyPrices"]:
+        """
+        Reads stored bars for a symbol, newest first
+
+        Args:
+            symbol (str): Upper-cased stock symbol
+            limit (int, optional): Maximum number of bars to return
+            start (date, optional): Earliest bar date to include
+            end (date, optional): Latest bar date to include
+
+        Returns:
+            List[DailyPrices]: The matching bars
+        """
+        query = cls.query.filter(cls.symbol == symbol)
+        if start is not None:
+            query = query.filter(cls.date >= start)
+        if end is not None:
+            query = query.filter(cls.date <= end)
+        query = query.order_by(cls.date.desc())
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+
+    @classmethod
+    def get_series(cls, symbol: str) -> List[Tuple[date, float, float, float, Optional[float]]]:
+        """
+        Reads the full history of a symbol as plain column tuples, oldest first
+
+        Skips building ORM objects, which dominates the cost of reading long histories.
+
+        Args:
+            symbol (str): Upper-cased stock symbol
+
+        Returns:
+            List[Tuple]: (date, high, low, close, adjusted_close) of every stored bar
+        """
+        return (
+            db.session.query(cls.date, cls.high, cls.low, cls.close, cls.adjusted_close)
+            .filter(cls.symbol == symbol)
+            .order_by(cls.date)
+            .all()
+        )
+
+    @classmethod
+    def get_closes(
+        cls,
+        symbols: Iterable[str],
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> List[Tuple[str, date, float]]:
+        """
+        Reads the closes of several symbols in one query, oldest first
+
+        Args:
+            symbols (Iterable[str]): Upper-cased stock symbols
+            start (date, optional): Earliest bar date to include
+            end (date, optional): Latest bar date to include
+
+        Returns:
+            List[Tuple]: (symbol, date, close) of every matching bar
+        """
+        query = db.session.query(cls.symbol, cls.date, cls.close).filter(cls.symbol.in_(list(symbols)))
+        if start is not None:
+            query = query.filter(cls.date >= start)
+        if end is not None:
+            query = query.filter(cls.date <= end)
+        return query.order_by(cls.date).all()
+
+    ##################################################
+    ## Daily Price Update Functions
+    ##################################################
+
+    @classmethod
+    def store_bars(cls, symbol: str, bars: Iterable[dict]) -> int:
+        """
+        Stores the bars that are not already held for a symbol
+
+        Bars older than the latest stored bar are skipped. The latest stored bar is
+        overwritten, since it may have been captured mid-session.
+
+        Args:
+            symbol (str): Upper-cased stock symbol
+            bars (Iterable[dict]): Bars with date, open, high, low, close and volume
+
+        Returns:
+            int: Number of bars written
+
+        Raises:
+            SQLAlchemyError: For any database-related issues.
+        """
+        latest = cls.latest_date(symbol)
+        rows = []
+        for bar in bars:
+            bar_date = datetime.strptime(bar["date"], "%Y-%m-%d").date()
+            if latest is not None and bar_date < latest:
+                continue
+            rows.append(cls(
+                symbol=symbol,
+                date=bar_date,
+                open=bar["open"],
+                high=bar["high"],
+                low=bar["low"],
+                close=bar["close"],
+                adjusted_close=bar.get("adjusted_close"),
+                volume=bar["volume"],
+            ))
+
+        if not rows:
+            return 0
+
+        try:
+            if latest is None:
+                db.session.add_all(rows)
+            else:
+                for row in rows:
+                    db.session.merge(row)
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent sync stored the same bars first
+            db.session.rollback()
+            logger.info(f"Daily bars for {symbol} were stored concurrently")
+            return 0
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"Error storing daily bars for {symbol}: {str(e)}")
+            raise
+
+        logger.info(f"Stored {len(rows)} daily bars for {symbol}")
+        return len(rows)
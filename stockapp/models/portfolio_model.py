@@ -1,16 +1,80 @@
+import base64
+import hashlib
+import itertools
+import json
 import logging
-import os
+import threading
 import time
-from typing import Dict
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
 
+import numpy as np
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm.exc import StaleDataError
+
+from stockapp.db import db
+from stockapp.models.account_model import Accounts
+from stockapp.models.daily_price_model import DailyPrices
+from stockapp.models.trade_model import DEPOSIT, WITHDRAWAL, Trades
+from stockapp.utils.analytics import forward_fill, holdings_values
+from stockapp.utils.cache import TTLCache
+from stockapp.utils.keyed_lock import KeyedLock
 from stockapp.utils.logger import configure_logger
-from stockapp.utils.api_utils import get_random
+from stockapp.utils.money import (
+    CENTS_PER_DOLLAR,
+    MICROS_PER_CENT,
+    cents_to_dollars,
+    divide_rounded,
+    micros_to_cents,
+    micros_to_dollars,
+    to_cents,
+    to_micros,
+    value_cents,
+)
 
 
 logger = logging.getLogger(__name__)
 configure_logger(logger)
 
 
+# Closes read from before the range start, so the first day has a price across weekends and holidays
+HISTORY_LOOKBACK_DAYS = 10
+
+# Fields of each holding in view_portfolio, and those that need a current price
+HOLDING_FIELDS = (
+    "symbol", "shares", "buy_price", "buy_price_cents", "current_price", "current_price_cents",
+    "percent_change", "total_value", "total_value_cents", "price_age_seconds",
+)
+PRICED_FIELDS = frozenset({
+    "current_price", "current_price_cents", "percent_change", "total_value", "total_value_cents", "price_age_seconds",
+})
+
+# Orders page_holdings can list holdings in
+HOLDING_SORTS = ("symbol", "value", "percent_change")
+
+# Source of every portfolio's revision and price_epoch numbers
+_changes = itertools.count(1)
+
+T = TypeVar("T")
+
+
+class ConcurrentUpdateError(RuntimeError):
+    """Raised when a portfolio kept changing under an update through every retry."""
+
+
+class BatchRejected(ValueError):
+    """
+    Raised when any order in a batch fails validation; no order in it was applied
+
+    Attributes:
+        results (List[dict]): Per-order outcome, in submission order
+    """
+
+    def __init__(self, message: str, results: List[dict]):
+        super().__init__(message)
+        self.results = results
+
+
 class PortfolioModel:
     """
     A class to manage a user's stock portfolio
@@ -19,37 +83,152 @@ class PortfolioModel:
     - Display the user's current stock holdings, including quantity, current price of each stock,
       and the total value of each holding, culminating in an overall portfolio value
     - Calculate the total portfolio value based on the latest market prices
+    - Persist the user's cash in the Accounts table and positions in the Stocks table
+
+    A portfolio without a user_id keeps its cash in memory only.
+
+    Market value and cost basis are kept as running aggregates, adjusted for the one
+    holding a trade changes and for each price applied with apply_prices, so
+    get_valuation is constant time however many holdings there are. check_drift
+    compares them with a full recompute.
+
+    Every change of holdings bumps ``revision`` and every price that moves bumps
+    ``price_epoch``, both drawn from one process-wide counter so a number is never
+    reused, even by a portfolio reloaded after eviction. They mark when the digest
+    of holdings and prices in ``state`` must be recomputed; ``state`` itself only
+    holds content, so it means the same in every worker.
+
+    Money is held in integers, cash and costs in cents and prices in micro-dollars,
+    so balances and aggregates stay exact however many trades are applied. Dollar
+    amounts are only produced for display.
     """
 
-    def __init__(self):
+    def __init__(self, user_id: Optional[int] = None):
         """Initializes the Portfolio with an empty dictionary of stock holdings
 
         Attributes:
-            holdings (Dict[str, int]): Maps stock symbols to number of shares held
-            _stock_cache (Dict[str, Stocks]): Caches stock data objects for quick access
-            _ttl (Dict[str, float]): Tracks expiration times for cached stock data
-            ttl_seconds (int): Time-to-live for each stock data entry in seconds
-            cash_balance (float): Current available cash in the brokerage account
-            original_cash_balance (float): Original deposited cash amount
+            user_id (int): Owner of the portfolio, None for an unsaved portfolio
+            holdings (Dict[str, dict]): Maps stock symbols to shares held and their total cost in cents
+            cash_cents (int): Current available cash in the brokerage account
+            original_cash_cents (int): Original deposited cash amount
+            checked_at (float): When the aggregates were last checked for drift
+            version (int): Version of the account row the cash balance was read from
+            revision (int): Changes whenever the holdings do
+            price_epoch (int): Changes whenever a price applied to a holding moves
         """
+        self.user_id = user_id
+        self.checked_at = time.time()
+        self._prices: Dict[str, int] = {}
+        self._stale_since: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._digest: Optional[Tuple[Tuple[int, int], str]] = None
+        self.price_epoch = next(_changes)
         self.holdings = {}
-        self._stock_cache = {}
-        self._ttl = {}
-        self.ttl_seconds = int(os.environ.get("TTL_SECONDS", 60))
-        self.cash_balance = 0.0 
-        self.original_cash_balance = 0.0
+        self.cash_cents = 0
+        self.original_cash_cents = 0
+        self.version: Optional[int] = None
+
+    @property
+    def holdings(self) -> Dict[str, dict]:
+        """Maps each held symbol to its "shares" and their "total_cost_cents"."""
+        return self._holdings
+
+    @holdings.setter
+    def holdings(self, holdings: Dict[str, dict]) -> None:
+        with self._lock:
+            self._holdings = holdings
+            self.revision = next(_changes)
+            self._prices = {symbol: price for symbol, price in self._prices.items() if symbol in holdings}
+            self._stale_since = {symbol: at for symbol, at in self._stale_since.items() if symbol in holdings}
+            self._market_value, self._cost_basis, self._priced_cost_basis = self._aggregate()
+
+    @property
+    def cash_balance(self) -> float:
+        """Current available cash, in dollars."""
+        return cents_to_dollars(self.cash_cents)
+
+    @property
+    def original_cash_balance(self) -> float:
+        """Original deposited cash amount, in dollars."""
+        return cents_to_dollars(self.original_cash_cents)
+
+    @property
+    def prices(self) -> Dict[str, float]:
+        """Latest price applied to each holding, in dollars."""
+        return {symbol: micros_to_dollars(price) for symbol, price in self._prices.items()}
+
+    @property
+    def price_ages(self) -> Dict[str, float]:
+        """Age in seconds of each applied price that came from an expired quote; fresh prices are left out."""
+        now = time.time()
+        with self._lock:
+            return {symbol: round(now - at, 1) for symbol, at in self._stale_since.items()}
+
+    @property
+    def unpriced_symbols(self) -> List[str]:
+        """Held symbols no price has been applied to yet."""
+        return [symbol for symbol in self._holdings if symbol not in self._prices]
+
+    @property
+    def state(self) -> Tuple:
+        """What a rendering of the portfolio depends on: owner, account version, cash, and a digest of holdings and prices."""
+        with self._lock:
+            changes = (self.revision, self.price_epoch)
+            if self._digest is None or self._digest[0] != changes:
+                content = (
+                    sorted((symbol, info["shares"], info["total_cost_cents"]) for symbol, info in self._holdings.items()),
+                    sorted(self._prices.items()),
+                    sorted(self._stale_since.items()),
+                )
+                self._digest = (changes, hashlib.sha1(repr(content).encode()).hexdigest())
+            digest = self._digest[1]
+        return (self.user_id, self.version, self.cash_cents, digest)
+
+    @classmethod
+    def load(cls, user_id: int) -> "PortfolioModel":
+        """
+        Loads a user's portfolio from the database
+
+        Args:
+            user_id (int): Owner of the portfolio
+
+        Returns:
+            PortfolioModel: The portfolio, empty if the user has none yet
+        """
+        return cls(user_id).reload()
+
+    def reload(self) -> "PortfolioModel":
+        """
+        Replaces the in-memory state with the state stored in the database
+
+        Returns:
+            PortfolioModel: This portfolio
+        """
+        from stockapp.models.stock_model import Stocks
+
+        account = db.session.get(Accounts, self.user_id)
+        holdings = {
+            stock.symbol: {"shares": stock.number_shares, "total_cost_cents": stock.total_cost_cents}
+            for stock in Stocks.query.filter_by(user_id=self.user_id).all()
+        }
+
+        self.holdings = holdings
+        self.cash_cents = account.cash_cents if account is not None else 0
+        self.original_cash_cents = account.original_cash_cents if account is not None else 0
+        self.version = account.version if account is not None else None
+        return self
 
     ##################################################
     ## Portfolio Retrieval Functions
     ##################################################
 
-    def view_portfolio(self) -> Dict:
+    def view_portfolio(self, prices: Optional[Dict[str, float]] = None, symbols: Optional[List[str]] = None) -> Dict:
         """
         Displays the user's current portfolio holdings.
 
         Logic:
+        - Resolve current prices for every holding in one batch (from cache or API)
         - For each stock in holdings:
-            - Fetch current price (from cache or DB)
             - Retrieve number of shares held
             - Calculate percentage change from original purchase price
         - Build and return a structured summary showing:
@@ -57,71 +236,140 @@ class PortfolioModel:
             - Shares held
             - Current stock price
             - Percentage change compared to buy price
+            - Age of the price, if it came from an expired quote
+
+        Args:
+            prices (Dict[str, float], optional): Prices already resolved with get_prices
+            symbols (List[str], optional): Only these holdings, in this order, e.g. a
+                page from page_holdings. Defaults to every holding
 
         Returns:
             Dict: A structured summary of the user's portfolio, including
                   ticker, shares, current price, and percent change for each holding
         """
         summary = []
+        holdings = self.holdings
+        if symbols is None:
+            symbols = list(holdings)
+        if prices is None:
+            prices = self.get_prices(symbols)
+        ages = self.price_ages
 
-        for symbol, info in self.holdings.items():
+        for symbol in symbols:
+            info = holdings[symbol]
             shares = info["shares"]
-            buy_price = info["buy_price"]
+            cost = info["total_cost_cents"]
 
             try:
-                current_price = self._get_stock_from_cache_or_db(symbol)
-                percent_change = ((current_price - buy_price) / buy_price) * 100
-                total_value = round(self._calculate_stock_value(symbol, shares), 2)
+                current_price = to_micros(prices[symbol])
+                total_value_cents = value_cents(shares, current_price)
+                basis = cost * MICROS_PER_CENT
+                percent_change = ((shares * current_price - basis) / basis) * 100 if basis else None
             except Exception:
                 current_price = None
                 percent_change = None
-                total_value = "N/A"
+                total_value_cents = None
 
+            buy_price_cents = divide_rounded(cost, shares) if shares else None
+            current_price_cents = micros_to_cents(current_price) if current_price else None
             summary.append({
                 "symbol": symbol,
                 "shares": shares,
-                "buy_price": round(buy_price, 2),
-                "current_price": round(current_price, 2) if current_price else "N/A",
+                "buy_price": cents_to_dollars(buy_price_cents) if buy_price_cents is not None else "N/A",
+                "buy_price_cents": buy_price_cents,
+                "current_price": cents_to_dollars(current_price_cents) if current_price_cents is not None else "N/A",
+                "current_price_cents": current_price_cents,
                 "percent_change": round(percent_change, 2) if percent_change else "N/A",
-                "total_value": total_value
+                "total_value": cents_to_dollars(total_value_cents) if total_value_cents is not None else "N/A",
+                "total_value_cents": total_value_cents,
+                "price_age_seconds": ages.get(symbol) if current_price else None
             })
 
         return {"portfolio": summary}
 
 
-    def calculate_portfolio_value(self) -> Dict:
+    def page_holdings(
+        self,
+        sort: str = "symbol",
+        descending: bool = False,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[str], Optional[str]]:
+        """
+        Orders the holdings and returns one page of their symbols
+
+        Value and percent change are read from the prices already applied, so ordering
+        needs no price lookups; holdings without a price come last. A cursor holds the
+        sort key of the last holding returned, so the next page continues after it even
+        if holdings were bought or sold in between.
+
+        Args:
+            sort (str): One of HOLDING_SORTS
+            descending (bool): Largest first instead of smallest first
+            limit (int, optional): Holdings per page, defaults to all of them
+            cursor (str, optional): The next_cursor of the previous page
+
+        Returns:
+            Tuple[List[str], Optional[str]]: The page's symbols, and the cursor of the
+                next page, None on the last page
+
+        Raises:
+            ValueError: If the sort is unknown or the cursor is invalid or from another sort
+        """
+        if sort not in HOLDING_SORTS:
+            raise ValueError(f"sort must be one of {', '.join(HOLDING_SORTS)}")
+
+        with self._lock:
+            holdings, prices = self._holdings, dict(self._prices)
+        reverse = sort == "symbol" and descending
+        ranks = sorted(
+            (_holding_rank(sort, descending, symbol, info, prices.get(symbol)) for symbol, info in holdings.items()),
+            reverse=reverse,
+        )
+        if cursor is not None:
+            after = _decode_cursor(cursor, sort, descending)
+            ranks = [rank for rank in ranks if (rank < after if reverse else rank > after)]
+
+        page = ranks if limit is None else ranks[:limit]
+        next_cursor = _encode_cursor(sort, descending, page[-1]) if len(page) < len(ranks) else None
+        return [rank[-1] for rank in page], next_cursor
+
+    def calculate_portfolio_value(self, prices: Optional[Dict[str, float]] = None) -> Dict:
         """
         Calculates the total current value of the portfolio.
 
         Logic:
+        - Resolve current prices for every holding in one batch (from cache or API)
         - For each stock in holdings:
-            - Fetch current price (from cache or DB)
             - Multiply shares by current price
             - Sum total value of all stock holdings
         - Add available cash balance from brokerage account
         - Calculate percentage change relative to original invested amount
 
+        Args:
+            prices (Dict[str, float], optional): Prices already resolved with get_prices
+
         Returns:
         Dict - A summary including:
             - current_total_value (float): Portfolio value + cash
             - original_total_value (float): Original invested amount + cash
             - percent_change (float): Percentage change from original value
+            Each amount also comes in integer cents, under its name with a _cents suffix
         """
-        total_current_value = 0.0
-        total_original_value = self.original_cash_balance
+        market_value = 0
+        total_original_value = self.original_cash_cents
+        if prices is None:
+            prices = self.get_prices()
 
         for symbol, info in self.holdings.items():
-            shares = info["shares"]
-            buy_price = info["buy_price"]
-            total_original_value += shares * buy_price
+            total_original_value += info["total_cost_cents"]
 
-            try:
-                stock_value = self._calculate_stock_value(symbol, shares)
-                total_current_value += stock_value
-            except Exception as e:
-                logger.warning(f"Skipping {symbol} due to price fetch error: {e}")
+            if symbol in prices:
+                market_value += info["shares"] * to_micros(prices[symbol])
+            else:
+                logger.warning(f"Skipping {symbol} due to price fetch error")
 
-        total_current_value += self.cash_balance
+        total_current_value = micros_to_cents(market_value) + self.cash_cents
 
         try:
             percent_change = ((total_current_value - total_original_value) / total_original_value) * 100 if total_original_value > 0 else 0.0
@@ -129,62 +377,469 @@ class PortfolioModel:
             percent_change = 0.0
 
         return {
-            "current_total_value": round(total_current_value, 2),
-            "original_total_value": round(total_original_value, 2),
+            "current_total_value": cents_to_dollars(total_current_value),
+            "current_total_value_cents": total_current_value,
+            "original_total_value": cents_to_dollars(total_original_value),
+            "original_total_value_cents": total_original_value,
             "percent_change": round(percent_change, 2)
         }
 
+    def get_valuation(self) -> Dict:
+        """
+        Reads the portfolio's value from its running aggregates, in constant time
+
+        Holdings are valued at the prices applied with apply_prices; holdings without
+        one count towards the original value only, as in calculate_portfolio_value.
+
+        Returns:
+        Dict - The calculate_portfolio_value summary, plus:
+            - market_value (float): Value of the priced holdings
+            - cost_basis (float): Cost of all holdings
+            - unrealized_pnl (float): Market value less the cost of the priced holdings
+            each also in integer cents, under its name with a _cents suffix, and
+            - unpriced_symbols (List[str]): Holdings left out of the market value for
+              want of a price; the valuation is only complete when this is empty
+        """
+        with self._lock:
+            market_value, cost_basis, priced_cost_basis = self._market_value, self._cost_basis, self._priced_cost_basis
+
+        market_value = micros_to_cents(market_value)
+        total_current_value = market_value + self.cash_cents
+        total_original_value = cost_basis + self.original_cash_cents
+        percent_change = ((total_current_value - total_original_value) / total_original_value) * 100 if total_original_value > 0 else 0.0
+
+        unrealized_pnl = market_value - priced_cost_basis
+
+        return {
+            "current_total_value": cents_to_dollars(total_current_value),
+            "current_total_value_cents": total_current_value,
+            "original_total_value": cents_to_dollars(total_original_value),
+            "original_total_value_cents": total_original_value,
+            "percent_change": round(percent_change, 2),
+            "market_value": cents_to_dollars(market_value),
+            "market_value_cents": market_value,
+            "cost_basis": cents_to_dollars(cost_basis),
+            "cost_basis_cents": cost_basis,
+            "unrealized_pnl": cents_to_dollars(unrealized_pnl),
+            "unrealized_pnl_cents": unrealized_pnl,
+            "unpriced_symbols": sorted(self.unpriced_symbols),
+        }
+
+    def apply_prices(self, prices: Dict[str, float]) -> None:
+        """
+        Updates the running market value for new prices of held symbols
+
+        Costs one step per price, whatever the number of holdings. Prices of symbols
+        not held are ignored.
+
+        Args:
+            prices (Dict[str, float]): Maps symbols to their latest price, in dollars
+        """
+        self._apply_price_micros({symbol: to_micros(price) for symbol, price in prices.items()})
+
+    def apply_cached_prices(self) -> int:
+        """
+        Applies the live cached quote of every holding without a price, with no upstream call
+
+        A portfolio reloaded into the store starts without prices; this restores those
+        the process already knows, so ordering by value and the valuation cover them.
+
+        Returns:
+            int: Number of holdings priced
+        """
+        from stockapp.models.stock_model import Stocks
+
+        unpriced = self.unpriced_symbols
+        if not unpriced:
+            return 0
+        prices = Stocks.cached_prices(unpriced)
+        self.apply_prices(prices)
+        return len(prices)
+
+    def update_prices(self, symbols: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """
+        Resolves current quotes with get_quotes and applies their prices
+
+        A price from an expired quote, served while the refresher runs, is applied with
+        the quote's age, so views can show how old it is.
+
+        Args:
+            symbols (Iterable[str], optional): Symbols to price, defaults to all holdings
+
+        Returns:
+            Dict[str, float]: The prices resolved
+        """
+        quotes = self.get_quotes(symbols)
+        now = time.time()
+        prices = {symbol: quote["price"] for symbol, quote in quotes.items()}
+        stale_since = {
+            symbol: now - quote["age_seconds"] for symbol, quote in quotes.items() if "age_seconds" in quote
+        }
+        self._apply_price_micros({symbol: to_micros(price) for symbol, price in prices.items()}, stale_since)
+        return prices
+
+    def check_drift(self) -> int:
+        """
+        Recomputes the aggregates from every holding and corrects them if they drifted
+
+        The aggregates are exact integers, so any difference means a change bypassed
+        the running updates.
+
+        Returns:
+            int: The largest difference found between a running and a recomputed
+                aggregate, in cents
+        """
+        with self._lock:
+            expected = self._aggregate()
+            actual = (self._market_value, self._cost_basis, self._priced_cost_basis)
+            drift = max(
+                micros_to_cents(abs(actual[0] - expected[0])),
+                abs(actual[1] - expected[1]),
+                abs(actual[2] - expected[2]),
+            )
+            if actual != expected:
+                logger.warning(f"Valuation of portfolio {self.user_id} drifted by {drift} cents; resetting it")
+                self._market_value, self._cost_basis, self._priced_cost_basis = expected
+            self.checked_at = time.time()
+        return drift
+
+    def _apply_price_micros(self, prices: Dict[str, int], stale_since: Optional[Dict[str, float]] = None) -> None:
+        """
+        Applies prices in micro-dollars to the running market value. See apply_prices.
+
+        Args:
+            prices (Dict[str, int]): Maps symbols to their latest price, in micro-dollars
+            stale_since (Dict[str, float], optional): When the expired quotes among them
+                were fetched; every other price is fresh
+        """
+        stale_since = stale_since or {}
+        with self._lock:
+            for symbol, price in prices.items():
+                holding = self._holdings.get(symbol)
+                if holding is None:
+                    continue
+                fetched_at = stale_since.get(symbol)
+                restamped = self._stale_since.get(symbol) != fetched_at
+                if fetched_at is None:
+                    self._stale_since.pop(symbol, None)
+                else:
+                    self._stale_since[symbol] = fetched_at
+                previous = self._prices.get(symbol)
+                if previous is None:
+                    self._market_value += holding["shares"] * price
+                    self._priced_cost_basis += holding["total_cost_cents"]
+                elif price != previous:
+                    self._market_value += holding["shares"] * (price - previous)
+                elif not restamped:
+                    continue
+                self._prices[symbol] = price
+                self.price_epoch = next(_changes)
+
+    def _aggregate(self) -> tuple:
+        """Computes market value in micro-dollars, and cost basis and priced cost basis in cents. Call under _lock."""
+        market_value = cost_basis = priced_cost_basis = 0
+        for symbol, info in self._holdings.items():
+            cost = info["total_cost_cents"]
+            cost_basis += cost
+            if symbol in self._prices:
+                market_value += info["shares"] * self._prices[symbol]
+                priced_cost_basis += cost
+        return market_value, cost_basis, priced_cost_basis
+
+    def _set_holding(self, symbol: str, holding: Optional[dict]) -> None:
+        """Replaces one holding and adjusts the aggregates for it alone; None removes it."""
+        with self._lock:
+            price = self._prices.get(symbol)
+            for info, sign in ((self._holdings.get(symbol), -1), (holding, 1)):
+                if info is None:
+                    continue
+                cost = info["total_cost_cents"]
+                self._cost_basis += sign * cost
+                if price is not None:
+                    self._market_value += sign * info["shares"] * price
+                    self._priced_cost_basis += sign * cost
+
+            # A new dict, so readers iterating the old one are not disturbed
+            holdings = dict(self._holdings)
+            if holding is None:
+                holdings.pop(symbol, None)
+                self._prices.pop(symbol, None)
+                self._stale_since.pop(symbol, None)
+            else:
+                holdings[symbol] = holding
+            self._holdings = holdings
+            self.revision = next(_changes)
+
+    def get_prices(self, symbols: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """
+        Resolves current prices for a set of symbols in one batch.
+
+        Args:
+            symbols (Iterable[str], optional): Symbols to price, defaults to all holdings
+
+        Returns:
+            Dict[str, float]: Maps each symbol to its current price. Symbols whose
+                price could not be fetched are left out.
+        """
+        return {symbol: quote["price"] for symbol, quote in self.get_quotes(symbols).items()}
+
+    def get_quotes(self, symbols: Optional[Iterable[str]] = None) -> Dict[str, dict]:
+        """
+        Resolves current quotes for a set of symbols in one batch.
+
+        Cached quotes are shared process-wide through Stocks.get_stock_prices, and
+        cache misses are fetched concurrently, so a cold portfolio costs about one
+        upstream round trip.
+
+        Args:
+            symbols (Iterable[str], optional): Symbols to price, defaults to all holdings
+
+        Returns:
+            Dict[str, dict]: Maps each symbol to its quote, with ``age_seconds`` if it
+                expired. Symbols whose quote could not be fetched are left out.
+        """
+        from stockapp.models.stock_model import Stocks
+
+        symbols = list(self.holdings) if symbols is None else list(symbols)
+        if not symbols:
+            return {}
+
+        quotes = Stocks.get_stock_prices(symbols)
+        resolved = {}
+        for symbol in symbols:
+            quote = quotes.get(symbol.upper())
+            if quote is not None:
+                resolved[symbol] = quote
+
+        logger.info(f"Resolved prices for {len(resolved)} of {len(symbols)} symbols")
+        return resolved
+
+    def get_value_history(self, start: date, end: date) -> Dict:
+        """
+        Computes the portfolio's value on every trading day in a date range
+
+        Logic:
+        - Read the ledger entries made since the range start. Holdings and cash on
+          each day are the current ones minus the entries that came after that day
+        - Bring the stored daily bars of every symbol held in the range up to date
+        - Read all their closes in one query into a dates by symbols matrix,
+          carrying each close forward over days a symbol did not trade. Holdings
+          without a close yet count as 0
+        - Multiply by the shares held on each day in one product and add that day's cash
+
+        An unsaved portfolio has no ledger, so its current holdings and cash are
+        applied to every day.
+
+        Args:
+            start (date): First day of the range
+            end (date): Last day of the range
+
+        Returns:
+            Dict: "dates", "holdings_value", "cash" and "total_value" series, the
+                  current cash balance, and the symbols with no stored prices in the range
+        """
+        from stockapp.models.stock_model import Stocks
+
+        entries = Trades.get_since(self.user_id, start) if self.user_id is not None else []
+        held = {symbol.upper() for symbol in self.holdings}
+        symbols = sorted(held | {entry.symbol for entry in entries if entry.symbol is not None})
+        Stocks.sync_price_histories(symbols)
+
+        rows = DailyPrices.get_closes(symbols, start=start - timedelta(days=HISTORY_LOOKBACK_DAYS), end=end)
+        bar_symbols, bar_dates, bar_closes = zip(*rows) if rows else ((), (), ())
+        days, date_rows = np.unique([d.toordinal() for d in bar_dates], return_inverse=True)
+        columns = {symbol: column for column, symbol in enumerate(symbols)}
+
+        closes = np.full((len(days), len(symbols)), np.nan)
+        closes[date_rows, [columns[symbol] for symbol in bar_symbols]] = bar_closes
+        in_range = days >= start.toordinal()
+        days, closes = days[in_range], forward_fill(closes)[in_range]
+
+        current = np.zeros(len(symbols))
+        for symbol, info in self.holdings.items():
+            current[columns[symbol.upper()]] += info["shares"]
+
+        # Row i of "later" holds the changes made after day i, undone from the current state
+        later_shares = np.zeros((len(days) + 1, len(symbols)))
+        later_cash = np.zeros(len(days) + 1, dtype=np.int64)
+        for entry in entries:
+            row = np.searchsorted(days, entry.valued_from.toordinal())
+            later_cash[row] += entry.cash_change_cents
+            if entry.symbol is not None:
+                later_shares[row, columns[entry.symbol]] += entry.share_change
+        later_shares = np.cumsum(later_shares[::-1], axis=0)[::-1][1:]
+        later_cash = np.cumsum(later_cash[::-1])[::-1][1:]
+
+        # Closes are market data in dollars; each day's value is rounded to the cent once
+        values = np.floor(holdings_values(closes, current - later_shares) * CENTS_PER_DOLLAR + 0.5).astype(np.int64)
+        cash = self.cash_cents - later_cash
+        logger.info(f"Valued portfolio over {len(days)} days, {len(symbols)} symbols and {len(entries)} ledger entries")
+        return {
+            "dates": [date.fromordinal(int(day)).isoformat() for day in days],
+            "holdings_value": (values / CENTS_PER_DOLLAR).tolist(),
+            "cash": (cash / CENTS_PER_DOLLAR).tolist(),
+            "total_value": ((values + cash) / CENTS_PER_DOLLAR).tolist(),
+            "cash_balance": self.cash_balance,
+            "missing": [symbol for symbol in symbols if np.isnan(closes[:, columns[symbol]]).all()],
+        }
+
     ##################################################
-    ## Internal Helper Functions
+    ## Trading Functions
     ##################################################
 
-    def _get_stock_from_cache_or_db(self, symbol: str) -> float:
+    def buy_stock(self, symbol: str, shares: int, quote: dict) -> dict:
         """
-        Retrieves a stock either from the internal cache or from the database.
+        Buys shares at a quote, paying from the cash balance
+
+        The cash change and the position are committed in one transaction.
 
         Args:
-            symbol (str): The stock symbol to retrieve.
+            symbol (str): The stock symbol
+            shares (int): Number of shares to buy
+            quote (dict): Quote to fill at, from Stocks.get_stock_price
 
         Returns:
-            float: The current stock price
+            dict: The fill, with symbol, shares, price_micros and total_cents
+
+        Raises:
+            ValueError: If the cash balance does not cover the order or the order is invalid
         """
-        now = time.time()
+        from stockapp.models.stock_model import Stocks
 
-        # Uses cached price if still valid
-        if symbol in self._stock_cache and self._ttl.get(symbol, 0) > now:
-            logger.debug(f"{symbol} price fetched from cache")
-            return self._stock_cache[symbol]
+        symbol = symbol.upper()
+        total_cost = value_cents(shares, to_micros(quote["price"]))
+        if total_cost > self.cash_cents:
+            raise ValueError("Insufficient funds for this purchase")
 
-        try:
-            from stockapp.models.stock_model import Stocks
-            stock_data = Stocks.get_stock_price(symbol)
-            current_price = stock_data["price"]
+        # Staged only; Stocks.buy_stock commits it together with the position
+        version = self._stage_cash(self.cash_cents - total_cost, self.original_cash_cents)
+        fill = Stocks.buy_stock(symbol, shares, quote=quote, user_id=self.user_id)
+        self.version = version
 
-            # Cache it
-            self._stock_cache[symbol] = current_price
-            self._ttl[symbol] = now + self.ttl_seconds
+        self.cash_cents -= fill["total_cents"]
+        self._reload_holding(symbol)
+        self._apply_price_micros({symbol: fill["price_micros"]})
+        return fill
 
-            logger.info(f"{symbol} price fetched from API: ${current_price}")
-            return current_price
+    def sell_stock(self, symbol: str, shares: int, quote: dict) -> dict:
+        """
+        Sells shares at a quote, adding the proceeds to the cash balance
 
-        except Exception as e:
-            logger.error(f"Error fetching stock price for {symbol}: {e}")
-            raise
+        The cash change and the position are committed in one transaction.
+
+        Args:
+            symbol (str): The stock symbol
+            shares (int): Number of shares to sell
+            quote (dict): Quote to fill at, from Stocks.get_stock_price
 
-    def _calculate_stock_value(self, symbol: str, shares: int) -> float:
+        Returns:
+            dict: The fill, with symbol, shares, price_micros and total_cents
+
+        Raises:
+            ValueError: If fewer shares are held than sold or the order is invalid
         """
-        Calculates the total value of a given stock holding.
+        from stockapp.models.stock_model import Stocks
+
+        symbol = symbol.upper()
+        holding = self.holdings.get(symbol)
+        if holding is None or holding["shares"] < shares:
+            raise ValueError(f"You don't own enough shares of {symbol} to sell")
+
+        # Staged only; Stocks.sell_stock commits it together with the position
+        proceeds = value_cents(shares, to_micros(quote["price"]))
+        version = self._stage_cash(self.cash_cents + proceeds, self.original_cash_cents)
+        fill = Stocks.sell_stock(symbol, shares, quote=quote, user_id=self.user_id)
+        self.version = version
+
+        self.cash_cents += fill["total_cents"]
+        self._reload_holding(symbol)
+        self._apply_price_micros({symbol: fill["price_micros"]})
+        return fill
+
+    def execute_orders(self, orders: List[dict], quotes: Dict[str, dict]) -> List[dict]:
+        """
+        Fills a batch of buys and sells at the given quotes in one transaction
+
+        Orders are checked in the order given against the cash and shares left by the
+        orders before them, so sells placed first can fund later buys. If any order
+        fails, none is applied.
 
         Args:
-            symbol (str): The stock symbol.
-            shares (int): Number of shares held.
+            orders (List[dict]): Orders with "action" ("buy" or "sell"), "symbol" and "shares"
+            quotes (Dict[str, dict]): Quotes to fill at, keyed by upper-cased symbol
 
         Returns:
-            float: The total value of the holding.
+            List[dict]: One result per order, with its status and fill
+
+        Raises:
+            BatchRejected: If any order is invalid, unpriced or not covered
+            SQLAlchemyError: For any database-related issues.
         """
-        current_price = self._get_stock_from_cache_or_db(symbol)
-        return shares * current_price
+        from stockapp.models.stock_model import Stocks, fill_to_dict
 
+        cash = self.cash_cents
+        shares = {symbol: holding["shares"] for symbol, holding in self.holdings.items()}
+        prices, errors = [], {}
+        for index, order in enumerate(orders):
+            symbol = order["symbol"].upper()
+            try:
+                if symbol not in quotes:
+                    raise ValueError(f"Could not get a current price for {symbol}")
+                price = to_micros(Stocks.order_quote(symbol, quotes[symbol])["price"])
+                total = value_cents(order["shares"], price)
+                if order["action"] == "buy":
+                    if total > cash:
+                        raise ValueError("Insufficient funds for this purchase")
+                    cash -= total
+                    shares[symbol] = shares.get(symbol, 0) + order["shares"]
+                else:
+                    if shares.get(symbol, 0) < order["shares"]:
+                        raise ValueError(f"You don't own enough shares of {symbol} to sell")
+                    cash += total
+                    shares[symbol] -= order["shares"]
+                prices.append(price)
+            except ValueError as e:
+                errors[index] = str(e)
+                prices.append(None)
+
+        if errors:
+            results = [
+                {"index": index, "status": "rejected", "message": errors[index]} if index in errors
+                else {"index": index, "status": "not_executed"}
+                for index in range(len(orders))
+            ]
+            raise BatchRejected(f"{len(errors)} of {len(orders)} orders were rejected; none were executed", results)
+
+        try:
+            # Staged only; committed together with every position below
+            version = self._stage_cash(cash, self.original_cash_cents)
+            fills = []
+            for order, price in zip(orders, prices):
+                stage = Stocks.stage_buy if order["action"] == "buy" else Stocks.stage_sell
+                fills.append(stage(order["symbol"].upper(), order["shares"], price, self.user_id))
+            db.session.commit()
+        except (ValueError, SQLAlchemyError) as e:
+            db.session.rollback()
+            logger.error(f"Error executing a batch of {len(orders)} orders: {str(e)}")
+            raise
+
+        self.cash_cents = cash
+        self.version = version
+        for symbol in {fill["symbol"] for fill in fills}:
+            self._reload_holding(symbol)
+        self._apply_price_micros({fill["symbol"]: fill["price_micros"] for fill in fills})
+        logger.info(f"Executed a batch of {len(fills)} orders for user {self.user_id}")
+        return [
+            {"index": index, "status": "filled", "action": order["action"], **fill_to_dict(fill)}
+            for index, (order, fill) in enumerate(zip(orders, fills))
+        ]
+
+    def _reload_holding(self, symbol: str) -> None:
+        """Re-reads one position from the Stocks table after a trade."""
+        from stockapp.models.stock_model import Stocks
+
+        stock = Stocks.get_position(symbol, self.user_id)
+        self._set_holding(symbol, None if stock is None else {"shares": stock.number_shares, "total_cost_cents": stock.total_cost_cents})
 
     ##################################################
     ## Cash Balance Functions
@@ -203,12 +858,14 @@ class PortfolioModel:
         Raises:
             ValueError: If the amount is not a positive number
         """
-        if amount <= 0:
+        cents = to_cents(amount)
+        if cents <= 0:
             raise ValueError("Deposit amount must be a positive number.")
-    
-        self.cash_balance += amount
-        self.original_cash_balance += amount
-        logger.info(f"Deposited ${amount:.2f}. New balance: ${self.cash_balance:.2f}")
+
+        self._save_cash(self.cash_cents + cents, self.original_cash_cents + cents, DEPOSIT, cents)
+        self.cash_cents += cents
+        self.original_cash_cents += cents
+        logger.info(f"Deposited ${cents_to_dollars(cents):.2f}. New balance: ${self.cash_balance:.2f}")
 
     def withdraw_cash(self, amount: float) -> None:
         """
@@ -223,11 +880,276 @@ class PortfolioModel:
         Raises:
             ValueError: If the amount is not positive or exceeds the current cash balance
         """
-        if amount <= 0:
+        cents = to_cents(amount)
+        if cents <= 0:
             raise ValueError("Withdrawal amount must be a positive number.")
     
-        if amount > self.cash_balance:
+        if cents > self.cash_cents:
             raise ValueError("Withdrawal exceeds current cash balance.")
-    
-        self.cash_balance -= amount
-        logger.info(f"Withdrew ${amount:.2f}. Remaining balance: ${self.cash_balance:.2f}")
+
+        self._save_cash(self.cash_cents - cents, self.original_cash_cents, WITHDRAWAL, cents)
+        self.cash_cents -= cents
+        logger.info(f"Withdrew ${cents_to_dollars(cents):.2f}. Remaining balance: ${self.cash_balance:.2f}")
+
+    def _stage_cash(self, cash_cents: int, original_cash_cents: int) -> Optional[int]:
+        """
+        Adds the new cash balances to the session without committing
+
+        The balances were computed from the account as last loaded, so the change is
+        refused if the row has moved on since. The commit checks the version again.
+
+        Returns:
+            int: The account version once committed, None for unsaved portfolios
+
+        Raises:
+            StaleDataError: If the account changed after this portfolio loaded it
+        """
+        if self.user_id is None:
+            return None
+        account = db.session.get(Accounts, self.user_id)
+        if account is None:
+            account = Accounts(user_id=self.user_id)
+            db.session.add(account)
+        elif self.version is not None and account.version != self.version:
+            raise StaleDataError(
+                f"Account of user {self.user_id} is at version {account.version}, "
+                f"the portfolio was loaded at {self.version}"
+            )
+        account.cash_cents = cash_cents
+        account.original_cash_cents = original_cash_cents
+        return account.version + 1 if account.version is not None else 1
+
+    def _save_cash(self, cash_cents: int, original_cash_cents: int, kind: str, amount_cents: int) -> None:
+        """Commits the new cash balances in cents with their ledger entry. No-op for unsaved portfolios."""
+        if self.user_id is None:
+            return
+        try:
+            version = self._stage_cash(cash_cents, original_cash_cents)
+            Trades.record_cash(self.user_id, kind, amount_cents)
+            db.session.commit()
+            self.version = version
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"Error saving cash balance for user {self.user_id}: {str(e)}")
+            raise
+
+
+def _holding_rank(sort: str, descending: bool, symbol: str, info: dict, price: Optional[int]) -> tuple:
+    """Sort key of a holding for page_holdings. The symbol comes last, breaking ties."""
+    if sort == "symbol":
+        return (symbol,)
+
+    key = None
+    if price is not None and sort == "value":
+        key = info["shares"] * price
+    elif price is not None and info["total_cost_cents"] > 0:
+        basis = info["total_cost_cents"] * MICROS_PER_CENT
+        key = (info["shares"] * price - basis) / basis
+    if key is None:
+        return (1, 0, symbol)
+    return (0, -key if descending else key, symbol)
+
+
+def _encode_cursor(sort: str, descending: bool, rank: tuple) -> str:
+    """Packs a page position into an opaque, URL-safe cursor."""
+    return base64.urlsafe_b64encode(json.dumps([sort, descending, list(rank)]).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort: str, descending: bool) -> tuple:
+    """
+    Unpacks a cursor made by _encode_cursor for the same sort
+
+    Raises:
+        ValueError: If the cursor is malformed or was made for another sort
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, cursor_descending, rank = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        rank = tuple(rank)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if (cursor_sort, cursor_descending) != (sort, descending):
+        raise ValueError("cursor was made for a different sort")
+
+    if sort == "symbol":
+        valid = len(rank) == 1 and isinstance(rank[0], str)
+    else:
+        valid = len(rank) == 3 and rank[0] in (0, 1) and isinstance(rank[1], (int, float)) and isinstance(rank[2], str)
+    if not valid:
+        raise ValueError("Invalid cursor")
+    return rank
+
+
+class PortfolioStore:
+    """
+    A bounded write-through cache of per-user portfolios
+
+    Reads are served from memory. Writers call refresh first, so they start from the
+    database state even if another worker process changed it, and every change is
+    committed to the database before the cached copy is updated. Entries expire
+    after ``ttl_seconds``, which bounds how stale a read can be when another worker
+    wrote last.
+
+    Refreshing a cached portfolio updates the cached object in place, so references
+    held by long-lived readers such as price streams stay current.
+
+    Fresh quotes are applied to the cached portfolios holding them as they arrive,
+    keeping their running valuations current. A portfolio's aggregates are checked
+    against a full recompute when it is read and ``drift_check_seconds`` have passed
+    since the last check.
+
+    Changes go through update, which serializes them per user within the worker and
+    retries those that lose an optimistic version check to another worker.
+
+    Attributes:
+        drift_check_seconds (float): Time between drift checks of a portfolio
+        update_attempts (int): Tries an update gets before a conflict is reported
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        ttl_seconds: float = 60,
+        drift_check_seconds: float = 300,
+        update_attempts: int = 3,
+    ):
+        self.drift_check_seconds = drift_check_seconds
+        self.update_attempts = update_attempts
+        self._cache = TTLCache(ttl_seconds=ttl_seconds, max_entries=max_entries)
+        self._locks = KeyedLock()
+
+    def configure(self, max_entries: int, ttl_seconds: float, drift_check_seconds: float = 300) -> None:
+        """
+        Updates the cache limits
+
+        Args:
+            max_entries (int): Maximum number of portfolios kept in memory
+            ttl_seconds (float): How long a portfolio is served without reloading
+            drift_check_seconds (float): Time between drift checks of a portfolio
+        """
+        self._cache.configure(ttl_seconds=ttl_seconds, max_entries=max_entries)
+        self.drift_check_seconds = drift_check_seconds
+
+    def get(self, user_id: int) -> PortfolioModel:
+        """
+        Returns a user's portfolio, from memory when cached
+
+        Args:
+            user_id (int): Owner of the portfolio
+
+        Returns:
+            PortfolioModel: The portfolio
+        """
+        portfolio = self._cache.get(user_id)
+        if portfolio is None:
+            portfolio = self.refresh(user_id)
+        elif time.time() - portfolio.checked_at >= self.drift_check_seconds:
+            portfolio.check_drift()
+        return portfolio
+
+    def refresh(self, user_id: int) -> PortfolioModel:
+        """
+        Reloads a user's portfolio from the database, before changing it
+
+        Args:
+            user_id (int): Owner of the portfolio
+
+        Returns:
+            PortfolioModel: The reloaded portfolio
+        """
+        portfolio = self._cache.get(user_id) or PortfolioModel(user_id)
+        portfolio.reload()
+        self._cache.set(user_id, portfolio)
+        return portfolio
+
+    def update(self, user_id: int, change: Callable[[PortfolioModel], T]) -> T:
+        """
+        Applies a change to a user's portfolio, one change per user at a time
+
+        The change runs on a portfolio freshly reloaded from the database while the
+        user's lock is held, so concurrent requests of the same user in this worker
+        see each other's results. Other users are not blocked. If another worker
+        changed the account first, the commit fails its version check and the change
+        is retried on the reloaded portfolio.
+
+        Args:
+            user_id (int): Owner of the portfolio
+            change (Callable): Makes the change; called with the portfolio, possibly more than once
+
+        Returns:
+            The value returned by ``change``
+
+        Raises:
+            ConcurrentUpdateError: If every attempt lost to a concurrent change
+        """
+        with self._locks.hold(user_id):
+            for attempt in range(1, self.update_attempts + 1):
+                portfolio = self.refresh(user_id)
+                try:
+                    return change(portfolio)
+                except (StaleDataError, IntegrityError) as e:
+                    logger.info(f"Portfolio of user {user_id} changed concurrently (attempt {attempt}): {e}")
+
+        raise ConcurrentUpdateError("Your account changed while this request was processed; please retry")
+
+    def held_symbols(self, user_id: Optional[int] = None) -> List[str]:
+        """
+        Lists the symbols held in cached portfolios, without touching the database
+
+        Args:
+            user_id (int, optional): Only this user's holdings, if cached
+
+        Returns:
+            List[str]: The held symbols
+        """
+        if user_id is not None:
+            portfolio = self._cache.peek(user_id)
+            return list(portfolio.holdings) if portfolio is not None else []
+        return sorted({symbol for portfolio in self._cache.values() for symbol in portfolio.holdings})
+
+    def apply_price(self, symbol: str, price: float) -> None:
+        """
+        Applies a fresh price to every cached portfolio holding the symbol
+
+        Args:
+            symbol (str): Upper-cased stock symbol
+            price (float): Its latest price
+        """
+        for portfolio in self._cache.values():
+            if symbol in portfolio.holdings:
+                portfolio.apply_prices({symbol: price})
+
+    def invalidate(self, user_id: int) -> None:
+        """
+        Drops a user's cached portfolio
+
+        Args:
+            user_id (int): Owner of the portfolio
+        """
+        self._cache.invalidate(user_id)
+
+    def clear(self) -> None:
+        """Drops every cached portfolio."""
+        self._cache.clear()
+
+
+# Per-worker cache of the portfolios of active users
+portfolios = PortfolioStore()
+
+
+def init_app(app) -> None:
+    """
+    Applies the portfolio cache settings from the Flask config and subscribes the
+    cached portfolios to fresh quotes
+
+    Args:
+        app (Flask): The Flask application
+    """
+    from stockapp.models.stock_model import add_price_listener
+
+    portfolios.configure(
+        max_entries=app.config.get("PORTFOLIO_CACHE_MAX_ENTRIES", 1000),
+        ttl_seconds=app.config.get("PORTFOLIO_CACHE_TTL_SECONDS", 60),
+        drift_check_seconds=app.config.get("PORTFOLIO_DRIFT_CHECK_SECONDS", 300),
+    )
+    add_price_listener(portfolios.apply_price)
@@ -1,69 +1,112 @@
+import contextvars
 import logging
-import requests
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
 from stockapp.db import db
+from stockapp.models.daily_price_model import DailyPrices
+from stockapp.models.trade_model import BUY, SELL, Trades
+from stockapp.providers.registry import get_provider
+from stockapp.utils.analytics import compute_analytics
+from stockapp.utils.cache import analytics_cache, daily_series_cache, overview_cache, quote_cache
 from stockapp.utils.logger import configure_logger
-from stockapp.utils.api_utils import get_random
-from stockapp.models.portfolio_model import PortfolioModel
+from stockapp.utils.market_calendar import seconds_until_next_bar
+from stockapp.utils.money import cents_to_dollars, micros_to_dollars, to_micros, value_cents
+from stockapp.utils.price_refresher import price_refresher
+from stockapp.utils.single_flight import upstream_flights
+from stockapp.utils.symbol_index import symbol_index
 
-import os
 
+# Floor on the daily series lifetime so a late or missing bar is not re-requested on every lookup
+DAILY_SERIES_MIN_TTL_SECONDS = 15 * 60
+
+# A compact daily series covers the last 100 trading days, about 140 calendar days
+COMPACT_WINDOW_DAYS = 140
 
-api_key = os.getenv("ALPHA_VANTAGE_API_KEY")
+# Bounded pool used to fetch cache misses for several symbols concurrently
+price_fetch_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("PRICE_FETCH_MAX_WORKERS", 16)),
+    thread_name_prefix="price-fetch",
+)
 
 logger = logging.getLogger(__name__)
 configure_logger(logger)
 
-class Stocks(db.Model):
-    """Represents a stock in the catalog.
+# Dialects whose INSERT ... ON CONFLICT adds to a position in one statement; others
+# fall back to Stocks._add_to_position
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
 
-    Provides detailed information about a specific stock, including its current market
-    price, historical price data, and a brief description of the company.
+# Called with (symbol, price) whenever a fresh quote is stored
+_price_listeners: List[Callable[[str, float], None]] = []
 
-    Used in a Flask-SQLAlchemy application for playlist management,
-    user interaction, and data-driven song operations.
+class Stocks(db.Model):
+    """Represents a position held in a stock.
+
+    Each row holds the shares one user owns in a symbol and what they cost. The
+    class methods buy and sell positions and provide market data for a stock: its
+    current price, historical prices and a brief description of the company.
     """
 
     __tablename__ = "Stocks"
 
+    # Oldest quote an order may be filled at, so a cached price cannot drift far from the market
+    order_quote_max_age_seconds = 15.0
+
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)  # Owner, None for the shared portfolio
     symbol = db.Column(db.String, nullable=False)
     number_shares = db.Column(db.Integer, nullable=False)
-    purchase_price = db.Column(db.Float, nullable=False)  # Price per share
-    total_cost = db.Column(db.Float, nullable=False)      # Total cost at purchase
-
-
-    def validate(self) -> None:
-        """Validates the song instance before committing to the database.
+    total_cost_cents = db.Column(db.BigInteger, nullable=False)  # Cost of the shares held; sells remove their proportion, so the average price is derived from it
+
+    # One position per (user, symbol). NULLs never collide in a unique index, so the
+    # shared portfolio's positions get a partial index of their own.
+    __table_args__ = (
+        db.Index("ix_stocks_user_symbol", "user_id", "symbol", unique=True),
+        db.Index(
+            "ix_stocks_shared_symbol", "symbol", unique=True,
+            sqlite_where=db.text("user_id IS NULL"),
+            postgresql_where=db.text("user_id IS NULL"),
+        ),
+    )
 
-        Raises:
-            ValueError: If any required fields are invalid.
-        """
-        if not self.symbol or not isinstance(self.symbol, str):
-            raise ValueError("Stock must be a non-empty string.")
-        if not isinstance(self.number_shares, int) or self.number_shares <= 0:
-            raise ValueError("number_shares must be an integer > 0")
-    
     ##################################################
     ## Stocks Retrieval Functions
     ##################################################
 
     @classmethod
-    def buy_stock(cls, symbol: str, number_shares: int) -> None:
+    def buy_stock(
+        cls,
+        symbol: str,
+        number_shares: int,
+        quote: Optional[dict] = None,
+        user_id: Optional[int] = None,
+    ) -> dict:
         """
         Buys a new stock in the stocks table using SQLAlchemy.
 
+        The order is filled at ``quote`` when one is given, so a caller that already
+        priced the order (e.g. to check cash) does not price it a second time. The
+        position is created or grown by a single upsert on the (user_id, symbol) index.
+
         Args:
             symbol (str): The stocks symbol.
             number_shares (int): number of shares the user wishes to buy.
+            quote (dict, optional): Quote to fill at, from get_stock_price. Fetched if omitted.
+            user_id (int, optional): Owner of the position, None for the shared portfolio.
+
+        Returns:
+            dict: The fill, with symbol, shares, price_micros and total_cents.
 
         Raises:
-            ValueError: If any field is invalid or if a song with the same compound key already exists.
+            ValueError: If the number of shares is invalid or the quote cannot fill the order.
             SQLAlchemyError: For any other database-related issues.
         """
-            
         logger.info(f"Request recieved to buy {number_shares} shares of {symbol}")
 
         try:
@@ -71,36 +114,12 @@ class Stocks(db.Model):
             if number_shares <= 0:
                 raise ValueError("Number of shares must be greater than 0")
 
-            # Lookup price using Alpha Vantage
-            stock_info = cls.get_stock_price(symbol)
-            price = stock_info["price"]
-            total_cost = price * number_shares
-
-            # Check if stock already exists
-            stock = Stocks.query.filter_by(symbol=symbol).first()
-            if stock:
-                # Average cost update (optional: keep it simple here)
-                total_shares = stock.number_shares + number_shares
-                new_total_cost = stock.total_cost + total_cost
-                new_avg_price = new_total_cost / total_shares
-
-                stock.number_shares = total_shares
-                stock.total_cost = new_total_cost
-                stock.purchase_price = new_avg_price
-
-                db.session.commit()
-            else:
-                new_stock = Stocks()
-                new_stock.symbol=symbol
-                new_stock.number_shares=number_shares
-                new_stock.purchase_price=price
-                new_stock.total_cost=total_cost
-
-                new_stock.validate()
-                db.session.add(new_stock)
-                db.session.commit()
-
-            logger.info(f"Bought {number_shares} shares of {symbol} at ${price:.2f} per share (Total: ${total_cost:.2f})")
+            stock_info = cls.order_quote(symbol, quote)
+            fill = cls.stage_buy(symbol, number_shares, to_micros(stock_info["price"]), user_id)
+            db.session.commit()
+            summary = fill_to_dict(fill)
+            logger.info(f"Bought {number_shares} shares of {symbol} at ${summary['price']:.2f} per share (Total: ${summary['total']:.2f})")
+            return fill
 
         except (ValueError, SQLAlchemyError) as e:
             db.session.rollback()
@@ -108,110 +127,177 @@ class Stocks(db.Model):
             raise
 
     @classmethod
-    def sell_stock(cls, symbol: str, number_shares: int) -> None:
+    def sell_stock(
+        cls,
+        symbol: str,
+        number_shares: int,
+        quote: Optional[dict] = None,
+        user_id: Optional[int] = None,
+    ) -> dict:
         """
         Permanently sells stock from the portfolio its symbol.
 
+        The position is reduced by one guarded UPDATE on the (user_id, symbol) index,
+        which only matches while enough shares are held, and deleted once empty.
+
         Args:
             symbol (str): The symbol of the stock to sell
             number_shares (int): Number of shares of specified stock to sell
+            quote (dict, optional): Quote to fill at, from get_stock_price. Fetched if omitted.
+            user_id (int, optional): Owner of the position, None for the shared portfolio.
+
+        Returns:
+            dict: The fill, with symbol, shares, price_micros and total_cents.
 
         Raises:
             ValueError: If the stock with the given symbol does not exist.
             SQLAlchemyError: For any database-related issues.
         """
-        logger.info(f"Request recieved to sell {number_shares} shares of {symbol}")   
+        logger.info(f"Request recieved to sell {number_shares} shares of {symbol}")
         try:
             symbol = symbol.upper()
             if number_shares <= 0:
                 raise ValueError("Number of shares must be greater than 0")
-            
-            
-            
-            stock = Stocks.query.filter_by(symbol=symbol).first()
-            if stock is None:
-                raise ValueError(f"Cannot sell stock you don't own")
-
-            if stock.number_shares < number_shares:
-                raise ValueError(f"Cannot sell more shares than owned")
-            # Lookup price using Alpha Vantage
-            stock_info = cls.get_stock_price(symbol)
-            price = stock_info["price"]
-            total_cost = price * number_shares
-
-            # Check if stock already exists
-            # Average cost update (optional: keep it simple here)
-            total_shares = stock.number_shares - number_shares
-            new_total_cost = stock.total_cost - total_cost
-            if total_shares == 0:
-                new_avg_price = 0
-            else:
-                new_avg_price = new_total_cost/total_shares
-
-            stock.number_shares -= number_shares
-            stock.total_cost = new_total_cost
-            stock.purchase_price = new_avg_price
-
-            if stock.number_shares == 0:
-                db.session.delete(stock)
 
+            if quote is None:
+                # Check the position before spending an upstream call on pricing it
+                cls._check_sellable(cls.get_position(symbol, user_id), number_shares)
+            stock_info = cls.order_quote(symbol, quote)
+            fill = cls.stage_sell(symbol, number_shares, to_micros(stock_info["price"]), user_id)
             db.session.commit()
-            logger.info(f"Sold {number_shares} shares of {symbol} at ${price:.2f} per share (Total: ${total_cost:.2f})")
+            summary = fill_to_dict(fill)
+            logger.info(f"Sold {number_shares} shares of {symbol} at ${summary['price']:.2f} per share (Total: ${summary['total']:.2f})")
+            return fill
 
         except (ValueError, SQLAlchemyError) as e:
             db.session.rollback()
             logger.error(f"Error selling stock {symbol}: {str(e)}")
             raise
 
+    @classmethod
+    def stage_buy(cls, symbol: str, number_shares: int, price_micros: int, user_id: Optional[int] = None) -> dict:
+        """
+        Adds shares to a position and records the fill, without committing
+
+        Lets a caller commit several orders, and the cash paying for them, in one transaction.
+
+        Args:
+            symbol (str): Upper-cased stock symbol
+            number_shares (int): Shares bought
+            price_micros (int): Fill price per share, in micro-dollars
+            user_id (int, optional): Owner of the position, None for the shared portfolio
+
+        Returns:
+            dict: The fill, with symbol, shares, price_micros and total_cents
+        """
+        total_cents = value_cents(number_shares, price_micros)
+        fill = {"symbol": symbol, "shares": number_shares, "price_micros": price_micros, "total_cents": total_cents}
+        if db.engine.dialect.name in _UPSERT_INSERTS:
+            db.session.execute(cls._upsert_position(user_id, symbol, number_shares, total_cents))
+        else:
+            cls._add_to_position(user_id, symbol, number_shares, total_cents)
+        Trades.record_fill(user_id, BUY, fill)
+        return fill
+
+    @classmethod
+    def stage_sell(cls, symbol: str, number_shares: int, price_micros: int, user_id: Optional[int] = None) -> dict:
+        """
+        Removes shares from a position and records the fill, without committing
+
+        Args:
+            symbol (str): Upper-cased stock symbol
+            number_shares (int): Shares sold
+            price_micros (int): Fill price per share, in micro-dollars
+            user_id (int, optional): Owner of the position, None for the shared portfolio
+
+        Returns:
+            dict: The fill, with symbol, shares, price_micros and total_cents
+
+        Raises:
+            ValueError: If the position does not hold enough shares
+        """
+        total_cents = value_cents(number_shares, price_micros)
+
+        # Reduce the position only if it still holds enough shares, in one statement. The
+        # cost falls by the sold shares' proportion of it, so the average price is kept
+        reduced = db.session.execute(
+            db.update(Stocks)
+            .where(*cls._position_key(symbol, user_id), Stocks.number_shares >= number_shares)
+            .values(
+                number_shares=Stocks.number_shares - number_shares,
+                total_cost_cents=(
+                    Stocks.total_cost_cents - Stocks.total_cost_cents * number_shares // Stocks.number_shares
+                ),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if reduced.rowcount == 0:
+            cls._check_sellable(cls.get_position(symbol, user_id), number_shares)
+            raise ValueError(f"Cannot sell more shares than owned")
+
+        db.session.execute(
+            db.delete(Stocks)
+            .where(*cls._position_key(symbol, user_id), Stocks.number_shares == 0)
+            .execution_options(synchronize_session=False)
+        )
+        fill = {"symbol": symbol, "shares": number_shares, "price_micros": price_micros, "total_cents": total_cents}
+        Trades.record_fill(user_id, SELL, fill)
+        return fill
+
+    @classmethod
+    def get_position(cls, symbol: str, user_id: Optional[int] = None) -> Optional["Stocks"]:
+        """
+        Reads one position through the (user_id, symbol) index
+
+        Args:
+            symbol (str): Upper-cased stock symbol
+            user_id (int, optional): Owner of the position, None for the shared portfolio
+
+        Returns:
+            Stocks: The position, or None if none is held
+        """
+        return cls.query.filter(*cls._position_key(symbol, user_id)).one_or_none()
+
 
     @classmethod
     def look_up_stock(cls, symbol: str) -> dict:
+        """
+        Provides the current price, company overview and recent history of a stock
+
+        The quote, overview and any missing daily bars are fetched concurrently and
+        each is cached for its own lifetime: the quote for the quote TTL, the overview
+        for days, and the daily bars in the DailyPrices table, which is only updated
+        once the next trading day's bar is published.
+
+        Args:
+            symbol (str): Symbol of stock user wishes to look up
+
+        Returns:
+            dict: Symbol, company details, current price and the last 7 daily bars
+
+        Raises:
+            ValueError: If no price or company info exists for the symbol
+        """
         try:
-            symbol = symbol.upper()
+            symbol = symbol_index.validate(symbol)
+            outputsize = cls._daily_sync_outputsize(symbol)
 
-            # Current price
-            quote_url = (
-                f"https://www.alphavantage.co/query"
-                f"?function=GLOBAL_QUOTE&symbol={symbol}&apikey={api_key}"
-            )
-            quote_response = requests.get(quote_url)
-            quote_data = quote_response.json().get("Global Quote", {})
+            quote_future = _submit(cls.get_stock_price, symbol)
+            overview_future = _submit(cls._get_overview, symbol)
+            history_future = _submit(cls._fetch_daily_bars, symbol, outputsize) if outputsize else None
 
-            if "05. price" not in quote_data:
+            try:
+                current_price = quote_future.result()["price"]
+            except ValueError:
                 raise ValueError(f"No current price found for '{symbol}'.")
 
-            current_price = float(quote_data["05. price"])
-
-            # Company info
-            overview_url = (
-                f"https://www.alphavantage.co/query"
-                f"?function=OVERVIEW&symbol={symbol}&apikey={api_key}"
-            )
-            overview_response = requests.get(overview_url)
-            overview_data = overview_response.json()
+            overview_data = overview_future.result()
 
-            if "Name" not in overview_data:
-                raise ValueError(f"No company info found for '{symbol}'.")
+            if history_future is not None:
+                cls._store_daily_bars(symbol, history_future.result())
 
             # Historical price data (last 7 days)
-            history_url = (
-                f"https://www.alphavantage.co/query"
-                f"?function=TIME_SERIES_DAILY_ADJUSTED&symbol={symbol}&apikey={api_key}"
-            )
-            history_response = requests.get(history_url)
-            history_data = history_response.json().get("Time Series (Daily)", {})
-
-            # Convert history to recent 7-day list of prices
-            recent_history = []
-            for date, daily_data in list(history_data.items())[:7]:
-                recent_history.append({
-                    "date": date,
-                    "open": float(daily_data["1. open"]),
-                    "high": float(daily_data["2. high"]),
-                    "low": float(daily_data["3. low"]),
-                    "close": float(daily_data["4. close"]),
-                    "volume": int(daily_data["6. volume"]),
-                })
+            recent_history = [bar.to_dict() for bar in DailyPrices.get_history(symbol, limit=7)]
 
             return {
                 "symbol": symbol,
@@ -225,42 +311,632 @@ class Stocks(db.Model):
             logger.error(f"Error looking up stock {symbol}: {str(e)}")
             raise
 
+    @classmethod
+    def lookup_state(cls, symbol: str) -> Optional[Tuple]:
+        """
+        Identifies the result look_up_stock would give from the caches alone
+
+        Args:
+            symbol (str): Symbol of stock user wishes to look up
+
+        Returns:
+            tuple: The same parts as rendered_lookup_state, or None if the quote, the
+                overview or the daily bars would have to be fetched
+
+        Raises:
+            ValueError: If the symbol is not valid
+        """
+        symbol = symbol_index.validate(symbol)
+        quote = quote_cache.peek(symbol)
+        overview = overview_cache.peek(symbol)
+        latest = daily_series_cache.peek(symbol)
+        if quote is None or overview is None or latest is None:
+            return None
+        return (
+            symbol,
+            quote["price"],
+            overview.get("Name"),
+            overview.get("Description"),
+            overview.get("Sector"),
+            None if latest == date.min else latest.isoformat(),
+        )
+
+    @staticmethod
+    def rendered_lookup_state(stock_info: dict) -> Tuple:
+        """
+        Identifies a result of look_up_stock by its content
+
+        Args:
+            stock_info (dict): A result of look_up_stock
+
+        Returns:
+            tuple: The symbol, current price, company details and latest bar date
+        """
+        history = stock_info["historical_prices"]
+        return (
+            stock_info["symbol"],
+            stock_info["current_price"],
+            stock_info["name"],
+            stock_info["description"],
+            stock_info["sector"],
+            history[0]["date"] if history else None,
+        )
+
+    @classmethod
+    def cached_prices(cls, symbols: Iterable[str]) -> Dict[str, float]:
+        """
+        Reads the prices of live cached quotes, without fetching any
+
+        Args:
+            symbols (Iterable[str]): Stock symbols
+
+        Returns:
+            Dict[str, float]: Maps each symbol with a live quote to its price
+        """
+        prices = {}
+        for symbol in symbols:
+            quote = quote_cache.peek(symbol.upper())
+            if quote is not None:
+                prices[symbol] = quote["price"]
+        return prices
+
+    @classmethod
+    def cached_quote_versions(cls, symbols: Iterable[str]) -> Optional[Tuple]:
+        """
+        Identifies the cached quotes for a set of symbols without fetching any
+
+        Args:
+            symbols (Iterable[str]): Stock symbols
+
+        Returns:
+            tuple: Each symbol with its cached price, or None if any has no live quote
+        """
+        versions = []
+        for symbol in symbols:
+            quote = quote_cache.peek(symbol.upper())
+            if quote is None:
+                return None
+            versions.append((symbol, quote["price"]))
+        return tuple(versions)
+
+    @classmethod
+    def get_price_history(
+        cls,
+        symbol: str,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        limit: Optional[int] = None,
+    ) -> List[DailyPrices]:
+        """
+        Provides stored daily bars for a stock, newest first
+
+        Missing days are fetched from the provider first: the whole history the
+        first time a symbol is seen, and only the recent days afterwards.
+
+        Args:
+            symbol (str): Symbol of stock user wishes to look up
+            start (date, optional): Earliest bar date to include
+            end (date, optional): Latest bar date to include
+            limit (int, optional): Maximum number of bars to return
+
+        Returns:
+            List[DailyPrices]: The matching bars
+        """
+        try:
+            symbol = symbol_index.validate(symbol)
+            cls._sync_daily_bars(symbol)
+
+            return DailyPrices.get_history(symbol, limit=limit, start=start, end=end)
+        except Exception as e:
+            logger.error(f"Error reading price history for {symbol}: {str(e)}")
+            raise
+
+    @classmethod
+    def get_analytics(cls, symbol: str) -> dict:
+        """
+        Provides return, volatility, moving average, drawdown and 52-week statistics
+
+        Statistics are computed with NumPy over the full stored daily history and
+        memoized per (symbol, latest bar date), so they are recomputed once per new
+        bar. Adjusted closes are used when every bar has one.
+
+        Args:
+            symbol (str): Symbol of stock user wishes to analyse
+
+        Returns:
+            dict: The statistics and the recent per-day series, see compute_analytics
+
+        Raises:
+            ValueError: If the symbol is unknown or has no stored history
+        """
+        try:
+            symbol = symbol_index.validate(symbol)
+            latest = cls._sync_daily_bars(symbol)
+            if latest is None:
+                raise ValueError(f"No price history found for '{symbol}'.")
+
+            key = (symbol, latest)
+            analytics = analytics_cache.get(key)
+            if analytics is not None:
+                logger.debug(f"{symbol} analytics served from cache")
+                return analytics
+
+            dates, highs, lows, closes, adjusted_closes = zip(*DailyPrices.get_series(symbol))
+            if None not in adjusted_closes:
+                closes = adjusted_closes
+
+            analytics = dict(compute_analytics(dates, highs, lows, closes), symbol=symbol)
+            analytics_cache.set(key, analytics)
+            logger.info(f"Computed analytics for {symbol} over {len(dates)} bars")
+            return analytics
+        except Exception as e:
+            logger.error(f"Error computing analytics for {symbol}: {str(e)}")
+            raise
+
+    @classmethod
+    def sync_price_histories(cls, symbols: Iterable[str]) -> None:
+        """
+        Brings the stored daily bars of several symbols up to date
+
+        Symbols whose bars are stale are fetched concurrently, then stored from the
+        calling thread. Failures are logged and leave that symbol's history as it was.
+
+        Args:
+            symbols (Iterable[str]): Upper-cased stock symbols
+        """
+        futures = {}
+        for symbol in symbols:
+            outputsize = cls._daily_sync_outputsize(symbol)
+            if outputsize:
+                futures[symbol] = _submit(cls._fetch_daily_bars, symbol, outputsize)
+
+        for symbol, future in futures.items():
+            try:
+                cls._store_daily_bars(symbol, future.result())
+            except Exception as e:
+                logger.warning(f"Could not update price history for {symbol}: {e}")
+
     ##################################################
     ## Stocks Helper Functions
     ##################################################
 
     @classmethod
-    def get_stock_price(cls, symbol: str) -> dict:
+    def get_stock_price(cls, symbol: str, max_age: Optional[float] = None) -> dict:
         """
         Provides details about specific stock from its symbol
 
+        Quotes are served from the process-wide quote cache while fresh, so repeated
+        lookups of the same symbol only reach the provider once per TTL.
+
         Args:
             symbol (str): Symbol of stock user wishes to look up
+            max_age (float, optional): Refetch a cached quote older than this many seconds
 
         Raises: 
             ValueError: If the stock with given symbol does not exist
             SQLAlchemyError: For any database-related issues.
         """
         try:
-            symbol = symbol.upper()
-            url = (
-                f"https://www.alphavantage.co/query"
-                f"?function=GLOBAL_QUOTE&symbol={symbol}&apikey={api_key}"
-            )
-            response = requests.get(url)
-            data = response.json()
+            symbol = symbol_index.validate(symbol)
+            price_refresher.track([symbol])
 
-            quote = data.get("Global Quote")
-            if not quote or "05. price" not in quote:
-                raise ValueError(f"No price data found for symbol '{symbol}'.")
+            cached_quote = quote_cache.get(symbol)
+            if cached_quote is not None and (max_age is None or quote_age(cached_quote) <= max_age):
+                logger.debug(f"{symbol} price fetched from cache")
+                return dict(cached_quote)
 
-            return {
-                "symbol": symbol,
-                "price": float(quote["05. price"]),
-                "volume": int(quote["06. volume"]),
-                "latest_trading_day": quote["07. latest trading day"],
-            }
+            return cls._fetch_quote(symbol)
 
         except Exception as e:
             logger.error(f"Error looking up stock {symbol}: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+
+    @classmethod
+    def get_stock_prices(cls, symbols: Iterable[str], max_age: Optional[float] = None) -> Dict[str, dict]:
+        """
+        Provides quotes for many symbols in one call
+
+        Cached quotes are returned directly and the remaining symbols are fetched
+        concurrently on a bounded thread pool, so pricing a cold portfolio costs
+        about one upstream round trip instead of one per holding. When the background
+        refresher is running, expired quotes are returned with their ``age_seconds``
+        instead of blocking on a fetch, unless ``max_age`` is given.
+
+        Args:
+            symbols (Iterable[str]): Symbols of the stocks to price
+            max_age (float, optional): Refetch cached quotes older than this many seconds
+
+        Returns:
+            Dict[str, dict]: Maps each upper-cased symbol to its quote. Symbols whose
+                price could not be fetched are logged and left out.
+        """
+        valid = set()
+        for symbol in symbols:
+            try:
+                valid.add(symbol_index.validate(symbol))
+            except ValueError as e:
+                logger.info(f"Not pricing {symbol}: {e}")
+        symbols = valid
+        price_refresher.track(symbols)
+
+        quotes = {}
+        misses = []
+        stale = []
+        for symbol in symbols:
+            cached_quote = quote_cache.get(symbol)
+            if cached_quote is not None and (max_age is None or quote_age(cached_quote) <= max_age):
+                quotes[symbol] = dict(cached_quote)
+                continue
+
+            # While the background refresher runs, serve an expired quote and let it catch up
+            stale_quote = quote_cache.get_stale(symbol) if price_refresher.running and max_age is None else None
+            if stale_quote is not None:
+                cached_quote, age = stale_quote
+                quotes[symbol] = dict(cached_quote, age_seconds=round(age, 1))
+                stale.append(symbol)
+            else:
+                misses.append(symbol)
+
+        if stale:
+            logger.info(f"Serving {len(stale)} stale quotes while they refresh")
+            price_refresher.request_refresh(stale)
+
+        quotes.update(cls.refresh_stock_prices(misses))
+        return quotes
+
+    @classmethod
+    def refresh_stock_prices(cls, symbols: Iterable[str]) -> Dict[str, dict]:
+        """
+        Fetches fresh quotes for many symbols concurrently, bypassing the cache
+
+        Args:
+            symbols (Iterable[str]): Upper-cased stock symbols
+
+        Returns:
+            Dict[str, dict]: Maps each symbol to its new quote. Symbols whose price
+                could not be fetched are logged and left out.
+        """
+        symbols = list(symbols)
+        if not symbols:
+            return {}
+
+        logger.info(f"Fetching {len(symbols)} quotes concurrently")
+        quotes = {}
+        futures = {_submit(cls._fetch_quote, symbol): symbol for symbol in symbols}
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                quotes[symbol] = future.result()
+            except Exception as e:
+                logger.warning(f"Could not fetch price for {symbol}: {e}")
+
+        return quotes
+
+    @classmethod
+    def order_quote(cls, symbol: str, quote: Optional[dict]) -> dict:
+        """
+        Returns the quote an order for ``symbol`` is filled at
+
+        Args:
+            symbol (str): Upper-cased stock symbol
+            quote (dict, optional): Quote supplied by the caller, fetched if None
+
+        Returns:
+            dict: A quote for ``symbol`` at most order_quote_max_age_seconds old
+
+        Raises:
+            ValueError: If the supplied quote is for another symbol or too old
+        """
+        if quote is None:
+            return cls.get_stock_price(symbol, max_age=cls.order_quote_max_age_seconds)
+
+        quoted_symbol = quote.get("symbol", symbol).upper()
+        if quoted_symbol != symbol:
+            raise ValueError(f"Quote for {quoted_symbol} cannot fill an order for {symbol}")
+
+        age = quote_age(quote)
+        if age > cls.order_quote_max_age_seconds:
+            raise ValueError(
+                f"Quote for {symbol} is {age:.0f}s old, orders need one under {cls.order_quote_max_age_seconds:.0f}s"
+            )
+        return quote
+
+    @classmethod
+    def _fetch_quote(cls, symbol: str) -> dict:
+        """
+        Fetches a quote from the market-data provider and stores it in the quote cache
+
+        Concurrent fetches of the same symbol are coalesced into one upstream call.
+
+        Args:
+            symbol (str): Upper-cased stock symbol
+
+        Returns:
+            dict: Symbol, price, volume and latest trading day
+
+        Raises:
+            ValueError: If the provider has no price for the symbol
+        """
+        stock_info = upstream_flights.do(("GLOBAL_QUOTE", symbol), lambda: cls._load_quote(symbol))
+        return dict(stock_info)
+
+    @classmethod
+    def _load_quote(cls, symbol: str) -> dict:
+        """Requests a quote from the provider, stamps it with its fetch time, then caches it. See _fetch_quote."""
+        try:
+            stock_info = dict(get_provider().get_quote(symbol), fetched_at=time.time())
+        except ValueError:
+            symbol_index.remember_unknown(symbol)
+            raise
+        quote_cache.set(symbol, stock_info)
+        for listener in _price_listeners:
+            try:
+                listener(symbol, stock_info["price"])
+            except Exception as e:
+                logger.error(f"Price listener failed for {symbol}: {e}")
+        return stock_info
+
+    @staticmethod
+    def _position_key(symbol: str, user_id: Optional[int]) -> tuple:
+        """Returns the filter clauses selecting one position; None matches the shared portfolio."""
+        return (Stocks.user_id.is_(None) if user_id is None else Stocks.user_id == user_id, Stocks.symbol == symbol)
+
+    @staticmethod
+    def _check_sellable(position: Optional["Stocks"], number_shares: int) -> None:
+        """Raises ValueError if ``position`` cannot cover a sale of ``number_shares``."""
+        if position is None:
+            raise ValueError(f"Cannot sell stock you don't own")
+        if position.number_shares < number_shares:
+            raise ValueError(f"Cannot sell more shares than owned")
+
+    @staticmethod
+    def _upsert_position(user_id: Optional[int], symbol: str, number_shares: int, total_cents: int):
+        """
+        Builds one INSERT ... ON CONFLICT statement adding shares to a position
+
+        A new position is inserted as bought. An existing one grows by
+        ``number_shares`` and ``total_cents``, computed by the database from the row
+        it holds.
+
+        Args:
+            user_id (int, optional): Owner of the position, None for the shared portfolio
+            symbol (str): Upper-cased stock symbol
+            number_shares (int): Shares bought
+            total_cents (int): Cost of the shares bought, in cents
+
+        Returns:
+            Insert: The statement, for a dialect in _UPSERT_INSERTS
+        """
+        statement = _UPSERT_INSERTS[db.engine.dialect.name](Stocks).values(
+            user_id=user_id,
+            symbol=symbol,
+            number_shares=number_shares,
+            total_cost_cents=total_cents,
+        )
+        if user_id is None:
+            target = {"index_elements": ["symbol"], "index_where": db.text("user_id IS NULL")}
+        else:
+            target = {"index_elements": ["user_id", "symbol"]}
+        return statement.on_conflict_do_update(
+            **target,
+            set_={
+                "number_shares": Stocks.number_shares + statement.excluded.number_shares,
+                "total_cost_cents": Stocks.total_cost_cents + statement.excluded.total_cost_cents,
+            },
+        )
+
+    @staticmethod
+    def _add_to_position(user_id: Optional[int], symbol: str, number_shares: int, total_cents: int) -> None:
+        """
+        Adds shares to a position on databases without INSERT ... ON CONFLICT
+
+        The existing position grows in one UPDATE computed by the database; a new one
+        is inserted if none matched. Two first buys racing for the same position are
+        kept apart by the unique index, which fails the later one.
+
+        Args:
+            user_id (int, optional): Owner of the position, None for the shared portfolio
+            symbol (str): Upper-cased stock symbol
+            number_shares (int): Shares bought
+            total_cents (int): Cost of the shares bought, in cents
+        """
+        updated = Stocks.query.filter(*Stocks._position_key(symbol, user_id)).update(
+            {
+                Stocks.number_shares: Stocks.number_shares + number_shares,
+                Stocks.total_cost_cents: Stocks.total_cost_cents + total_cents,
+            },
+            synchronize_session=False,
+        )
+        if not updated:
+            db.session.add(Stocks(
+                user_id=user_id,
+                symbol=symbol,
+                number_shares=number_shares,
+                total_cost_cents=total_cents,
+            ))
+            db.session.flush()
+
+    @classmethod
+    def _get_overview(cls, symbol: str) -> dict:
+        """
+        Provides the company overview from the market-data provider, cached for days
+
+        Args:
+            symbol (str): Upper-cased stock symbol
+
+        Returns:
+            dict: The OVERVIEW payload
+
+        Raises:
+            ValueError: If the provider has no company info for the symbol
+        """
+        overview_data = overview_cache.get(symbol)
+        if overview_data is not None:
+            return overview_data
+
+        return upstream_flights.do(("OVERVIEW", symbol), lambda: cls._load_overview(symbol))
+
+    @classmethod
+    def _load_overview(cls, symbol: str) -> dict:
+        """Requests an overview from the provider, then caches it. See _get_overview."""
+        overview_data = get_provider().get_overview(symbol)
+        overview_cache.set(symbol, overview_data)
+        return overview_data
+
+    @classmethod
+    def _daily_sync_outputsize(cls, symbol: str) -> Optional[str]:
+        """
+        Decides whether the stored daily bars of a symbol need an upstream update
+
+        Symbols are marked as current in the daily series cache until their next bar
+        is due, so a current symbol costs neither a query nor an upstream call.
+
+        Args:
+            symbol (str): Upper-cased stock symbol
+
+        Returns:
+            str: "full" to backfill, "compact" to fetch recent days only, or None if current
+        """
+        if daily_series_cache.get(symbol) is not None:
+            return None
+
+        latest = DailyPrices.latest_date(symbol)
+        if latest is not None:
+            wait = seconds_until_next_bar(latest)
+            if wait > 0:
+                daily_series_cache.set(symbol, latest, ttl=wait)
+                return None
+
+        if latest is None or (date.today() - latest).days > COMPACT_WINDOW_DAYS:
+            return "full"
+        return "compact"
+
+    @classmethod
+    def _sync_daily_bars(cls, symbol: str) -> Optional[date]:
+        """
+        Brings the stored daily bars of a symbol up to date
+
+        Args:
+            symbol (str): Upper-cased stock symbol
+
+        Returns:
+            date: The latest stored bar date, or None if the symbol has no bars
+        """
+        outputsize = cls._daily_sync_outputsize(symbol)
+        if outputsize:
+            cls._store_daily_bars(symbol, cls._fetch_daily_bars(symbol, outputsize))
+
+        latest = daily_series_cache.get(symbol)
+        if latest is None:
+            latest = DailyPrices.latest_date(symbol)
+        return None if latest in (None, date.min) else latest
+
+    @classmethod
+    def _fetch_daily_bars(cls, symbol: str, outputsize: str) -> List[dict]:
+        """
+        Fetches daily bars from the provider, coalescing concurrent identical fetches
+
+        Args:
+            symbol (str): Upper-cased stock symbol
+            outputsize (str): "compact" for the last 100 days or "full" for all history
+
+        Returns:
+            List[dict]: Date, open, high, low, close, adjusted close and volume, newest first
+        """
+        return upstream_flights.do(
+            ("TIME_SERIES_DAILY_ADJUSTED", symbol, outputsize),
+            lambda: get_provider().get_daily_bars(symbol, outputsize),
+        )
+
+    @classmethod
+    def _store_daily_bars(cls, symbol: str, bars: List[dict]) -> None:
+        """
+        Stores fetched bars and marks the symbol current until its next bar is due
+
+        Args:
+            symbol (str): Upper-cased stock symbol
+            bars (List[dict]): Bars returned by _fetch_daily_bars
+        """
+        DailyPrices.store_bars(symbol, bars)
+
+        latest = DailyPrices.latest_date(symbol)
+        ttl = DAILY_SERIES_MIN_TTL_SECONDS
+        if latest is not None:
+            ttl = max(seconds_until_next_bar(latest), DAILY_SERIES_MIN_TTL_SECONDS)
+        daily_series_cache.set(symbol, latest or date.min, ttl=ttl)
+
+
+def _submit(fn, *args) -> Future:
+    """
+    Runs ``fn`` on the price-fetch pool in a copy of the caller's context
+
+    Copying the context carries the caller's upstream priority and user into the
+    worker thread, so the call budget schedules pooled fetches correctly.
+
+    Args:
+        fn (Callable): The function to run
+        *args: Arguments for ``fn``
+
+    Returns:
+        Future: The pending result
+    """
+    context = contextvars.copy_context()
+    return price_fetch_executor.submit(context.run, fn, *args)
+
+
+def add_price_listener(listener: Callable[[str, float], None]) -> None:
+    """
+    Registers a callable to be told of every fresh quote
+
+    Listeners run on the thread that fetched the quote and must be quick and thread-safe.
+
+    Args:
+        listener (Callable): Called with the upper-cased symbol and its new price
+    """
+    if listener not in _price_listeners:
+        _price_listeners.append(listener)
+
+
+def fill_to_dict(fill: dict) -> dict:
+    """
+    Converts a fill into the dict shape returned by the API
+
+    Args:
+        fill (dict): A fill from Stocks.stage_buy or Stocks.stage_sell
+
+    Returns:
+        dict: Symbol, shares, the price and total in dollars, and the total in cents
+    """
+    return {
+        "symbol": fill["symbol"],
+        "shares": fill["shares"],
+        "price": micros_to_dollars(fill["price_micros"]),
+        "total": cents_to_dollars(fill["total_cents"]),
+        "total_cents": fill["total_cents"],
+    }
+
+
+def quote_age(quote: dict) -> float:
+    """
+    Returns the seconds since a quote was fetched
+
+    Args:
+        quote (dict): A quote from get_stock_price
+
+    Returns:
+        float: Age in seconds, infinite if the quote carries no fetch time
+    """
+    fetched_at = quote.get("fetched_at")
+    if fetched_at is None:
+        return float("inf")
+    return time.time() - fetched_at
+
+
+def init_app(app) -> None:
+    """
+    Applies the order quote age limit from the Flask config
+
+    Args:
+        app (Flask): The Flask application
+    """
+    Stocks.order_quote_max_age_seconds = app.config.get("ORDER_QUOTE_MAX_AGE_SECONDS", 15.0)
@@ -0,0 +1,431 @@
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
+
+from stockapp.db import db
+from stockapp.utils.logger import configure_logger
+from stockapp.utils.market_calendar import BAR_PUBLISH_TIME_UTC
+from stockapp.utils.money import cents_to_dollars, micros_to_dollars
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+BUY = "buy"
+SELL = "sell"
+DEPOSIT = "deposit"
+WITHDRAWAL = "withdrawal"
+RESET = "reset"  # A position removed by resetting the Stocks table
+
+
+class Trades(db.Model):
+    """Represents one entry in the append-only ledger of fills and cash movements.
+
+    The ledger is the record of what happened to an account. Positions in the
+    Stocks table and balances in the Accounts table are projections of it, updated
+    in the same transaction as each entry is written, and can be rebuilt from it
+    with ``flask ledger rebuild``. Entries are never updated or deleted, except
+    that purge_users removes the ledgers of deleted users.
+
+    Amounts are integers: prices in micro-dollars and cash in cents.
+    """
+
+    __tablename__ = "Trades"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)  # Ledger sequence number
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)  # None for the shared portfolio
+    kind = db.Column(db.String, nullable=False)  # buy, sell, deposit, withdrawal or reset
+    symbol = db.Column(db.String, nullable=True)  # None for cash movements
+    shares = db.Column(db.Integer, nullable=False, default=0)
+    price_micros = db.Column(db.BigInteger, nullable=True)  # Fill price per share
+    cash_change_cents = db.Column(db.BigInteger, nullable=False)  # Signed change to the cash balance
+    executed_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc).replace(tzinfo=None))
+
+    __table_args__ = (db.Index("ix_trades_user_id_id", "user_id", "id"),)
+
+    def to_dict(self) -> dict:
+        """
+        Converts the entry into the dict shape returned by the API
+
+        Returns:
+            dict: Id, kind, symbol, shares, price and cash change in dollars, cash change
+                in cents, and UTC execution time
+        """
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "symbol": self.symbol,
+            "shares": self.shares,
+            "price": micros_to_dollars(self.price_micros) if self.price_micros is not None else None,
+            "cash_change": cents_to_dollars(self.cash_change_cents),
+            "cash_change_cents": self.cash_change_cents,
+            "executed_at": self.executed_at.isoformat() + "Z",
+        }
+
+    @property
+    def share_change(self) -> int:
+        """Signed change to the position in ``symbol``."""
+        return -self.shares if self.kind in (SELL, RESET) else self.shares
+
+    @property
+    def valued_from(self) -> date:
+        """First trading day whose close includes this entry; later than its date if made after the bar."""
+        if self.executed_at.time() >= BAR_PUBLISH_TIME_UTC:
+            return self.executed_at.date() + timedelta(days=1)
+        return self.executed_at.date()
+
+    ##################################################
+    ## Ledger Update Functions
+    ##################################################
+
+    @classmethod
+    def record_fill(cls, user_id: Optional[int], kind: str, fill: dict) -> "Trades":
+        """
+        Adds a buy or sell fill to the session, to be committed with its position
+
+        Args:
+            user_id (int, optional): Owner of the position, None for the shared portfolio
+            kind (str): BUY or SELL
+            fill (dict): The fill, with symbol, shares, price_micros and total_cents
+
+        Returns:
+            Trades: The staged entry
+        """
+        entry = cls(
+            user_id=user_id,
+            kind=kind,
+            symbol=fill["symbol"],
+            shares=fill["shares"],
+            price_micros=fill["price_micros"],
+            cash_change_cents=-fill["total_cents"] if kind == BUY else fill["total_cents"],
+        )
+        db.session.add(entry)
+        return entry
+
+    @classmethod
+    def record_cash(cls, user_id: int, kind: str, amount_cents: int) -> "Trades":
+        """
+        Adds a deposit or withdrawal to the session, to be committed with the balance
+
+        Args:
+            user_id (int): Owner of the account
+            kind (str): DEPOSIT or WITHDRAWAL
+            amount_cents (int): The positive amount moved, in cents
+
+        Returns:
+            Trades: The staged entry
+        """
+        entry = cls(user_id=user_id, kind=kind, cash_change_cents=amount_cents if kind == DEPOSIT else -amount_cents)
+        db.session.add(entry)
+        return entry
+
+    ##################################################
+    ## Ledger Retrieval Functions
+    ##################################################
+
+    @classmethod
+    def get_entries(cls, user_id: Optional[int], limit: int, before_id: Optional[int] = None) -> List["Trades"]:
+        """
+        Reads a page of a user's ledger, newest first
+
+        Args:
+            user_id (int, optional): Owner of the entries, None for the shared portfolio
+            limit (int): Maximum number of entries to return
+            before_id (int, optional): Only entries older than this one, to page backwards
+
+        Returns:
+            List[Trades]: The entries
+        """
+        query = cls.query.filter(_owner(cls, user_id))
+        if before_id is not None:
+            query = query.filter(cls.id < before_id)
+        return query.order_by(cls.id.desc()).limit(limit).all()
+
+    @classmethod
+    def get_after(cls, user_id: Optional[int], after_id: int = 0) -> List["Trades"]:
+        """
+        Reads a user's entries after a ledger position, oldest first
+
+        Args:
+            user_id (int, optional): Owner of the entries, None for the shared portfolio
+            after_id (int): Last entry already applied
+
+        Returns:
+            List[Trades]: The entries to apply
+        """
+        return cls.query.filter(_owner(cls, user_id), cls.id > after_id).order_by(cls.id).all()
+
+    @classmethod
+    def get_since(cls, user_id: Optional[int], start: date) -> List["Trades"]:
+        """
+        Reads a user's entries executed on or after a day, oldest first
+
+        Args:
+            user_id (int, optional): Owner of the entries, None for the shared portfolio
+            start (date): First day to include
+
+        Returns:
+            List[Trades]: The entries
+        """
+        since = datetime.combine(start, datetime.min.time())
+        return cls.query.filter(_owner(cls, user_id), cls.executed_at >= since).order_by(cls.id).all()
+
+    @classmethod
+    def owners(cls) -> List[Optional[int]]:
+        """Lists every user with ledger entries, including None for the shared portfolio."""
+        return [user_id for (user_id,) in db.session.query(cls.user_id).distinct().all()]
+
+
+@event.listens_for(Trades, "before_update")
+@event.listens_for(Trades, "before_delete")
+def _reject_ledger_change(mapper, connection, target) -> None:
+    raise ValueError("Ledger entries cannot be changed once written")
+
+
+class TradeSnapshots(db.Model):
+    """Represents the state of an account after a given ledger entry.
+
+    Rebuilding an account starts from its latest snapshot and replays only the
+    entries after it, instead of the whole ledger.
+    """
+
+    __tablename__ = "TradeSnapshots"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
+    trade_id = db.Column(db.Integer, nullable=False)  # Last ledger entry included
+    cash_cents = db.Column(db.BigInteger, nullable=False)
+    original_cash_cents = db.Column(db.BigInteger, nullable=False)
+    positions = db.Column(db.JSON, nullable=False)  # {symbol: {"shares", "total_cost_cents"}}
+    taken_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc).replace(tzinfo=None))
+
+    __table_args__ = (db.Index("ix_trade_snapshots_user_id_trade_id", "user_id", "trade_id"),)
+
+    @classmethod
+    def latest(cls, user_id: Optional[int]) -> Optional["TradeSnapshots"]:
+        """
+        Reads a user's most recent snapshot
+
+        Args:
+            user_id (int, optional): Owner of the account, None for the shared portfolio
+
+        Returns:
+            TradeSnapshots: The snapshot, or None if none was taken
+        """
+        return cls.query.filter(_owner(cls, user_id)).order_by(cls.trade_id.desc(), cls.id.desc()).first()
+
+    def to_state(self) -> dict:
+        """Returns the snapshot as a replay state."""
+        return {
+            "cash_cents": self.cash_cents,
+            "original_cash_cents": self.original_cash_cents,
+            "positions": {symbol: dict(position) for symbol, position in self.positions.items()},
+        }
+
+
+def _owner(model, user_id: Optional[int]):
+    """Filter clause selecting a user's rows; None matches the shared portfolio."""
+    return model.user_id.is_(None) if user_id is None else model.user_id == user_id
+
+
+##################################################
+## Replay
+##################################################
+
+def empty_state() -> dict:
+    """Returns the state of an account with no ledger entries."""
+    return {"cash_cents": 0, "original_cash_cents": 0, "positions": {}}
+
+
+def replay(state: dict, entries: Iterable[Trades]) -> dict:
+    """
+    Applies ledger entries to an account state, in order
+
+    Fills change positions the same way Stocks.buy_stock and Stocks.sell_stock do,
+    so a replayed state matches the projections exactly.
+
+    Args:
+        state (dict): Cash balances and {symbol: {"shares", "total_cost_cents"}} positions; changed in place
+        entries (Iterable[Trades]): Entries to apply, oldest first
+
+    Returns:
+        dict: The updated state
+    """
+    positions = state["positions"]
+    for entry in entries:
+        state["cash_cents"] += entry.cash_change_cents
+        if entry.kind == DEPOSIT:
+            state["original_cash_cents"] += entry.cash_change_cents
+        if entry.symbol is None:
+            continue
+
+        position = positions.setdefault(entry.symbol, {"shares": 0, "total_cost_cents": 0})
+        if entry.share_change < 0:
+            # A sell takes out its proportional share of the cost, whatever the proceeds
+            position["total_cost_cents"] -= position["total_cost_cents"] * -entry.share_change // position["shares"]
+        else:
+            position["total_cost_cents"] -= entry.cash_change_cents
+        position["shares"] += entry.share_change
+        if position["shares"] == 0:
+            del positions[entry.symbol]
+    return state
+
+
+def ledger_state(user_id: Optional[int]) -> Tuple[dict, int]:
+    """
+    Computes an account's state from its latest snapshot and the entries after it
+
+    Args:
+        user_id (int, optional): Owner of the account, None for the shared portfolio
+
+    Returns:
+        Tuple[dict, int]: The state, and the id of the last entry applied
+    """
+    snapshot = TradeSnapshots.latest(user_id)
+    state, last_id = (snapshot.to_state(), snapshot.trade_id) if snapshot else (empty_state(), 0)
+    entries = Trades.get_after(user_id, last_id)
+    if entries:
+        last_id = entries[-1].id
+    return replay(state, entries), last_id
+
+
+def take_snapshot(user_id: Optional[int]) -> bool:
+    """
+    Stores an account's current ledger state, if entries were added since the last snapshot
+
+    Args:
+        user_id (int, optional): Owner of the account, None for the shared portfolio
+
+    Returns:
+        bool: Whether a snapshot was stored
+
+    Raises:
+        SQLAlchemyError: For any database-related issues.
+    """
+    latest = TradeSnapshots.latest(user_id)
+    state, trade_id = ledger_state(user_id)
+    if latest is not None and latest.trade_id >= trade_id:
+        return False
+
+    try:
+        db.session.add(TradeSnapshots(user_id=user_id, trade_id=trade_id, **state))
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error(f"Error storing ledger snapshot for user {user_id}: {str(e)}")
+        raise
+
+    logger.info(f"Stored ledger snapshot for user {user_id} at entry {trade_id}")
+    return True
+
+
+def take_snapshots() -> int:
+    """
+    Snapshots every account with ledger entries added since its last snapshot
+
+    Meant to run periodically, so rebuilds replay only recent entries.
+
+    Returns:
+        int: Number of snapshots stored
+    """
+    return sum(take_snapshot(user_id) for user_id in Trades.owners())
+
+
+def rebuild_projections(user_id: Optional[int]) -> dict:
+    """
+    Rewrites an account's positions and cash balance from the ledger
+
+    Args:
+        user_id (int, optional): Owner of the account, None for the shared portfolio,
+            whose cash is not stored
+
+    Returns:
+        dict: The rebuilt state
+
+    Raises:
+        SQLAlchemyError: For any database-related issues.
+    """
+    from stockapp.models.account_model import Accounts
+    from stockapp.models.stock_model import Stocks
+
+    state, trade_id = ledger_state(user_id)
+    try:
+        Stocks.query.filter(_owner(Stocks, user_id)).delete(synchronize_session=False)
+        for symbol, position in state["positions"].items():
+            db.session.add(Stocks(
+                user_id=user_id,
+                symbol=symbol,
+                number_shares=position["shares"],
+                total_cost_cents=position["total_cost_cents"],
+            ))
+
+        if user_id is not None:
+            account = db.session.get(Accounts, user_id) or Accounts(user_id=user_id)
+            account.cash_cents = state["cash_cents"]
+            account.original_cash_cents = state["original_cash_cents"]
+            db.session.add(account)
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error(f"Error rebuilding portfolio of user {user_id}: {str(e)}")
+        raise
+
+    logger.info(f"Rebuilt portfolio of user {user_id} from the ledger up to entry {trade_id}")
+    take_snapshot(user_id)
+    return state
+
+
+def close_positions() -> int:
+    """
+    Records the removal of every position, for a reset of the Stocks table
+
+    Each position gets a RESET entry with no cash change, so the ledger still
+    accounts for every share and a later rebuild does not restore the positions.
+
+    Returns:
+        int: Number of positions closed
+
+    Raises:
+        SQLAlchemyError: For any database-related issues.
+    """
+    from stockapp.models.stock_model import Stocks
+
+    positions = Stocks.query.all()
+    try:
+        for position in positions:
+            db.session.add(Trades(
+                user_id=position.user_id,
+                kind=RESET,
+                symbol=position.symbol,
+                shares=position.number_shares,
+                cash_change_cents=0,
+            ))
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error(f"Error recording the reset of positions: {str(e)}")
+        raise
+    return len(positions)
+
+
+def purge_users() -> int:
+    """
+    Deletes every user's ledger entries and snapshots, for a reset of the Users table
+
+    The one exception to the append-only ledger: once the users are gone their
+    entries account for nothing, and left in place they would pass to whoever is
+    given the same ids. The bulk delete bypasses the guard on deleting entries. The
+    shared portfolio's ledger is kept. Nothing is committed, so the caller can delete
+    the users in the same transaction.
+
+    Returns:
+        int: Number of ledger entries deleted
+    """
+    deleted = Trades.query.filter(Trades.user_id.isnot(None)).delete()
+    TradeSnapshots.query.filter(TradeSnapshots.user_id.isnot(None)).delete()
+    logger.info(f"Purged {deleted} ledger entries of deleted users")
+    return deleted
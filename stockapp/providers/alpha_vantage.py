@@ -0,0 +1,141 @@
+import logging
+import os
+from typing import List, Optional
+
+from stockapp.providers.base import MarketDataProvider, parse_listing_csv
+from stockapp.utils import http_client
+from stockapp.utils.call_budget import BudgetExceeded, upstream_budget
+from stockapp.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+ALPHA_VANTAGE_URL = "https://www.alphavantage.co/query"
+
+
+class AlphaVantageProvider(MarketDataProvider):
+    """
+    Market data from the Alpha Vantage REST API
+
+    Every request sent, retries included, takes a token from the upstream call budget
+    and goes through the shared pooled HTTP client.
+
+    Attributes:
+        api_key (str): Alpha Vantage API key
+    """
+
+    name = "alpha_vantage"
+
+    def __init__(self, api_key: Optional[str] = None):
+        self.api_key = api_key or os.getenv("ALPHA_VANTAGE_API_KEY")
+
+    def get_quote(self, symbol: str) -> dict:
+        quote = self._query("GLOBAL_QUOTE", symbol).get("Global Quote")
+        if not quote or "05. price" not in quote:
+            raise ValueError(f"No price data found for symbol '{symbol}'.")
+
+        return {
+            "symbol": symbol,
+            "price": float(quote["05. price"]),
+            "volume": int(quote.get("06. volume", 0)),
+            "latest_trading_day": quote.get("07. latest trading day"),
+        }
+
+    def get_overview(self, symbol: str) -> dict:
+        overview_data = self._query("OVERVIEW", symbol)
+        if "Name" not in overview_data:
+            raise ValueError(f"No company info found for '{symbol}'.")
+        return overview_data
+
+    def get_daily_bars(self, symbol: str, outputsize: str = "compact") -> List[dict]:
+        history_data = self._query(
+            "TIME_SERIES_DAILY_ADJUSTED", symbol, outputsize=outputsize
+        ).get("Time Series (Daily)", {})
+
+        bars = []
+        for bar_date, daily_data in history_data.items():
+            bars.append({
+                "date": bar_date,
+                "open": float(daily_data["1. open"]),
+                "high": float(daily_data["2. high"]),
+                "low": float(daily_data["3. low"]),
+                "close": float(daily_data["4. close"]),
+                "adjusted_close": float(daily_data["5. adjusted close"]) if "5. adjusted close" in daily_data else None,
+                "volume": int(daily_data["6. volume"]),
+            })
+        return bars
+
+    def get_listing(self) -> List[dict]:
+        response = self._request({"function": "LISTING_STATUS"})
+        listing = parse_listing_csv(response.text.splitlines())
+        if not listing:
+            raise ValueError("No listing data returned by Alpha Vantage.")
+        return listing
+
+    def _query(self, function: str, symbol: str, **params) -> dict:
+        """
+        Calls an Alpha Vantage function for a symbol and decodes the JSON response
+
+        Args:
+            function (str): Alpha Vantage function name, e.g. GLOBAL_QUOTE
+            symbol (str): Upper-cased stock symbol
+            **params: Extra query parameters, e.g. outputsize
+
+        Returns:
+            dict: The decoded JSON response
+
+        Raises:
+            BudgetExceeded: If the call budget cannot serve the call in time
+            requests.exceptions.RequestException: If the request fails after retries
+        """
+        return self._request({"function": function, "symbol": symbol, **params}).json()
+
+    def _request(self, params: dict):
+        """
+        Calls Alpha Vantage through the shared pooled HTTP client
+
+        Every attempt first takes a token from the upstream call budget, using the
+        priority and user of the calling context. A rate-limit notice is not retried
+        on the spot: it means the budget is out of step with the plan, so it is
+        reported as BudgetExceeded for the caller to back off.
+
+        Args:
+            params (dict): Query parameters other than the API key
+
+        Returns:
+            requests.Response: The successful response
+
+        Raises:
+            BudgetExceeded: If the call budget cannot serve the call in time, or
+                Alpha Vantage answers with a rate-limit notice
+            requests.exceptions.RequestException: If the request fails after retries
+        """
+        response = http_client.get(
+            ALPHA_VANTAGE_URL,
+            params={**params, "apikey": self.api_key},
+            acquire=upstream_budget.acquire,
+        )
+        response.raise_for_status()
+        # Surface a rate-limit notice as such, not as a symbol without data
+        if _is_throttled(response):
+            raise BudgetExceeded("Alpha Vantage rate limit reached", retry_after=60)
+        return response
+
+
+def _is_throttled(response) -> bool:
+    """
+    Detects Alpha Vantage rate-limit notices, which arrive as HTTP 200 responses
+
+    Args:
+        response (requests.Response): The upstream response
+
+    Returns:
+        bool: True if the body is a rate-limit notice instead of data
+    """
+    try:
+        data = response.json()
+    except ValueError:
+        return False
+    return isinstance(data, dict) and len(data) == 1 and ("Note" in data or "Information" in data)
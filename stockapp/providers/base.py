@@ -0,0 +1,92 @@
+import csv
+from typing import Iterable, List
+
+
+class MarketDataProvider:
+    """
+    Interface for a source of quotes, company overviews and daily bars
+
+    Implementations raise ValueError when they have no data for a symbol, so callers
+    handle a missing symbol the same way whichever provider is configured.
+    """
+
+    name = "base"
+
+    def get_quote(self, symbol: str) -> dict:
+        """
+        Fetches the latest quote for a symbol
+
+        Args:
+            symbol (str): Upper-cased stock symbol
+
+        Returns:
+            dict: Symbol, price, volume and latest trading day
+
+        Raises:
+            ValueError: If there is no price for the symbol
+        """
+        raise NotImplementedError
+
+    def get_overview(self, symbol: str) -> dict:
+        """
+        Fetches the company overview for a symbol
+
+        Args:
+            symbol (str): Upper-cased stock symbol
+
+        Returns:
+            dict: Company details, at least Name, Description and Sector
+
+        Raises:
+            ValueError: If there is no company info for the symbol
+        """
+        raise NotImplementedError
+
+    def get_daily_bars(self, symbol: str, outputsize: str = "compact") -> List[dict]:
+        """
+        Fetches daily bars for a symbol, newest first
+
+        Args:
+            symbol (str): Upper-cased stock symbol
+            outputsize (str): "compact" for the last 100 days or "full" for all history
+
+        Returns:
+            List[dict]: Date, open, high, low, close, adjusted close and volume
+        """
+        raise NotImplementedError
+
+    def get_listing(self) -> List[dict]:
+        """
+        Fetches every actively listed symbol the provider can quote
+
+        Returns:
+            List[dict]: Symbol, name, exchange and asset type of each listing
+        """
+        raise NotImplementedError
+
+
+def parse_listing_csv(lines: Iterable[str]) -> List[dict]:
+    """
+    Parses a listing in the Alpha Vantage LISTING_STATUS CSV format
+
+    The CSV needs a "symbol" column; name, exchange, assetType and status are used
+    when present, and rows whose status is not "Active" are skipped.
+
+    Args:
+        lines (Iterable[str]): Lines of the CSV, including the header
+
+    Returns:
+        List[dict]: Symbol, name, exchange and asset type of each active listing
+    """
+    listing = []
+    for row in csv.DictReader(lines):
+        symbol = (row.get("symbol") or "").strip().upper()
+        if not symbol or (row.get("status") or "Active") != "Active":
+            continue
+        listing.append({
+            "symbol": symbol,
+            "name": (row.get("name") or "").strip(),
+            "exchange": (row.get("exchange") or "").strip(),
+            "asset_type": (row.get("assetType") or "").strip(),
+        })
+    return listing
@@ -0,0 +1,141 @@
+import csv
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from stockapp.providers.base import MarketDataProvider
+from stockapp.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+DEFAULT_FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# Number of bars returned for outputsize=compact, matching Alpha Vantage
+COMPACT_BARS = 100
+
+
+class FixtureProvider(MarketDataProvider):
+    """
+    Deterministic market data served from local fixture files
+
+    Each symbol is read once from ``<fixtures_dir>/<SYMBOL>.json`` or
+    ``<fixtures_dir>/<SYMBOL>.csv`` and then served from memory. A JSON fixture holds
+    "quote", "overview" and "daily" objects; a CSV fixture holds daily bars with
+    date, open, high, low, close and volume columns. When a fixture has no quote,
+    the latest daily close is used. The listing is every symbol with a fixture. Every call sleeps for ``latency_ms`` to simulate
+    the upstream round trip, which lets the app be load-tested without the network.
+
+    Attributes:
+        fixtures_dir (str): Directory holding the fixture files
+        latency_ms (float): Synthetic latency added to every call
+    """
+
+    name = "fixtures"
+
+    def __init__(self, fixtures_dir: Optional[str] = None, latency_ms: float = 0):
+        self.fixtures_dir = fixtures_dir or DEFAULT_FIXTURES_DIR
+        self.latency_ms = latency_ms
+        self._fixtures: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def get_quote(self, symbol: str) -> dict:
+        fixture = self._fixture(symbol)
+        if fixture is None or fixture["quote"] is None:
+            raise ValueError(f"No price data found for symbol '{symbol}'.")
+        return dict(fixture["quote"])
+
+    def get_overview(self, symbol: str) -> dict:
+        fixture = self._fixture(symbol)
+        if fixture is None:
+            raise ValueError(f"No company info found for '{symbol}'.")
+        return dict(fixture["overview"])
+
+    def get_daily_bars(self, symbol: str, outputsize: str = "compact") -> List[dict]:
+        fixture = self._fixture(symbol)
+        if fixture is None:
+            return []
+        bars = fixture["daily"]
+        if outputsize == "compact":
+            bars = bars[:COMPACT_BARS]
+        return [dict(bar) for bar in bars]
+
+    def get_listing(self) -> List[dict]:
+        symbols = sorted({
+            os.path.splitext(name)[0].upper()
+            for name in os.listdir(self.fixtures_dir)
+            if name.endswith((".json", ".csv"))
+        })
+        listing = []
+        for symbol in symbols:
+            fixture = self._fixture(symbol)
+            listing.append({
+                "symbol": symbol,
+                "name": fixture["overview"]["Name"],
+                "exchange": fixture["overview"].get("Exchange", ""),
+                "asset_type": fixture["overview"].get("AssetType", "Common Stock"),
+            })
+        return listing
+
+    def _fixture(self, symbol: str) -> Optional[dict]:
+        """Returns the parsed fixture for a symbol after the synthetic latency, or None if absent."""
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+        with self._lock:
+            if symbol not in self._fixtures:
+                self._fixtures[symbol] = self._load(symbol)
+            return self._fixtures[symbol]
+
+    def _load(self, symbol: str) -> Optional[dict]:
+        """Reads and normalises the JSON or CSV fixture of a symbol."""
+        json_path = os.path.join(self.fixtures_dir, f"{symbol}.json")
+        csv_path = os.path.join(self.fixtures_dir, f"{symbol}.csv")
+
+        if os.path.exists(json_path):
+            with open(json_path) as f:
+                data = json.load(f)
+            daily = data.get("daily", [])
+            overview = data.get("overview", {"Name": symbol})
+            quote = data.get("quote")
+        elif os.path.exists(csv_path):
+            with open(csv_path, newline="") as f:
+                daily = list(csv.DictReader(f))
+            overview = {"Name": symbol}
+            quote = None
+        else:
+            logger.info(f"No fixture for {symbol} in {self.fixtures_dir}")
+            return None
+
+        bars = sorted((_parse_bar(bar) for bar in daily), key=lambda bar: bar["date"], reverse=True)
+        if quote is None and bars:
+            quote = {"price": bars[0]["close"], "volume": bars[0]["volume"], "latest_trading_day": bars[0]["date"]}
+        if quote is not None:
+            quote = {
+                "symbol": symbol,
+                "price": float(quote["price"]),
+                "volume": int(quote.get("volume", 0)),
+                "latest_trading_day": quote.get("latest_trading_day"),
+            }
+
+        overview.setdefault("Name", symbol)
+        return {"quote": quote, "overview": overview, "daily": bars}
+
+
+def _parse_bar(bar: dict) -> dict:
+    """Converts a fixture bar, whose values may be strings, into a typed bar dict."""
+    adjusted_close = bar.get("adjusted_close")
+    return {
+        "date": bar["date"],
+        "open": float(bar["open"]),
+        "high": float(bar["high"]),
+        "low": float(bar["low"]),
+        "close": float(bar["close"]),
+        "adjusted_close": float(adjusted_close) if adjusted_close not in (None, "") else None,
+        "volume": int(float(bar["volume"])),
+    }
@@ -0,0 +1,57 @@
+import logging
+
+from stockapp.providers.alpha_vantage import AlphaVantageProvider
+from stockapp.providers.base import MarketDataProvider
+from stockapp.providers.fixture_provider import FixtureProvider
+from stockapp.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+_provider: MarketDataProvider = AlphaVantageProvider()
+
+
+def get_provider() -> MarketDataProvider:
+    """
+    Returns the configured market-data provider
+
+    Returns:
+        MarketDataProvider: Alpha Vantage unless init_app selected another provider
+    """
+    return _provider
+
+
+def set_provider(provider: MarketDataProvider) -> None:
+    """
+    Replaces the market-data provider used by the models
+
+    Args:
+        provider (MarketDataProvider): The provider to use
+    """
+    global _provider
+    _provider = provider
+    logger.info(f"Using market data provider '{provider.name}'")
+
+
+def init_app(app) -> None:
+    """
+    Selects the market-data provider named in the Flask config
+
+    Args:
+        app (Flask): The Flask application
+
+    Raises:
+        ValueError: If MARKET_DATA_PROVIDER names an unknown provider
+    """
+    name = app.config.get("MARKET_DATA_PROVIDER", AlphaVantageProvider.name)
+    if name == AlphaVantageProvider.name:
+        set_provider(AlphaVantageProvider(api_key=app.config.get("ALPHA_VANTAGE_API_KEY")))
+    elif name == FixtureProvider.name:
+        set_provider(FixtureProvider(
+            fixtures_dir=app.config.get("MARKET_DATA_FIXTURES_DIR"),
+            latency_ms=app.config.get("MARKET_DATA_FIXTURE_LATENCY_MS", 0),
+        ))
+    else:
+        raise ValueError(f"Unknown market data provider '{name}'")
@@ -0,0 +1,274 @@
+import math
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+# Trading days per year, used to annualise daily statistics
+TRADING_DAYS = 252
+
+SMA_WINDOWS = (20, 50, 200)
+EMA_WINDOWS = (12, 26)
+VOLATILITY_WINDOW = 20
+
+# Longest tail of the per-day series kept in a computed result
+MAX_SERIES_POINTS = 252
+
+# Bars per block in the EMA; keeps the block's decay factors well inside float64 range
+_EMA_BLOCK = 128
+
+
+##################################################
+## Vectorized Indicators
+##################################################
+
+def simple_returns(closes: np.ndarray) -> np.ndarray:
+    """
+    Day-over-day returns, aligned with ``closes`` (the first value is NaN)
+
+    Args:
+        closes (np.ndarray): Closing prices, oldest first
+
+    Returns:
+        np.ndarray: close[t] / close[t-1] - 1
+    """
+    returns = np.full(closes.shape, np.nan)
+    returns[1:] = closes[1:] / closes[:-1] - 1
+    return returns
+
+
+def log_returns(closes: np.ndarray) -> np.ndarray:
+    """
+    Day-over-day log returns, aligned with ``closes`` (the first value is NaN)
+
+    Args:
+        closes (np.ndarray): Closing prices, oldest first
+
+    Returns:
+        np.ndarray: log(close[t] / close[t-1])
+    """
+    returns = np.full(closes.shape, np.nan)
+    returns[1:] = np.diff(np.log(closes))
+    return returns
+
+
+def sma(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Simple moving average from a running sum, NaN until ``window`` values are seen
+
+    Args:
+        values (np.ndarray): Input series, oldest first
+        window (int): Number of values averaged
+
+    Returns:
+        np.ndarray: The moving average, aligned with ``values``
+    """
+    result = np.full(values.shape, np.nan)
+    if window <= 0 or len(values) < window:
+        return result
+    sums = np.cumsum(np.insert(values, 0, 0.0))
+    result[window - 1:] = (sums[window:] - sums[:-window]) / window
+    return result
+
+
+def ema(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Exponential moving average with smoothing 2 / (window + 1), seeded with the first value
+
+    The recurrence is solved in closed form one block at a time: within a block,
+    ema[i] = d^(i+1) * carry + a * d^i * cumsum(x[j] / d^j), where a is the smoothing
+    and d = 1 - a.
+
+    Args:
+        values (np.ndarray): Input series, oldest first
+        window (int): EMA span in days
+
+    Returns:
+        np.ndarray: The moving average, aligned with ``values``
+    """
+    result = np.empty(values.shape)
+    if len(values) == 0:
+        return result
+
+    alpha = 2.0 / (window + 1)
+    decay = 1.0 - alpha
+    if decay == 0:
+        return values.astype(float)
+    result[0] = values[0]
+    carry = values[0]
+    powers = decay ** np.arange(_EMA_BLOCK + 1)
+
+    for start in range(1, len(values), _EMA_BLOCK):
+        block = values[start:start + _EMA_BLOCK]
+        n = len(block)
+        weighted = np.cumsum(block / powers[:n])
+        result[start:start + n] = powers[1:n + 1] * carry + alpha * powers[:n] * weighted
+        carry = result[start + n - 1]
+    return result
+
+
+def rolling_volatility(returns: np.ndarray, window: int) -> np.ndarray:
+    """
+    Annualised rolling standard deviation of daily returns
+
+    Args:
+        returns (np.ndarray): Daily (log) returns with a leading NaN, as from log_returns
+        window (int): Number of returns per estimate
+
+    Returns:
+        np.ndarray: Rolling volatility, NaN until ``window`` returns are seen
+    """
+    result = np.full(returns.shape, np.nan)
+    valid = returns[1:]
+    if window < 2 or len(valid) < window:
+        return result
+
+    sums = np.cumsum(np.insert(valid, 0, 0.0))
+    squares = np.cumsum(np.insert(valid * valid, 0, 0.0))
+    window_sum = sums[window:] - sums[:-window]
+    window_squares = squares[window:] - squares[:-window]
+    variance = np.maximum((window_squares - window_sum * window_sum / window) / (window - 1), 0.0)
+    result[window:] = np.sqrt(variance) * math.sqrt(TRADING_DAYS)
+    return result
+
+
+def max_drawdown(closes: np.ndarray) -> Dict[str, Optional[int]]:
+    """
+    Largest peak-to-trough decline of the series
+
+    Args:
+        closes (np.ndarray): Closing prices, oldest first
+
+    Returns:
+        Dict: "drawdown" as a negative fraction, and the "peak" and "trough" indices
+    """
+    running_peak = np.maximum.accumulate(closes)
+    drawdowns = closes / running_peak - 1
+    trough = int(np.argmin(drawdowns))
+    peak = int(np.argmax(closes[:trough + 1]))
+    return {"drawdown": float(drawdowns[trough]), "peak": peak, "trough": trough}
+
+
+def forward_fill(matrix: np.ndarray) -> np.ndarray:
+    """
+    Fills NaNs down each column with the last value above them
+
+    Leading NaNs, before a column's first value, are left as NaN.
+
+    Args:
+        matrix (np.ndarray): Dates by symbols, oldest row first
+
+    Returns:
+        np.ndarray: The filled matrix
+    """
+    rows = np.where(np.isnan(matrix), 0, np.arange(matrix.shape[0])[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return matrix[rows, np.arange(matrix.shape[1])]
+
+
+def holdings_values(closes: np.ndarray, shares: np.ndarray) -> np.ndarray:
+    """
+    Market value of the holdings on each date, as one matrix product
+
+    Args:
+        closes (np.ndarray): Dates by symbols matrix of closes; NaN counts as 0
+        shares (np.ndarray): Shares held, per symbol or as a dates by symbols matrix
+
+    Returns:
+        np.ndarray: Value of the holdings on each date
+    """
+    closes = np.nan_to_num(closes)
+    if shares.ndim == 1:
+        return closes @ shares
+    return np.einsum("ds,ds->d", closes, shares)
+
+
+##################################################
+## Summary
+##################################################
+
+def compute_analytics(
+    dates: Sequence[date],
+    highs: Sequence[float],
+    lows: Sequence[float],
+    closes: Sequence[float],
+) -> dict:
+    """
+    Computes return, volatility, moving average, drawdown and range statistics
+
+    Args:
+        dates (Sequence[date]): Bar dates, oldest first
+        highs (Sequence[float]): Daily highs
+        lows (Sequence[float]): Daily lows
+        closes (Sequence[float]): Daily closes, split and dividend adjusted where available
+
+    Returns:
+        dict: Summary statistics, and the last MAX_SERIES_POINTS days of each series
+    """
+    closes = np.asarray(closes, dtype=float)
+    highs = np.asarray(highs, dtype=float)
+    lows = np.asarray(lows, dtype=float)
+    day_numbers = np.asarray([d.toordinal() for d in dates])
+
+    returns = simple_returns(closes)
+    logs = log_returns(closes)
+    volatility = rolling_volatility(logs, VOLATILITY_WINDOW)
+    averages = {f"sma_{window}": sma(closes, window) for window in SMA_WINDOWS}
+    averages.update({f"ema_{window}": ema(closes, window) for window in EMA_WINDOWS})
+    drawdown = max_drawdown(closes)
+
+    year = day_numbers >= day_numbers[-1] - 365
+    daily_logs = logs[1:]
+    years = len(daily_logs) / TRADING_DAYS
+
+    tail = slice(max(len(closes) - MAX_SERIES_POINTS, 0), None)
+    series = {
+        "date": [d.isoformat() for d in dates[tail]],
+        "close": closes[tail],
+        "return": returns[tail],
+        "log_return": logs[tail],
+        "volatility": volatility[tail],
+        **{name: values[tail] for name, values in averages.items()},
+    }
+
+    return {
+        "as_of": dates[-1].isoformat(),
+        "bars": len(closes),
+        "latest_close": float(closes[-1]),
+        "returns": {
+            "last_day": _number(returns[-1]),
+            "mean_daily": _number(np.mean(returns[1:])) if len(closes) > 1 else None,
+            "total": float(closes[-1] / closes[0] - 1),
+            "annualized": _number(math.expm1(np.sum(daily_logs) / years)) if years > 0 else None,
+        },
+        "volatility": {
+            "window": VOLATILITY_WINDOW,
+            "current": _number(volatility[-1]),
+            "annualized_full_period": _number(np.std(daily_logs, ddof=1) * math.sqrt(TRADING_DAYS))
+            if len(daily_logs) > 1 else None,
+        },
+        "moving_averages": {name: _number(values[-1]) for name, values in averages.items()},
+        "max_drawdown": {
+            "drawdown": drawdown["drawdown"],
+            "peak_date": dates[drawdown["peak"]].isoformat(),
+            "trough_date": dates[drawdown["trough"]].isoformat(),
+        },
+        "range_52_week": {
+            "high": float(np.max(highs[year])),
+            "low": float(np.min(lows[year])),
+            "from": (dates[-1] - timedelta(days=365)).isoformat(),
+        },
+        "series": {name: _numbers(values) if name != "date" else values for name, values in series.items()},
+    }
+
+
+def _number(value) -> Optional[float]:
+    """Converts a NumPy scalar to a JSON-safe float, mapping NaN to None."""
+    value = float(value)
+    return None if math.isnan(value) else value
+
+
+def _numbers(values: np.ndarray) -> List[Optional[float]]:
+    """Converts an array to a JSON-safe list, mapping NaN to None."""
+    return [None if math.isnan(value) else value for value in values.tolist()]
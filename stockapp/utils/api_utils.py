@@ -2,6 +2,7 @@ import logging
 import os
 import requests
 
+from stockapp.utils import http_client
 from stockapp.utils.logger import configure_logger
 
 logger = logging.getLogger(__name__)
@@ -27,7 +28,7 @@ def get_random() -> float:
     try:
         logger.info(f"Fetching random number from {RANDOM_ORG_URL}")
 
-        response = requests.get(RANDOM_ORG_URL, timeout=5)
+        response = http_client.get(RANDOM_ORG_URL, timeout=5)
 
         # Check if the request was successful
         response.raise_for_status()
@@ -0,0 +1,262 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from stockapp.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+class TTLCache:
+    """
+    A thread-safe, size-bounded cache with per-entry expiry
+
+    Entries expire ``ttl_seconds`` after they are stored. When the cache is full the
+    least recently used entry is evicted to make room for the new one. Expired entries
+    are kept for a further ``stale_seconds`` so they can be served by get_stale while
+    a fresh value is fetched.
+
+    Attributes:
+        ttl_seconds (float): Default time-to-live for each entry in seconds
+        max_entries (int): Maximum number of entries held before LRU eviction
+        stale_seconds (float): How long an expired entry remains readable by get_stale
+        hits (int): Number of lookups answered from the cache
+        misses (int): Number of lookups that found no live entry
+        stale_hits (int): Number of get_stale calls answered with an expired entry
+        evictions (int): Number of entries dropped to respect ``max_entries``
+    """
+
+    def __init__(self, ttl_seconds: float = 60, max_entries: int = 1024, stale_seconds: float = 0):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.stale_seconds = stale_seconds
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(
+        self,
+        ttl_seconds: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        stale_seconds: Optional[float] = None,
+    ) -> None:
+        """
+        Updates the cache limits, evicting entries if the new size is smaller
+
+        Args:
+            ttl_seconds (float, optional): New default time-to-live in seconds
+            max_entries (int, optional): New maximum number of entries
+            stale_seconds (float, optional): New window for serving expired entries
+        """
+        with self._lock:
+            if ttl_seconds is not None:
+                self.ttl_seconds = ttl_seconds
+            if max_entries is not None:
+                self.max_entries = max_entries
+            if stale_seconds is not None:
+                self.stale_seconds = stale_seconds
+            self._evict_overflow()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Returns the live value stored under ``key``
+
+        Args:
+            key (Hashable): The cache key
+            default (Any): Value returned on a miss
+
+        Returns:
+            Any: The cached value, or ``default`` if absent or expired
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, stored_at, expires_at = entry
+            if expires_at <= now:
+                if expires_at + self.stale_seconds <= now:
+                    del self._entries[key]
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def get_stale(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """
+        Returns the value stored under ``key`` even if it has expired, with its age
+
+        Args:
+            key (Hashable): The cache key
+
+        Returns:
+            Tuple[Any, float]: The value and its age in seconds, or None if absent
+                or older than the stale window
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            value, stored_at, expires_at = entry
+            if expires_at + self.stale_seconds <= now:
+                return None
+
+            self.stale_hits += 1
+            return value, now - stored_at
+
+    def peek(self, key: Hashable) -> Any:
+        """
+        Returns the live value stored under ``key`` without counting a lookup or changing recency
+
+        Args:
+            key (Hashable): The cache key
+
+        Returns:
+            Any: The cached value, or None if absent or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] <= time.time():
+                return None
+            return entry[0]
+
+    def values(self) -> List[Any]:
+        """
+        Returns every live value without counting lookups or changing recency
+
+        Returns:
+            List[Any]: The cached values
+        """
+        now = time.time()
+        with self._lock:
+            return [value for value, stored_at, expires_at in self._entries.values() if expires_at > now]
+
+    def ttl_remaining(self, key: Hashable) -> Optional[float]:
+        """
+        Returns the seconds until ``key`` expires without counting as a lookup
+
+        Args:
+            key (Hashable): The cache key
+
+        Returns:
+            float: Seconds until expiry, negative once expired, or None if absent
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            return entry[2] - time.time()
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Stores ``value`` under ``key``, evicting the least recently used entry if full
+
+        Args:
+            key (Hashable): The cache key
+            value (Any): The value to store
+            ttl (float, optional): Time-to-live for this entry, defaults to ``ttl_seconds``
+        """
+        ttl = self.ttl_seconds if ttl is None else ttl
+        now = time.time()
+        with self._lock:
+            self._entries[key] = (value, now, now + ttl)
+            self._entries.move_to_end(key)
+            self._evict_overflow()
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Removes ``key`` from the cache if present
+
+        Args:
+            key (Hashable): The cache key
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Removes every entry and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.stale_hits = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the current size and hit/miss/eviction counters
+
+        Returns:
+            Dict[str, int]: Cache statistics
+        """
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale_hits": self.stale_hits,
+                "evictions": self.evictions,
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def _evict_overflow(self) -> None:
+        """Drops least recently used entries until the size limit holds. Caller holds the lock."""
+        while len(self._entries) > self.max_entries:
+            key, _ = self._entries.popitem(last=False)
+            self.evictions += 1
+            logger.debug(f"Evicted {key} from cache")
+
+
+# Process-wide cache of Alpha Vantage quotes shared by every price consumer
+quote_cache = TTLCache()
+
+# Company overviews change roughly quarterly, so they are kept for days
+overview_cache = TTLCache(ttl_seconds=3 * 24 * 3600, max_entries=1024)
+
+# Marks symbols whose stored daily bars are current, until the next bar is published
+daily_series_cache = TTLCache(ttl_seconds=24 * 3600, max_entries=4096)
+
+# Computed analytics keyed by (symbol, latest bar date), so a new bar naturally misses
+analytics_cache = TTLCache(ttl_seconds=24 * 3600, max_entries=512)
+
+# Symbols the provider had no data for, rejected without an upstream call until they expire
+unknown_symbol_cache = TTLCache(ttl_seconds=3600, max_entries=10000)
+
+# Rendered JSON bodies keyed by their ETag; a trade or price change makes a new tag, so it naturally misses
+response_cache = TTLCache(ttl_seconds=300, max_entries=2048)
+
+
+def init_app(app) -> None:
+    """
+    Applies the cache settings from the Flask config to the shared caches
+
+    Args:
+        app (Flask): The Flask application
+    """
+    quote_cache.configure(
+        ttl_seconds=app.config.get("QUOTE_CACHE_TTL_SECONDS", 60),
+        max_entries=app.config.get("QUOTE_CACHE_MAX_ENTRIES", 1024),
+        stale_seconds=app.config.get("QUOTE_CACHE_STALE_SECONDS", 0),
+    )
+    overview_cache.configure(ttl_seconds=app.config.get("OVERVIEW_CACHE_TTL_SECONDS"))
+    response_cache.configure(
+        ttl_seconds=app.config.get("RESPONSE_CACHE_TTL_SECONDS", 300),
+        max_entries=app.config.get("RESPONSE_CACHE_MAX_ENTRIES", 2048),
+    )
@@ -0,0 +1,266 @@
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from enum import IntEnum
+from typing import Dict, Iterator, Optional
+
+from stockapp.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+class Priority(IntEnum):
+    """Upstream call priority classes, most important first."""
+    TRADE = 0
+    VALUATION = 1
+    LOOKUP = 2
+    BACKGROUND = 3
+
+
+# Share of each bucket a priority must leave untouched for the classes above it
+RESERVED_FRACTION = {
+    Priority.TRADE: 0.0,
+    Priority.VALUATION: 0.2,
+    Priority.LOOKUP: 0.4,
+    Priority.BACKGROUND: 0.5,
+}
+
+# Longest a caller of each priority blocks for a token before the call is shed
+DEFAULT_MAX_WAIT_SECONDS = {
+    Priority.TRADE: 30.0,
+    Priority.VALUATION: 10.0,
+    Priority.LOOKUP: 2.0,
+    Priority.BACKGROUND: 0.0,
+}
+
+# Bound on per-user fair-share buckets kept in memory
+MAX_TRACKED_USERS = 10000
+
+_current_priority = contextvars.ContextVar("upstream_priority", default=Priority.LOOKUP)
+_current_user = contextvars.ContextVar("upstream_user", default=None)
+
+
+class BudgetExceeded(RuntimeError):
+    """
+    Raised when an upstream call would wait longer than its priority allows
+
+    Attributes:
+        retry_after (float): Seconds until the call could have been made
+    """
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _TokenBucket:
+    """A token bucket refilled continuously at ``capacity / period_seconds`` tokens per second."""
+
+    def __init__(self, capacity: float, period_seconds: float):
+        self.capacity = capacity
+        self.rate = capacity / period_seconds
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, needed: float) -> float:
+        """Returns the seconds until ``needed`` tokens are available."""
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+
+class CallBudget:
+    """
+    Schedules upstream calls against the provider's per-minute and per-day limits
+
+    Each limit is a token bucket. Lower priorities may only spend tokens while the
+    bucket stays above a reserve kept for higher priorities, so trades keep executing
+    under quota pressure while lookups wait or are shed. Outside of trades, each user
+    is also held to a fair share of the per-minute budget.
+
+    A limit of 0 disables that bucket.
+
+    Attributes:
+        calls_per_minute (int): Per-minute upstream call limit
+        calls_per_day (int): Per-day upstream call limit
+        user_share (float): Fraction of the per-minute budget one user may spend
+    """
+
+    def __init__(self, calls_per_minute: int = 0, calls_per_day: int = 0, user_share: float = 0.25):
+        self._condition = threading.Condition()
+        self.configure(calls_per_minute, calls_per_day, user_share)
+
+    def configure(self, calls_per_minute: int, calls_per_day: int, user_share: float) -> None:
+        """
+        Resets the buckets for new limits
+
+        Args:
+            calls_per_minute (int): Per-minute upstream call limit, 0 for unlimited
+            calls_per_day (int): Per-day upstream call limit, 0 for unlimited
+            user_share (float): Fraction of the per-minute budget one user may spend
+        """
+        with self._condition:
+            self.calls_per_minute = calls_per_minute
+            self.calls_per_day = calls_per_day
+            self.user_share = user_share
+            self._buckets = []
+            if calls_per_minute:
+                self._buckets.append(_TokenBucket(calls_per_minute, 60))
+            if calls_per_day:
+                self._buckets.append(_TokenBucket(calls_per_day, 24 * 3600))
+            self._user_buckets: Dict[str, _TokenBucket] = {}
+            self._condition.notify_all()
+
+    def estimate_wait(self, priority: Optional[Priority] = None, user: Optional[str] = None) -> float:
+        """
+        Returns how long a call would currently wait for budget
+
+        Args:
+            priority (Priority, optional): Defaults to the priority of the current context
+            user (str, optional): Defaults to the user of the current context
+
+        Returns:
+            float: Seconds until a token is available, 0 if the call could run now
+        """
+        priority, user = self._resolve(priority, user)
+        with self._condition:
+            return self._wait_time(priority, user, time.monotonic())
+
+    def acquire(
+        self,
+        priority: Optional[Priority] = None,
+        user: Optional[str] = None,
+        max_wait: Optional[float] = None,
+    ) -> float:
+        """
+        Takes one call from the budget, blocking until it is available
+
+        Args:
+            priority (Priority, optional): Defaults to the priority of the current context
+            user (str, optional): Defaults to the user of the current context
+            max_wait (float, optional): Longest acceptable wait, defaults per priority
+
+        Returns:
+            float: Seconds spent waiting
+
+        Raises:
+            BudgetExceeded: If the expected wait is longer than ``max_wait``
+        """
+        priority, user = self._resolve(priority, user)
+        if max_wait is None:
+            max_wait = DEFAULT_MAX_WAIT_SECONDS[priority]
+
+        started = time.monotonic()
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                wait = self._wait_time(priority, user, now)
+                if wait == 0:
+                    self._take(priority, user)
+                    return now - started
+
+                waited = now - started
+                if waited + wait > max_wait:
+                    logger.warning(f"Shedding {priority.name} upstream call for {user}: budget frees in {wait:.1f}s")
+                    raise BudgetExceeded(
+                        f"Upstream call budget exhausted, retry in {wait:.1f} seconds", retry_after=wait
+                    )
+
+                logger.info(f"Waiting {wait:.1f}s for upstream budget ({priority.name}, user {user})")
+                self._condition.wait(timeout=wait)
+
+    def _resolve(self, priority: Optional[Priority], user: Optional[str]):
+        if priority is None:
+            priority = _current_priority.get()
+        if user is None:
+            user = _current_user.get()
+        return priority, user
+
+    def _user_bucket(self, user: Optional[str]) -> Optional[_TokenBucket]:
+        """Returns the fair-share bucket for ``user``, or None if fair share does not apply."""
+        if user is None or not self.calls_per_minute:
+            return None
+        bucket = self._user_buckets.get(user)
+        if bucket is None:
+            if len(self._user_buckets) >= MAX_TRACKED_USERS:
+                # Users with a full bucket have no spend to remember
+                self._user_buckets = {
+                    name: tracked for name, tracked in self._user_buckets.items()
+                    if tracked.tokens < tracked.capacity
+                }
+            bucket = _TokenBucket(max(1.0, self.calls_per_minute * self.user_share), 60)
+            self._user_buckets[user] = bucket
+        return bucket
+
+    def _wait_time(self, priority: Priority, user: Optional[str], now: float) -> float:
+        """Returns the wait until every bucket can serve this call. Caller holds the lock."""
+        wait = 0.0
+        for bucket in self._buckets:
+            bucket.refill(now)
+            reserve = bucket.capacity * RESERVED_FRACTION[priority]
+            wait = max(wait, bucket.wait_for(reserve + 1))
+
+        if priority != Priority.TRADE:
+            bucket = self._user_bucket(user)
+            if bucket is not None:
+                bucket.refill(now)
+                wait = max(wait, bucket.wait_for(1))
+        return wait
+
+    def _take(self, priority: Priority, user: Optional[str]) -> None:
+        """Spends one token from every applicable bucket. Caller holds the lock."""
+        for bucket in self._buckets:
+            bucket.tokens -= 1
+        if priority != Priority.TRADE:
+            bucket = self._user_bucket(user)
+            if bucket is not None:
+                bucket.tokens -= 1
+
+
+def current_priority() -> Priority:
+    """Returns the priority of the upstream calls made in the current context."""
+    return _current_priority.get()
+
+
+@contextmanager
+def upstream_context(priority: Priority, user: Optional[str] = None) -> Iterator[None]:
+    """
+    Tags the upstream calls made inside the block with a priority and user
+
+    Args:
+        priority (Priority): Priority class of the calls
+        user (str, optional): User the calls are made for
+    """
+    priority_token = _current_priority.set(priority)
+    user_token = _current_user.set(user)
+    try:
+        yield
+    finally:
+        _current_priority.reset(priority_token)
+        _current_user.reset(user_token)
+
+
+# Shared by every upstream market-data call
+upstream_budget = CallBudget()
+
+
+def init_app(app) -> None:
+    """
+    Applies the provider plan limits from the Flask config
+
+    Args:
+        app (Flask): The Flask application
+    """
+    upstream_budget.configure(
+        calls_per_minute=app.config.get("UPSTREAM_CALLS_PER_MINUTE", 0),
+        calls_per_day=app.config.get("UPSTREAM_CALLS_PER_DAY", 0),
+        user_share=app.config.get("UPSTREAM_USER_SHARE", 0.25),
+    )
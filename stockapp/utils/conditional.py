@@ -0,0 +1,85 @@
+import hashlib
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from flask import Response, jsonify, make_response, request
+
+from stockapp.utils.cache import response_cache
+
+
+# Set from the Flask config by init_app, so every worker hands out the same tag for the
+# same content while tags cannot be forged or compared across deployments
+_salt = ""
+
+
+def make_etag(*parts: Hashable) -> str:
+    """
+    Derives an entity tag from the values a response body depends on
+
+    Args:
+        *parts: Everything that determines the body, e.g. a user id, a version and a price epoch
+
+    Returns:
+        str: The unquoted tag
+    """
+    return hashlib.sha1(repr((_salt,) + parts).encode()).hexdigest()
+
+
+def conditional_json(
+    etag: Optional[str],
+    render: Callable[[], Dict[str, Any]],
+    private: bool = False,
+    tag_rendered: Optional[Callable[[Dict[str, Any]], Optional[str]]] = None,
+) -> Response:
+    """
+    Answers a GET with a JSON body, revalidated and cached by its entity tag
+
+    A request whose If-None-Match holds the tag gets 304 without the body being
+    rendered. Otherwise the serialized body is served from the response cache, and
+    only rendered on a miss. Without a tag the body is rendered, then tagged by
+    ``tag_rendered`` if given, or sent untagged.
+
+    Args:
+        etag (str, optional): Tag of the current body, from make_etag
+        render (Callable[[], dict]): Builds the body; only called when it is needed
+        private (bool): Whether the body belongs to the signed-in user and must not
+            be kept by shared caches
+        tag_rendered (Callable[[dict], str], optional): Derives the tag from a body
+            rendered without one, e.g. on a cold cache
+
+    Returns:
+        Response: 304, or 200 with the body
+    """
+    body = None
+    if etag is None:
+        payload = render()
+        etag = tag_rendered(payload) if tag_rendered is not None else None
+        if etag is None:
+            return make_response(jsonify(payload), 200)
+        body = jsonify(payload).get_data()
+        response_cache.set(etag, body)
+
+    headers = {
+        "ETag": f'"{etag}"',
+        "Cache-Control": "private, no-cache" if private else "no-cache",
+    }
+    if request.if_none_match.contains_weak(etag):
+        return make_response("", 304, headers)
+
+    if body is None:
+        body = response_cache.get(etag)
+    if body is None:
+        body = jsonify(render()).get_data()
+        response_cache.set(etag, body)
+    headers["Content-Type"] = "application/json"
+    return make_response(body, 200, headers)
+
+
+def init_app(app) -> None:
+    """
+    Derives the entity tag salt from the Flask config's SECRET_KEY
+
+    Args:
+        app (Flask): The Flask application
+    """
+    global _salt
+    _salt = hashlib.sha256(f"etag:{app.config.get('SECRET_KEY', '')}".encode()).hexdigest()
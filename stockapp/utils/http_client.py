@@ -0,0 +1,147 @@
+import logging
+import random
+import threading
+import time
+from typing import Callable, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from stockapp.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+# Status codes worth retrying: upstream throttling and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+pool_connections = 10      # Number of per-host connection pools kept alive
+pool_maxsize = 32          # Keep-alive connections per host
+connect_timeout = 3.05     # Seconds allowed to establish a connection
+read_timeout = 10.0        # Seconds allowed between bytes of the response
+max_retries = 3            # Retries after the first attempt
+backoff_seconds = 0.5      # Base delay for exponential backoff
+max_backoff_seconds = 8.0  # Upper bound for a single backoff sleep
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def init_app(app) -> None:
+    """
+    Applies the HTTP client settings from the Flask config
+
+    Args:
+        app (Flask): The Flask application
+    """
+    configure(
+        pool_connections=app.config.get("HTTP_POOL_CONNECTIONS"),
+        pool_maxsize=app.config.get("HTTP_POOL_MAXSIZE"),
+        connect_timeout=app.config.get("HTTP_CONNECT_TIMEOUT"),
+        read_timeout=app.config.get("HTTP_READ_TIMEOUT"),
+        max_retries=app.config.get("HTTP_MAX_RETRIES"),
+        backoff_seconds=app.config.get("HTTP_BACKOFF_SECONDS"),
+    )
+
+
+def configure(**settings) -> None:
+    """
+    Updates the client settings and rebuilds the shared session on next use
+
+    Args:
+        **settings: Any of the module-level settings. ``None`` values are ignored.
+    """
+    global _session
+    module_globals = globals()
+    with _session_lock:
+        for name, value in settings.items():
+            if value is not None:
+                module_globals[name] = value
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def get_session() -> requests.Session:
+    """
+    Returns the shared keep-alive session, creating it on first use
+
+    Returns:
+        requests.Session: Session with pooled adapters mounted for http and https
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+            logger.info(f"Created HTTP session with {pool_connections} pools of {pool_maxsize} connections")
+        return _session
+
+
+def get(
+    url: str,
+    params: Optional[dict] = None,
+    timeout: Optional[Union[float, Tuple[float, float]]] = None,
+    acquire: Optional[Callable[[], object]] = None,
+) -> requests.Response:
+    """
+    Sends a GET request through the shared session with retries
+
+    Connection errors, timeouts and responses with a status in RETRY_STATUSES are
+    retried up to ``max_retries`` times with jittered exponential backoff. Every
+    attempt, retries included, first calls ``acquire``, so a rate budget counts each
+    request actually sent.
+
+    Args:
+        url (str): The URL to fetch
+        params (dict, optional): Query string parameters
+        timeout (float or tuple, optional): Overrides the configured (connect, read) timeouts
+        acquire (Callable, optional): Called before each attempt, e.g. to take a call budget token;
+            whatever it raises ends the request
+
+    Returns:
+        requests.Response: The last response received
+
+    Raises:
+        requests.exceptions.RequestException: If every attempt failed without a response
+    """
+    if timeout is None:
+        timeout = (connect_timeout, read_timeout)
+
+    for attempt in range(max_retries + 1):
+        retries_left = attempt < max_retries
+        if acquire is not None:
+            acquire()
+        try:
+            response = get_session().get(url, params=params, timeout=timeout)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if not retries_left:
+                raise
+            logger.warning(f"GET {url} failed ({e}), retrying")
+            _sleep_before_retry(attempt)
+            continue
+
+        if response.status_code not in RETRY_STATUSES or not retries_left:
+            return response
+
+        logger.warning(f"GET {url} returned a retryable response ({response.status_code}), retrying")
+        _sleep_before_retry(attempt, response.headers.get("Retry-After"))
+
+
+def _sleep_before_retry(attempt: int, retry_after: Optional[str] = None) -> None:
+    """
+    Sleeps for a jittered exponential backoff, honouring a numeric Retry-After header
+
+    Args:
+        attempt (int): Zero-based number of the attempt that just failed
+        retry_after (str, optional): Value of the upstream Retry-After header
+    """
+    delay = random.uniform(0, min(max_backoff_seconds, backoff_seconds * (2 ** attempt)))
+    if retry_after is not None and retry_after.isdigit():
+        delay = max(delay, min(float(retry_after), max_backoff_seconds))
+    time.sleep(delay)
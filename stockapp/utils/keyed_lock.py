@@ -0,0 +1,52 @@
+import threading
+from contextlib import contextmanager
+from typing import Dict, Hashable, Iterator
+
+
+class _Entry:
+    """A key's lock and the number of threads holding or waiting for it."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.users = 0
+
+
+class KeyedLock:
+    """
+    Serializes work per key, so unrelated keys never wait on each other
+
+    A lock is created the first time a key is used and dropped once no thread holds
+    or waits for it, so memory stays proportional to the keys in use. The locks are
+    reentrant: a thread already holding a key may acquire it again.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    @contextmanager
+    def hold(self, key: Hashable) -> Iterator[None]:
+        """
+        Holds the lock for ``key`` for the duration of the block
+
+        Args:
+            key (Hashable): Identifies the work to serialize, e.g. a user id
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry()
+            entry.users += 1
+
+        try:
+            with entry.lock:
+                yield
+        finally:
+            with self._lock:
+                entry.users -= 1
+                if entry.users == 0:
+                    del self._entries[key]
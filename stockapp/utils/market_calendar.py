@@ -0,0 +1,40 @@
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Optional
+
+
+# Daily bars are published after the US close; 21:30 UTC is past the close in both EST and EDT
+BAR_PUBLISH_TIME_UTC = time(21, 30)
+
+
+def next_trading_day(day: date) -> date:
+    """
+    Returns the first weekday after ``day``
+
+    Exchange holidays are not modelled, so a holiday is treated as a trading day.
+
+    Args:
+        day (date): The reference day
+
+    Returns:
+        date: The next weekday
+    """
+    day += timedelta(days=1)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return day
+
+
+def seconds_until_next_bar(last_bar_date: date, now: Optional[datetime] = None) -> float:
+    """
+    Returns how long until the daily bar after ``last_bar_date`` should be available
+
+    Args:
+        last_bar_date (date): Date of the most recent daily bar we hold
+        now (datetime, optional): Current UTC time, defaults to now
+
+    Returns:
+        float: Seconds until the next bar is published, or 0 if it should already exist
+    """
+    now = now or datetime.now(timezone.utc)
+    publish_at = datetime.combine(next_trading_day(last_bar_date), BAR_PUBLISH_TIME_UTC, tzinfo=timezone.utc)
+    return max(0.0, (publish_at - now).total_seconds())
@@ -0,0 +1,101 @@
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from typing import Union
+
+
+# Money is held as integers: amounts in cents, prices per share in millionths of a dollar
+CENTS_PER_DOLLAR = 100
+MICROS_PER_DOLLAR = 1_000_000
+MICROS_PER_CENT = MICROS_PER_DOLLAR // CENTS_PER_DOLLAR
+
+Amount = Union[int, float, str, Decimal]
+
+
+def to_cents(amount: Amount) -> int:
+    """
+    Converts a dollar amount to whole cents, rounding half away from zero
+
+    Floats are read through their shortest decimal form, so 0.1 + 0.2 is 30 cents.
+
+    Args:
+        amount (int | float | str | Decimal): Amount in dollars
+
+    Returns:
+        int: The amount in cents
+
+    Raises:
+        ValueError: If the amount is not a finite number
+    """
+    return _scale(amount, CENTS_PER_DOLLAR)
+
+
+def to_micros(price: Amount) -> int:
+    """
+    Converts a dollar price to millionths of a dollar, rounding half away from zero
+
+    Args:
+        price (int | float | str | Decimal): Price in dollars
+
+    Returns:
+        int: The price in micro-dollars
+
+    Raises:
+        ValueError: If the price is not a finite number
+    """
+    return _scale(price, MICROS_PER_DOLLAR)
+
+
+def cents_to_dollars(cents: int) -> float:
+    """Converts cents to dollars for display; the result prints with at most two decimals."""
+    return cents / CENTS_PER_DOLLAR
+
+
+def micros_to_dollars(micros: int) -> float:
+    """Converts micro-dollars to dollars for display."""
+    return micros / MICROS_PER_DOLLAR
+
+
+def micros_to_cents(micros: int) -> int:
+    """Rounds micro-dollars to whole cents, half away from zero."""
+    return divide_rounded(micros, MICROS_PER_CENT)
+
+
+def value_cents(shares: int, price_micros: int) -> int:
+    """
+    Values shares at a price, to the cent
+
+    Args:
+        shares (int): Number of shares
+        price_micros (int): Price per share in micro-dollars
+
+    Returns:
+        int: The value in cents, rounded half away from zero
+    """
+    return micros_to_cents(shares * price_micros)
+
+
+def divide_rounded(numerator: int, denominator: int) -> int:
+    """
+    Divides integers, rounding half away from zero
+
+    Args:
+        numerator (int): The dividend
+        denominator (int): The divisor, positive
+
+    Returns:
+        int: The rounded quotient
+    """
+    quotient, remainder = divmod(abs(numerator), denominator)
+    if 2 * remainder >= denominator:
+        quotient += 1
+    return quotient if numerator >= 0 else -quotient
+
+
+def _scale(amount: Amount, units_per_dollar: int) -> int:
+    """Converts dollars to an integer count of ``units_per_dollar`` units. See to_cents."""
+    try:
+        value = Decimal(str(amount)) * units_per_dollar
+    except InvalidOperation:
+        raise ValueError(f"Not an amount of money: {amount!r}")
+    if not value.is_finite():
+        raise ValueError(f"Not an amount of money: {amount!r}")
+    return int(value.to_integral_value(rounding=ROUND_HALF_UP))
@@ -0,0 +1,361 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Deque, Dict, Hashable, List, Optional, Tuple
+
+from stockapp.utils.call_budget import BudgetExceeded, Priority, upstream_context
+from stockapp.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+ORDER_ACTIONS = ("buy", "sell")
+
+# Lifecycle of a queued order; the last three are final
+QUEUED = "queued"
+RUNNING = "running"
+FILLED = "filled"
+REJECTED = "rejected"
+FAILED = "failed"
+
+
+class QueueFull(RuntimeError):
+    """Raised when an order is submitted while the queue holds as many orders as it may."""
+
+
+class QueuedOrder:
+    """
+    A buy or sell accepted for background execution, and its outcome
+
+    Attributes:
+        order_id (str): Identifies the order to its owner
+        user_id (int): Owner of the order
+        username (str): Owner's username, charged for the upstream calls pricing it
+        action (str): "buy" or "sell"
+        symbol (str): Upper-cased stock symbol
+        shares (int): Number of shares
+        ordered (bool): Whether the order waits for the owner's earlier ordered orders
+        status (str): queued, running, filled, rejected or failed
+        submitted_at (float): When the order was accepted
+        finished_at (float): When the order reached a final status, None before
+        not_before (float): When an order put back for upstream budget may run again
+        deferrals (int): Times the order was turned away by the upstream budget
+        fill (dict): The fill and the resulting cash balance, once filled
+        message (str): Why the order was rejected or failed
+    """
+
+    def __init__(self, user_id: int, username: str, action: str, symbol: str, shares: int, ordered: bool = True):
+        self.order_id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.username = username
+        self.action = action
+        self.symbol = symbol
+        self.shares = shares
+        self.ordered = ordered
+        self.status = QUEUED
+        self.submitted_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.not_before: Optional[float] = None
+        self.deferrals = 0
+        self.fill: Optional[dict] = None
+        self.message: Optional[str] = None
+
+    @property
+    def lane(self) -> Hashable:
+        """Orders sharing a lane run one at a time in submission order."""
+        return self.user_id if self.ordered else (self.user_id, self.order_id)
+
+    def to_dict(self) -> dict:
+        """Converts the order into the dict shape returned by the API."""
+        return {
+            "order_id": self.order_id,
+            "action": self.action,
+            "symbol": self.symbol,
+            "shares": self.shares,
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+            "finished_at": self.finished_at,
+            "not_before": self.not_before,
+            "fill": self.fill,
+            "message": self.message,
+        }
+
+
+class OrderQueue:
+    """
+    Executes buy and sell orders on a bounded pool of worker threads
+
+    A request thread only validates and submits an order, so it is not held while
+    the order is priced upstream and committed. Each order is executed like the
+    synchronous routes do: priced at trade priority, then applied through
+    PortfolioStore.update.
+
+    Orders are kept in lanes. An account's ordered orders share one lane and run one
+    at a time in submission order, so a sell can rely on an earlier buy; a rejected
+    order does not stop the ones behind it. Unordered orders get a lane each. Workers
+    take lanes round-robin, so one busy account cannot starve the others.
+
+    An order turned away by the upstream budget is put back at the head of its lane
+    with a not-before time, so no worker sits out the wait and the lane keeps its
+    order; other lanes run meanwhile.
+
+    Orders live in this worker process only, so the queue is off by default: a poll
+    answered by another worker does not find the order, and orders still queued when
+    the process stops are lost. Finished orders stay visible to ``get`` for
+    ``keep_seconds``.
+
+    Attributes:
+        workers (int): Number of worker threads
+        max_pending (int): Most orders queued or running at once
+        keep_seconds (float): How long finished orders can be looked up
+        budget_attempts (int): Times an order is priced before an exhausted upstream budget fails it
+    """
+
+    def __init__(self, workers: int = 4, max_pending: int = 1000, keep_seconds: float = 3600, budget_attempts: int = 3):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.keep_seconds = keep_seconds
+        self.budget_attempts = budget_attempts
+        self._app = None
+        self._orders: Dict[str, QueuedOrder] = {}
+        self._finished: Deque[QueuedOrder] = deque()
+        self._lanes: Dict[Hashable, Deque[QueuedOrder]] = {}
+        self._ready: Deque[Hashable] = deque()
+        self._delayed: List[Tuple[float, int, Hashable]] = []
+        self._sequence = itertools.count()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    @property
+    def running(self) -> bool:
+        """Whether any worker thread is alive."""
+        return any(thread.is_alive() for thread in self._threads)
+
+    @property
+    def pending(self) -> int:
+        """Number of orders queued or running."""
+        with self._lock:
+            return self._pending
+
+    def bind(self, app) -> None:
+        """
+        Sets the application whose context orders are executed in
+
+        Args:
+            app (Flask): The Flask application
+        """
+        self._app = app
+
+    def start(self) -> None:
+        """Starts the worker threads if they are not already running."""
+        if self.running:
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"order-worker-{index}", daemon=True)
+            for index in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Order queue started with {self.workers} workers")
+
+    def stop(self) -> None:
+        """Stops the worker threads after their current order and waits for them to exit."""
+        self._stop.set()
+        with self._available:
+            self._available.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def submit(self, user_id: int, username: str, action: str, symbol: str, shares: int, ordered: bool = True) -> QueuedOrder:
+        """
+        Accepts an order for execution by the workers
+
+        Only the form of the order is checked here; whether cash or shares cover it
+        is checked when it runs, after the orders ahead of it.
+
+        Args:
+            user_id (int): Owner of the order
+            username (str): Owner's username
+            action (str): "buy" or "sell"
+            symbol (str): Upper-cased stock symbol
+            shares (int): Number of shares, positive
+            ordered (bool): Whether to run after the owner's earlier ordered orders
+
+        Returns:
+            QueuedOrder: The order, with status queued
+
+        Raises:
+            ValueError: If the action or the number of shares is invalid
+            QueueFull: If max_pending orders are already queued or running
+        """
+        if action not in ORDER_ACTIONS:
+            raise ValueError(f"Unknown order action '{action}'")
+        if shares <= 0:
+            raise ValueError("Number of shares must be greater than 0")
+        order = QueuedOrder(user_id, username, action, symbol, shares, ordered)
+        with self._available:
+            if self._pending >= self.max_pending:
+                raise QueueFull(f"{self._pending} orders are already waiting; please retry shortly")
+            self._prune()
+            self._orders[order.order_id] = order
+            self._pending += 1
+            lane = self._lanes.get(order.lane)
+            if lane is None:
+                self._lanes[order.lane] = deque([order])
+                self._ready.append(order.lane)
+                self._available.notify()
+            else:
+                lane.append(order)
+
+        logger.info(f"Queued order {order.order_id} to {action} {shares} shares of {symbol} for user {user_id}")
+        return order
+
+    def get(self, order_id: str, user_id: int) -> Optional[QueuedOrder]:
+        """
+        Looks up one of a user's orders
+
+        Args:
+            order_id (str): The order's ID
+            user_id (int): The user asking; other users' orders are not found
+
+        Returns:
+            QueuedOrder: The order, or None if unknown, forgotten or not the user's
+        """
+        with self._lock:
+            order = self._orders.get(order_id)
+        if order is None or order.user_id != user_id:
+            return None
+        return order
+
+    def run_next(self, timeout: Optional[float] = None) -> Optional[QueuedOrder]:
+        """
+        Executes the next order, waiting up to ``timeout`` seconds for one
+
+        Args:
+            timeout (float, optional): Seconds to wait for an order, forever if None
+
+        Returns:
+            QueuedOrder: The order executed or put back for budget, or None if none was due in time
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self._available:
+            while True:
+                now = time.time()
+                while self._delayed and self._delayed[0][0] <= now:
+                    self._ready.append(heapq.heappop(self._delayed)[2])
+                if self._ready or self._stop.is_set():
+                    break
+                wait = None if deadline is None else deadline - now
+                if wait is not None and wait <= 0:
+                    break
+                if self._delayed:
+                    due = self._delayed[0][0] - now
+                    wait = due if wait is None else min(wait, due)
+                self._available.wait(wait)
+            if not self._ready:
+                return None
+            lane = self._ready.popleft()
+            order = self._lanes[lane][0]
+            order.status = RUNNING
+
+        self._execute(order)
+
+        with self._available:
+            if order.status == QUEUED:
+                heapq.heappush(self._delayed, (order.not_before, next(self._sequence), lane))
+                return order
+            self._pending -= 1
+            self._finished.append(order)
+            queue = self._lanes[lane]
+            queue.popleft()
+            if queue:
+                # Back of the line, so other accounts' orders go first
+                self._ready.append(lane)
+                self._available.notify()
+            else:
+                del self._lanes[lane]
+        return order
+
+    def _execute(self, order: QueuedOrder) -> None:
+        """Prices and applies an order, recording its outcome on it, or putting it back as queued."""
+        from stockapp.models.portfolio_model import portfolios
+        from stockapp.models.stock_model import Stocks, fill_to_dict
+
+        def trade(portfolio):
+            apply = portfolio.buy_stock if order.action == "buy" else portfolio.sell_stock
+            return apply(order.symbol, order.shares, quote), portfolio.cash_balance
+
+        try:
+            with self._app.app_context():
+                if order.action == "sell":
+                    # Check the position before spending an upstream call on pricing it
+                    holding = portfolios.refresh(order.user_id).holdings.get(order.symbol)
+                    if holding is None or holding["shares"] < order.shares:
+                        raise ValueError(f"You don't own enough shares of {order.symbol} to sell")
+
+                with upstream_context(Priority.TRADE, order.username):
+                    quote = Stocks.get_stock_price(order.symbol, max_age=Stocks.order_quote_max_age_seconds)
+                fill, cash_balance = portfolios.update(order.user_id, trade)
+            order.fill = dict(fill_to_dict(fill), cash_balance=cash_balance)
+            order.message = None
+            order.status = FILLED
+        except ValueError as e:
+            order.message = str(e)
+            order.status = REJECTED
+        except BudgetExceeded as e:
+            order.deferrals += 1
+            order.message = str(e)
+            if order.deferrals < self.budget_attempts:
+                order.not_before = time.time() + e.retry_after
+                order.status = QUEUED
+                logger.info(f"Order {order.order_id} put back for {e.retry_after:.1f}s of upstream budget")
+                return
+            order.status = FAILED
+        except Exception as e:
+            logger.error(f"Order {order.order_id} failed: {e}")
+            order.message = str(e)
+            order.status = FAILED
+        order.finished_at = time.time()
+        logger.info(f"Order {order.order_id} {order.status}")
+
+    def _prune(self) -> None:
+        """Forgets orders finished more than keep_seconds ago. Call under _lock."""
+        cutoff = time.time() - self.keep_seconds
+        while self._finished and self._finished[0].finished_at < cutoff:
+            del self._orders[self._finished.popleft().order_id]
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_next(timeout=1.0)
+            except Exception as e:
+                logger.error(f"Order worker failed: {e}")
+
+
+# Shared queue started by create_app
+order_queue = OrderQueue()
+
+
+def init_app(app) -> None:
+    """
+    Configures the shared order queue and starts its workers if enabled in the Flask config
+
+    Args:
+        app (Flask): The Flask application
+    """
+    order_queue.workers = app.config.get("ORDER_QUEUE_WORKERS", 4)
+    order_queue.max_pending = app.config.get("ORDER_QUEUE_MAX_PENDING", 1000)
+    order_queue.keep_seconds = app.config.get("ORDER_QUEUE_KEEP_SECONDS", 3600)
+    order_queue.bind(app)
+    if app.config.get("ORDER_QUEUE_ENABLED", False):
+        order_queue.start()
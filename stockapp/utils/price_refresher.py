@@ -0,0 +1,179 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from stockapp.utils.cache import quote_cache
+from stockapp.utils.call_budget import Priority, upstream_budget, upstream_context
+from stockapp.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+class PriceRefresher:
+    """
+    Re-fetches quotes for active symbols in the background before they expire
+
+    Active symbols are those held in a portfolio or requested recently. A worker
+    thread wakes every ``interval_seconds`` and refreshes the ones whose cached quote
+    expires within ``refresh_ahead_seconds``, at background priority so it only uses
+    upstream budget nobody else needs. Readers that find an expired quote while the
+    refresher runs are served the stale value and queue the symbol for refresh.
+
+    Attributes:
+        interval_seconds (float): Time between refresh passes
+        refresh_ahead_seconds (float): Refresh quotes expiring within this many seconds
+        track_seconds (float): How long a requested symbol stays active without new requests
+        max_tracked (int): Maximum number of recently requested symbols tracked
+    """
+
+    def __init__(
+        self,
+        interval_seconds: float = 5.0,
+        refresh_ahead_seconds: float = 10.0,
+        track_seconds: float = 600.0,
+        max_tracked: int = 500,
+    ):
+        self.interval_seconds = interval_seconds
+        self.refresh_ahead_seconds = refresh_ahead_seconds
+        self.track_seconds = track_seconds
+        self.max_tracked = max_tracked
+        self._held_symbols: Callable[[], Iterable[str]] = lambda: ()
+        self._requested: Dict[str, float] = {}
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        """Whether the worker thread is alive."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def set_held_symbols(self, held_symbols: Callable[[], Iterable[str]]) -> None:
+        """
+        Registers the callable that lists symbols currently held in portfolios
+
+        Args:
+            held_symbols (Callable): Returns the held symbols when called
+        """
+        self._held_symbols = held_symbols
+
+    def track(self, symbols: Iterable[str]) -> None:
+        """
+        Marks symbols as recently requested
+
+        Args:
+            symbols (Iterable[str]): Upper-cased stock symbols
+        """
+        now = time.time()
+        with self._lock:
+            for symbol in symbols:
+                self._requested.pop(symbol, None)
+                self._requested[symbol] = now
+            while len(self._requested) > self.max_tracked:
+                del self._requested[next(iter(self._requested))]
+
+    def request_refresh(self, symbols: Iterable[str]) -> None:
+        """
+        Queues symbols for refresh on the next pass and wakes the worker
+
+        Args:
+            symbols (Iterable[str]): Upper-cased stock symbols
+        """
+        with self._lock:
+            self._pending.update(symbols)
+        self._wake.set()
+
+    def start(self) -> None:
+        """Starts the worker thread if it is not already running."""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="price-refresher", daemon=True)
+        self._thread.start()
+        logger.info(f"Price refresher started, refreshing every {self.interval_seconds}s")
+
+    def stop(self) -> None:
+        """Stops the worker thread and waits for it to exit."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def refresh_due(self) -> int:
+        """
+        Refreshes every active symbol whose quote is missing or about to expire
+
+        Returns:
+            int: Number of quotes refreshed
+        """
+        from stockapp.models.stock_model import Stocks
+
+        symbols = self._due_symbols()
+        if not symbols:
+            return 0
+
+        wait = upstream_budget.estimate_wait(Priority.BACKGROUND)
+        if wait > 0:
+            logger.info(f"Skipping refresh of {len(symbols)} symbols, upstream budget frees in {wait:.1f}s")
+            return 0
+
+        with upstream_context(Priority.BACKGROUND):
+            quotes = Stocks.refresh_stock_prices(symbols)
+
+        with self._lock:
+            self._pending.difference_update(symbols)
+        logger.debug(f"Refreshed {len(quotes)} of {len(symbols)} due quotes")
+        return len(quotes)
+
+    def _due_symbols(self) -> List[str]:
+        """Returns the active symbols whose cached quote expires within refresh_ahead_seconds."""
+        now = time.time()
+        with self._lock:
+            cutoff = now - self.track_seconds
+            self._requested = {symbol: seen for symbol, seen in self._requested.items() if seen > cutoff}
+            active = set(self._requested) | self._pending
+
+        active.update(symbol.upper() for symbol in self._held_symbols())
+
+        due = []
+        for symbol in active:
+            remaining = quote_cache.ttl_remaining(symbol)
+            if remaining is None or remaining < self.refresh_ahead_seconds:
+                due.append(symbol)
+        return due
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.interval_seconds)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.refresh_due()
+            except Exception as e:
+                logger.error(f"Price refresh pass failed: {e}")
+
+
+# Shared refresher started by create_app
+price_refresher = PriceRefresher()
+
+
+def init_app(app, held_symbols: Callable[[], Iterable[str]]) -> None:
+    """
+    Configures the shared refresher and starts it if enabled in the Flask config
+
+    Args:
+        app (Flask): The Flask application
+        held_symbols (Callable): Returns the symbols currently held in portfolios
+    """
+    price_refresher.interval_seconds = app.config.get("PRICE_REFRESH_INTERVAL_SECONDS", 5.0)
+    price_refresher.refresh_ahead_seconds = app.config.get("PRICE_REFRESH_AHEAD_SECONDS", 10.0)
+    price_refresher.set_held_symbols(held_symbols)
+    if app.config.get("PRICE_REFRESHER_ENABLED", False):
+        price_refresher.start()
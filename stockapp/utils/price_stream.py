@@ -0,0 +1,204 @@
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from stockapp.utils.call_budget import Priority, upstream_context
+from stockapp.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+class Subscription:
+    """
+    One client's connection to the price stream
+
+    Updates wait in a bounded queue until the client reads them. If the client falls
+    behind, the oldest update is dropped, since a newer one supersedes it.
+
+    Attributes:
+        symbols (Callable): Returns the symbols the client follows when called
+        dropped (int): Number of updates dropped because the client fell behind
+    """
+
+    def __init__(self, symbols: Callable[[], Iterable[str]], queue_size: int):
+        self.symbols = symbols
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._last_prices: Dict[str, float] = {}
+
+    def get(self, timeout: float) -> Optional[dict]:
+        """
+        Waits for the next update
+
+        Args:
+            timeout (float): Longest wait in seconds
+
+        Returns:
+            dict: The update, or None if none arrived in time
+        """
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def offer(self, prices: Dict[str, float]) -> bool:
+        """
+        Queues an update if any of the client's prices changed since the last one
+
+        Args:
+            prices (Dict[str, float]): Current prices of the client's symbols
+
+        Returns:
+            bool: Whether an update was queued
+        """
+        merged = dict(self._last_prices, **prices)
+        if merged == self._last_prices:
+            return False
+        self._last_prices = merged
+
+        update = {"prices": merged, "as_of": time.time()}
+        while True:
+            try:
+                self._queue.put_nowait(update)
+                return True
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+
+class PriceStream:
+    """
+    Fans price updates out to every subscribed client from one shared poller
+
+    Each pass collects the symbols of all subscribers and prices them with a single
+    Stocks.get_stock_prices call. A symbol is therefore fetched at most once per
+    interval however many clients follow it, and usually comes straight from the
+    quote cache kept warm by the price refresher. The poller runs only while there
+    are subscribers.
+
+    Attributes:
+        interval_seconds (float): Time between polling passes
+        queue_size (int): Updates buffered per client before the oldest is dropped
+    """
+
+    def __init__(self, interval_seconds: float = 5.0, queue_size: int = 16):
+        self.interval_seconds = interval_seconds
+        self.queue_size = queue_size
+        self._subscriptions: List[Subscription] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        """Whether the poller thread is alive."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def subscribe(self, symbols: Callable[[], Iterable[str]]) -> Subscription:
+        """
+        Registers a client and returns its subscription
+
+        Args:
+            symbols (Callable): Returns the symbols the client follows, re-read every pass
+
+        Returns:
+            Subscription: Read updates from it with get
+        """
+        subscription = Subscription(symbols, self.queue_size)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        logger.info(f"Price stream subscriber added ({len(self._subscriptions)} connected)")
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """
+        Removes a client; the poller stops after the last one leaves
+
+        Args:
+            subscription (Subscription): The subscription returned by subscribe
+        """
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+        if subscription.dropped:
+            logger.info(f"Price stream subscriber fell behind and missed {subscription.dropped} updates")
+
+    def start(self) -> None:
+        """Starts the poller thread if there are subscribers and it is not already running."""
+        with self._lock:
+            if self.running or not self._subscriptions:
+                return
+            self._thread = threading.Thread(target=self._run, name="price-stream", daemon=True)
+            self._thread.start()
+        logger.info(f"Price stream poller started, polling every {self.interval_seconds}s")
+
+    def poll_once(self) -> int:
+        """
+        Prices the symbols of every subscriber once and queues their updates
+
+        Returns:
+            int: Number of subscribers that received an update
+        """
+        from stockapp.models.stock_model import Stocks
+
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+
+        followed = {}
+        for subscription in subscriptions:
+            try:
+                followed[subscription] = list(subscription.symbols())
+            except Exception as e:
+                logger.error(f"Could not read subscribed symbols: {e}")
+                followed[subscription] = []
+
+        symbols = {symbol.upper() for symbols in followed.values() for symbol in symbols}
+        if not symbols:
+            return 0
+
+        with upstream_context(Priority.VALUATION):
+            quotes = Stocks.get_stock_prices(symbols)
+
+        notified = 0
+        for subscription, symbols in followed.items():
+            prices = {
+                symbol: quotes[symbol.upper()]["price"]
+                for symbol in symbols if symbol.upper() in quotes
+            }
+            if subscription.offer(prices):
+                notified += 1
+        return notified
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._subscriptions:
+                    self._thread = None
+                    logger.info("Price stream poller stopped, no subscribers left")
+                    return
+            try:
+                self.poll_once()
+            except Exception as e:
+                logger.error(f"Price stream pass failed: {e}")
+            time.sleep(self.interval_seconds)
+
+
+# Shared stream behind the /api/price-stream endpoint
+price_stream = PriceStream()
+
+
+def init_app(app) -> None:
+    """
+    Applies the stream settings from the Flask config
+
+    Args:
+        app (Flask): The Flask application
+    """
+    price_stream.interval_seconds = app.config.get("PRICE_STREAM_INTERVAL_SECONDS", 5.0)
+    price_stream.queue_size = app.config.get("PRICE_STREAM_QUEUE_SIZE", 16)
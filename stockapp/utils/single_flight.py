@@ -0,0 +1,129 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, Type
+
+from stockapp.utils.call_budget import BudgetExceeded, current_priority
+from stockapp.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+class _Call:
+    """An in-flight call whose outcome is shared with every waiter."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one execution
+
+    The first caller for a key runs the function; callers arriving while it is in
+    flight wait for its result or its error instead of repeating the work. A failure
+    is remembered for ``failure_ttl_seconds`` so a burst of callers right after an
+    error does not retry it immediately. Transient errors, such as a call shed by the
+    upstream budget, are neither remembered nor passed on: each waiter tries again.
+
+    When a ``scope`` is given, calls are only coalesced within the same scope, so a
+    caller never waits behind, or inherits the outcome of, a call made on other terms.
+
+    Attributes:
+        failure_ttl_seconds (float): How long a failure is re-raised without retrying
+        transient_errors (tuple): Error types that are never remembered or shared
+    """
+
+    def __init__(
+        self,
+        failure_ttl_seconds: float = 5.0,
+        transient_errors: Tuple[Type[BaseException], ...] = (),
+        scope: Optional[Callable[[], Hashable]] = None,
+    ):
+        self.failure_ttl_seconds = failure_ttl_seconds
+        self.transient_errors = transient_errors
+        self._scope = scope
+        self._calls: Dict[Hashable, _Call] = {}
+        self._failures: Dict[Hashable, Tuple[BaseException, float]] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Runs ``fn`` unless a call for ``key`` is already in flight, then shares its outcome
+
+        Args:
+            key (Hashable): Identifies identical calls, e.g. (function, symbol)
+            fn (Callable): Zero-argument function performing the work
+
+        Returns:
+            Any: The result of the shared call
+
+        Raises:
+            Exception: The error raised by the shared call, or a recently cached failure
+        """
+        if self._scope is not None:
+            key = (self._scope(), key)
+
+        while True:
+            with self._lock:
+                failure = self._failures.get(key)
+                if failure is not None:
+                    error, expires_at = failure
+                    if expires_at > time.time():
+                        raise error
+                    del self._failures[key]
+
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = _Call()
+                    self._calls[key] = call
+
+            if leader:
+                break
+
+            logger.debug(f"Joining in-flight call for {key}")
+            call.done.wait()
+            if call.error is None:
+                return call.result
+            if not isinstance(call.error, self.transient_errors):
+                raise call.error
+            # The leader was turned away; this caller makes its own attempt
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            if self.failure_ttl_seconds > 0 and not isinstance(e, self.transient_errors):
+                with self._lock:
+                    self._failures[key] = (e, time.time() + self.failure_ttl_seconds)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def clear(self) -> None:
+        """Forgets every remembered failure."""
+        with self._lock:
+            self._failures.clear()
+
+
+# Shared by every upstream market-data fetch, keyed by (function, symbol) within the
+# caller's priority, so a shed low-priority fetch never holds up or fails a trade
+upstream_flights = SingleFlight(transient_errors=(BudgetExceeded,), scope=current_priority)
+
+
+def init_app(app) -> None:
+    """
+    Applies the failure window from the Flask config
+
+    Args:
+        app (Flask): The Flask application
+    """
+    upstream_flights.failure_ttl_seconds = app.config.get("UPSTREAM_FAILURE_TTL_SECONDS", 5.0)
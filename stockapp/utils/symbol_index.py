@@ -0,0 +1,204 @@
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from stockapp.providers.base import parse_listing_csv
+from stockapp.providers.registry import get_provider
+from stockapp.utils.cache import unknown_symbol_cache
+from stockapp.utils.call_budget import Priority, upstream_context
+from stockapp.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+# Tickers are 1-10 letters or digits, with "." or "-" for share classes (BRK.B, BF-B)
+SYMBOL_PATTERN = re.compile(r"^[A-Z0-9][A-Z0-9.\-]{0,9}$")
+
+# Wait before retrying a listing load that failed
+RETRY_SECONDS = 300
+
+
+class SymbolIndex:
+    """
+    The universe of listed symbols, held in memory for prefix search and validation
+
+    Symbols and lower-cased company names are kept in sorted lists, so a prefix
+    search is a binary search followed by a short scan. A reload builds new lists and
+    swaps them in at once, so readers never see a half-built index.
+
+    Until a listing is loaded, every well-formed symbol is accepted and only symbols
+    the provider reported as unknown are rejected.
+
+    Attributes:
+        loaded_at (float): When the current listing was loaded, None before the first load
+    """
+
+    def __init__(self):
+        self.loaded_at: Optional[float] = None
+        self._entries: Dict[str, dict] = {}
+        self._symbols: List[str] = []
+        self._names: List[Tuple[str, str]] = []
+        self._loader: Optional[threading.Thread] = None
+
+    @property
+    def loaded(self) -> bool:
+        """Whether a listing has been loaded."""
+        return self.loaded_at is not None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def load(self, listing: Iterable[dict]) -> int:
+        """
+        Replaces the index with a new listing
+
+        Args:
+            listing (Iterable[dict]): Listings with symbol, name, exchange and asset type
+
+        Returns:
+            int: Number of symbols indexed
+        """
+        entries = {entry["symbol"].upper(): dict(entry, symbol=entry["symbol"].upper()) for entry in listing}
+        symbols = sorted(entries)
+        names = sorted((entry["name"].lower(), symbol) for symbol, entry in entries.items() if entry.get("name"))
+
+        self._entries, self._symbols, self._names = entries, symbols, names
+        self.loaded_at = time.time()
+        logger.info(f"Indexed {len(entries)} listed symbols")
+        return len(entries)
+
+    def get(self, symbol: str) -> Optional[dict]:
+        """
+        Returns the listing of a symbol
+
+        Args:
+            symbol (str): The stock symbol
+
+        Returns:
+            dict: The listing, or None if the symbol is not listed
+        """
+        return self._entries.get(symbol.strip().upper())
+
+    def search(self, query: str, limit: int = 10) -> List[dict]:
+        """
+        Finds listings whose symbol, then whose company name, starts with ``query``
+
+        Args:
+            query (str): Prefix typed by the user
+            limit (int): Maximum number of results
+
+        Returns:
+            List[dict]: Matching listings, symbol matches first, each group sorted
+        """
+        query = query.strip()
+        if not query or limit <= 0:
+            return []
+
+        entries, symbols, names = self._entries, self._symbols, self._names
+        matches: List[str] = []
+
+        prefix = query.upper()
+        for symbol in symbols[bisect_left(symbols, prefix):]:
+            if not symbol.startswith(prefix) or len(matches) >= limit:
+                break
+            matches.append(symbol)
+
+        prefix = query.lower()
+        for name, symbol in names[bisect_left(names, (prefix, "")):]:
+            if not name.startswith(prefix) or len(matches) >= limit:
+                break
+            if symbol not in matches:
+                matches.append(symbol)
+
+        return [dict(entries[symbol]) for symbol in matches]
+
+    def validate(self, symbol: str) -> str:
+        """
+        Checks a symbol before any upstream call is spent on it
+
+        Args:
+            symbol (str): The stock symbol
+
+        Returns:
+            str: The upper-cased symbol
+
+        Raises:
+            ValueError: If the symbol is malformed, not listed, or recently reported
+                unknown by the provider
+        """
+        symbol = symbol.strip().upper()
+        if not SYMBOL_PATTERN.match(symbol):
+            raise ValueError(f"'{symbol}' is not a valid stock symbol.")
+        if unknown_symbol_cache.get(symbol) is not None:
+            raise ValueError(f"Unknown stock symbol '{symbol}'.")
+        if self.loaded and symbol not in self._entries:
+            raise ValueError(f"Unknown stock symbol '{symbol}'.")
+        return symbol
+
+    def remember_unknown(self, symbol: str) -> None:
+        """
+        Negatively caches a symbol the provider has no data for
+
+        Args:
+            symbol (str): Upper-cased stock symbol
+        """
+        logger.info(f"Remembering {symbol} as unknown")
+        unknown_symbol_cache.set(symbol, True)
+
+    def start_loader(self, load_listing, refresh_seconds: float) -> None:
+        """
+        Loads the listing on a background thread and reloads it periodically
+
+        Args:
+            load_listing (Callable): Returns the listing when called
+            refresh_seconds (float): Time between reloads
+        """
+        if self._loader is not None and self._loader.is_alive():
+            return
+
+        def run():
+            while True:
+                try:
+                    self.load(load_listing())
+                    wait = refresh_seconds
+                except Exception as e:
+                    logger.error(f"Could not load the symbol listing: {e}")
+                    wait = RETRY_SECONDS
+                time.sleep(wait)
+
+        self._loader = threading.Thread(target=run, name="symbol-index", daemon=True)
+        self._loader.start()
+
+
+# Shared index consulted by every symbol-taking request
+symbol_index = SymbolIndex()
+
+
+def init_app(app) -> None:
+    """
+    Loads the symbol listing named in the Flask config
+
+    SYMBOL_LISTING_FILE loads a bundled LISTING_STATUS-format CSV at startup.
+    Otherwise, if SYMBOL_INDEX_ENABLED is set, the listing is fetched from the
+    market-data provider in the background and refreshed daily.
+
+    Args:
+        app (Flask): The Flask application
+    """
+    unknown_symbol_cache.configure(ttl_seconds=app.config.get("UNKNOWN_SYMBOL_TTL_SECONDS", 3600))
+
+    listing_file = app.config.get("SYMBOL_LISTING_FILE")
+    if listing_file:
+        with open(listing_file, newline="") as f:
+            symbol_index.load(parse_listing_csv(f))
+    elif app.config.get("SYMBOL_INDEX_ENABLED", False):
+        def load_listing():
+            with upstream_context(Priority.LOOKUP):
+                return get_provider().get_listing()
+
+        symbol_index.start_loader(load_listing, app.config.get("SYMBOL_INDEX_REFRESH_SECONDS", 24 * 3600))
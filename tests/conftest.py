@@ -3,6 +3,29 @@ import pytest
 from app import create_app
 from config import TestConfig
 from stockapp.db import db
+from stockapp.models.portfolio_model import portfolios
+from stockapp.utils.cache import (
+    analytics_cache,
+    daily_series_cache,
+    overview_cache,
+    quote_cache,
+    response_cache,
+    unknown_symbol_cache,
+)
+from stockapp.utils.single_flight import upstream_flights
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    caches = (quote_cache, overview_cache, daily_series_cache, analytics_cache, unknown_symbol_cache, response_cache)
+    for cache in caches:
+        cache.clear()
+    upstream_flights.clear()
+    portfolios.clear()
+    yield
+    for cache in caches:
+        cache.clear()
+    upstream_flights.clear()
+    portfolios.clear()
 
 @pytest.fixture
 def app():
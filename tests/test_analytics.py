@@ -0,0 +1,101 @@
+import math
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from stockapp.utils.analytics import (
+    compute_analytics,
+    ema,
+    forward_fill,
+    holdings_values,
+    log_returns,
+    max_drawdown,
+    rolling_volatility,
+    simple_returns,
+    sma,
+)
+
+
+@pytest.fixture
+def closes():
+    rng = np.random.default_rng(7)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 600)))
+
+
+def test_returns_align_with_closes():
+    """Test that simple and log returns start with NaN and follow the closes."""
+    closes = np.array([100.0, 110.0, 99.0])
+
+    np.testing.assert_allclose(simple_returns(closes)[1:], [0.1, -0.1])
+    np.testing.assert_allclose(log_returns(closes)[1:], np.log([1.1, 0.9]))
+    assert math.isnan(simple_returns(closes)[0])
+
+
+def test_sma_matches_window_means(closes):
+    """Test that the running-sum SMA equals the mean of each window."""
+    result = sma(closes, 20)
+
+    assert np.isnan(result[:19]).all()
+    np.testing.assert_allclose(result[19:], [closes[i - 19:i + 1].mean() for i in range(19, len(closes))])
+
+
+def test_ema_matches_recurrence(closes):
+    """Test that the blocked closed-form EMA equals the textbook recurrence."""
+    alpha = 2 / 13
+    expected = [closes[0]]
+    for value in closes[1:]:
+        expected.append(alpha * value + (1 - alpha) * expected[-1])
+
+    np.testing.assert_allclose(ema(closes, 12), expected, rtol=1e-10)
+
+
+def test_rolling_volatility_matches_sample_std(closes):
+    """Test that rolling volatility is the annualised sample std of each return window."""
+    returns = log_returns(closes)
+    result = rolling_volatility(returns, 20)
+
+    assert np.isnan(result[:20]).all()
+    expected = np.std(returns[-20:], ddof=1) * math.sqrt(252)
+    assert result[-1] == pytest.approx(expected)
+
+
+def test_max_drawdown_finds_peak_and_trough():
+    """Test that the largest decline is measured from its running peak."""
+    drawdown = max_drawdown(np.array([100.0, 120.0, 90.0, 130.0, 110.0]))
+
+    assert drawdown == {"drawdown": pytest.approx(-0.25), "peak": 1, "trough": 2}
+
+
+def test_compute_analytics_summary(closes):
+    """Test the 52-week range window and the JSON-safe series tail."""
+    start = date(2023, 1, 2)
+    dates = [start + timedelta(days=i) for i in range(len(closes))]
+
+    analytics = compute_analytics(dates, closes + 1, closes - 1, closes)
+
+    assert analytics["bars"] == 600
+    assert analytics["latest_close"] == closes[-1]
+    assert analytics["range_52_week"]["high"] == pytest.approx(closes[-366:].max() + 1)
+    assert len(analytics["series"]["close"]) == 252
+    assert analytics["moving_averages"]["sma_200"] == pytest.approx(closes[-200:].mean())
+    assert None not in analytics["series"]["sma_200"]
+
+
+def test_forward_fill_carries_last_close_down_columns():
+    """Test that gaps take the previous close and leading gaps stay empty."""
+    matrix = np.array([[1.0, np.nan], [np.nan, 5.0], [3.0, np.nan]])
+
+    filled = forward_fill(matrix)
+
+    np.testing.assert_array_equal(filled[:, 0], [1.0, 1.0, 3.0])
+    assert np.isnan(filled[0, 1])
+    np.testing.assert_array_equal(filled[1:, 1], [5.0, 5.0])
+
+
+def test_holdings_values_accepts_constant_or_dated_shares():
+    """Test that shares may be one row for every date or a row per date."""
+    closes = np.array([[10.0, 20.0], [11.0, np.nan]])
+
+    np.testing.assert_array_equal(holdings_values(closes, np.array([1.0, 2.0])), [50.0, 11.0])
+    np.testing.assert_array_equal(holdings_values(closes, np.array([[1.0, 0.0], [2.0, 2.0]])), [10.0, 22.0])
@@ -0,0 +1,129 @@
+import pytest
+
+from stockapp.db import db
+from stockapp.models.account_model import Accounts
+from stockapp.models.portfolio_model import PortfolioModel, portfolios
+from stockapp.models.stock_model import Stocks
+from stockapp.models.trade_model import Trades
+from stockapp.models.user_model import Users
+from stockapp.providers import registry
+from stockapp.providers.fixture_provider import FixtureProvider
+
+
+@pytest.fixture
+def logged_in(app, client):
+    app.config["SECRET_KEY"] = "test"
+    previous = registry.get_provider()
+    registry.set_provider(FixtureProvider())
+    client.put("/api/create-user", json={"username": "alice", "password": "secret"})
+    client.post("/api/login", json={"username": "alice", "password": "secret"})
+    yield client
+    registry.set_provider(previous)
+
+##########################################################
+# Quotes
+##########################################################
+
+def test_quotes_dedupes_and_upper_cases_symbols(logged_in, mocker):
+    """Test that each symbol is priced once, whatever its case or repetition."""
+    get_stock_prices = mocker.spy(Stocks, "get_stock_prices")
+
+    response = logged_in.get("/api/quotes?symbols=aapl, AAPL,msft,,Msft")
+
+    assert response.status_code == 200
+    assert get_stock_prices.call_args.args[-1] == ["AAPL", "MSFT"]
+    assert sorted(response.get_json()["quotes"]) == ["AAPL", "MSFT"]
+    assert response.get_json()["missing"] == []
+
+def test_quotes_rejects_too_many_symbols(app, logged_in):
+    """Test that a request over QUOTES_MAX_SYMBOLS is refused before any pricing."""
+    app.config["QUOTES_MAX_SYMBOLS"] = 2
+
+    response = logged_in.get("/api/quotes?symbols=AAPL,MSFT,GOOG")
+
+    assert response.status_code == 400
+    assert response.get_json()["message"] == "At most 2 symbols can be quoted per request"
+
+def test_quotes_lists_unknown_symbols_as_missing(logged_in):
+    """Test that symbols without a price are reported in missing instead of failing the request."""
+    response = logged_in.get("/api/quotes?symbols=AAPL,ZZZZ")
+
+    assert response.status_code == 200
+    assert list(response.get_json()["quotes"]) == ["AAPL"]
+    assert response.get_json()["missing"] == ["ZZZZ"]
+
+##########################################################
+# Conditional GETs
+##########################################################
+
+def test_cold_lookup_is_tagged_and_revalidates(logged_in):
+    """Test that the first lookup on a cold cache carries an ETag that the next request matches."""
+    first = logged_in.get("/api/lookup-stock/aapl")
+    etag = first.headers.get("ETag")
+
+    assert first.status_code == 200
+    assert etag is not None
+
+    second = logged_in.get("/api/lookup-stock/AAPL", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.headers["ETag"] == etag
+
+def test_portfolio_revalidation_does_not_price(logged_in, mocker):
+    """Test that a matching If-None-Match is answered from cached quotes without pricing the page."""
+    logged_in.post("/api/deposit-cash", json={"amount": 1000})
+    logged_in.post("/api/buy-stock", json={"symbol": "AAPL", "shares": 1})
+    first = logged_in.get("/api/view-portfolio")
+    etag = first.headers["ETag"]
+    update_prices = mocker.spy(PortfolioModel, "update_prices")
+
+    second = logged_in.get("/api/view-portfolio", headers={"If-None-Match": etag})
+
+    assert first.status_code == 200
+    assert [holding["symbol"] for holding in first.get_json()["holdings"]["portfolio"]] == ["AAPL"]
+    assert second.status_code == 304
+    assert second.headers["ETag"] == etag
+    update_prices.assert_not_called()
+
+##########################################################
+# Resets
+##########################################################
+
+def test_reset_users_removes_everything_they_own(logged_in):
+    """Test that resetting users deletes their accounts, positions and ledgers, and frees the ids."""
+    logged_in.post("/api/deposit-cash", json={"amount": 1000})
+    logged_in.post("/api/buy-stock", json={"symbol": "AAPL", "shares": 2})
+    assert Stocks.query.count() == 1
+
+    response = logged_in.delete("/api/reset-users")
+
+    assert response.status_code == 200
+    assert Users.query.count() == 0
+    assert Accounts.query.count() == 0
+    assert Stocks.query.count() == 0
+    assert Trades.query.count() == 0
+
+    # Requests share the test's session; a server starts each one with a fresh session
+    db.session.remove()
+    logged_in.put("/api/create-user", json={"username": "bob", "password": "secret"})
+    logged_in.post("/api/login", json={"username": "bob", "password": "secret"})
+    portfolio = logged_in.get("/api/view-portfolio").get_json()
+    assert portfolio["holdings"]["portfolio"] == []
+    assert portfolio["cash_balance"] == 0.0
+
+##########################################################
+# Portfolio pages
+##########################################################
+
+def test_reloaded_portfolio_pages_by_value_with_the_full_valuation(logged_in):
+    """Test that a portfolio reloaded into the store ranks by value and values every holding on a page."""
+    logged_in.post("/api/deposit-cash", json={"amount": 100000})
+    for symbol, shares in (("AAPL", 1), ("MSFT", 100), ("GOOG", 5)):
+        logged_in.post("/api/buy-stock", json={"symbol": symbol, "shares": shares})
+    full = logged_in.get("/api/view-portfolio").get_json()
+    portfolios.clear()
+
+    page = logged_in.get("/api/view-portfolio?sort=-value&limit=1").get_json()
+
+    assert [holding["symbol"] for holding in page["holdings"]["portfolio"]] == ["MSFT"]
+    assert page["portfolio_value"] == full["portfolio_value"]
+    assert page["portfolio_value"]["unpriced_symbols"] == []
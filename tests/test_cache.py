@@ -0,0 +1,88 @@
+import pytest
+
+from stockapp.utils.cache import TTLCache
+
+
+@pytest.fixture
+def cache():
+    return TTLCache(ttl_seconds=60, max_entries=2)
+
+def test_get_returns_stored_value(cache):
+    """Test that a stored value is returned and counted as a hit."""
+    cache.set("AAPL", 150.0)
+
+    assert cache.get("AAPL") == 150.0
+    assert cache.stats()["hits"] == 1
+
+def test_get_missing_key_counts_miss(cache):
+    """Test that a missing key returns the default and counts a miss."""
+    assert cache.get("MSFT", "N/A") == "N/A"
+    assert cache.stats()["misses"] == 1
+
+def test_expired_entry_is_a_miss(cache, mocker):
+    """Test that entries are not returned after their TTL."""
+    mock_time = mocker.patch("stockapp.utils.cache.time.time", return_value=1000.0)
+    cache.set("AAPL", 150.0, ttl=5)
+
+    mock_time.return_value = 1006.0
+
+    assert cache.get("AAPL") is None
+    assert len(cache) == 0
+
+def test_lru_eviction(cache):
+    """Test that the least recently used entry is evicted when full."""
+    cache.set("AAPL", 150.0)
+    cache.set("MSFT", 300.0)
+    cache.get("AAPL")
+    cache.set("GOOG", 120.0)
+
+    assert cache.get("MSFT") is None
+    assert cache.get("AAPL") == 150.0
+    assert cache.stats()["evictions"] == 1
+
+def test_configure_shrinks_cache(cache):
+    """Test that lowering max_entries evicts the overflow."""
+    cache.set("AAPL", 150.0)
+    cache.set("MSFT", 300.0)
+    cache.configure(max_entries=1)
+
+    assert len(cache) == 1
+    assert cache.get("MSFT") == 300.0
+
+def test_get_stale_serves_expired_entry_with_age(mocker):
+    """Test that expired entries stay readable through get_stale within the window."""
+    mock_time = mocker.patch("stockapp.utils.cache.time.time", return_value=1000.0)
+    cache = TTLCache(ttl_seconds=5, stale_seconds=30)
+    cache.set("AAPL", 150.0)
+
+    mock_time.return_value = 1010.0
+
+    assert cache.get("AAPL") is None
+    assert cache.get_stale("AAPL") == (150.0, 10.0)
+
+    mock_time.return_value = 1040.0
+
+    assert cache.get_stale("AAPL") is None
+
+def test_ttl_remaining(mocker):
+    """Test that ttl_remaining reports time left without touching counters."""
+    mocker.patch("stockapp.utils.cache.time.time", return_value=1000.0)
+    cache = TTLCache(ttl_seconds=60)
+    cache.set("AAPL", 150.0)
+
+    assert cache.ttl_remaining("AAPL") == 60.0
+    assert cache.ttl_remaining("MSFT") is None
+    assert cache.stats()["hits"] == 0
+
+def test_peek_and_values_leave_counters_and_order_alone(cache):
+    """Test that peek and values read entries without counting hits or refreshing LRU order."""
+    cache.set("AAPL", 150.0)
+    cache.set("MSFT", 300.0)
+
+    assert cache.peek("AAPL") == 150.0
+    assert cache.peek("GOOG") is None
+    assert sorted(cache.values()) == [150.0, 300.0]
+    assert cache.stats()["hits"] == 0
+
+    cache.set("GOOG", 100.0)
+    assert cache.peek("AAPL") is None
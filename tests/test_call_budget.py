@@ -0,0 +1,68 @@
+import pytest
+
+from stockapp.utils.call_budget import BudgetExceeded, CallBudget, Priority, upstream_context
+
+
+@pytest.fixture
+def clock(mocker):
+    return mocker.patch("stockapp.utils.call_budget.time.monotonic", return_value=1000.0)
+
+@pytest.fixture
+def budget(clock):
+    return CallBudget(calls_per_minute=10, calls_per_day=0, user_share=1.0)
+
+def test_unlimited_budget_never_waits(clock):
+    """Test that a budget without limits serves every call immediately."""
+    budget = CallBudget()
+    for _ in range(100):
+        assert budget.acquire(Priority.LOOKUP, max_wait=0) == 0
+
+def test_lookups_leave_reserve_for_trades(budget):
+    """Test that lookups stop at the reserve while trades can still spend it."""
+    for _ in range(6):
+        budget.acquire(Priority.LOOKUP, max_wait=0)
+
+    with pytest.raises(BudgetExceeded):
+        budget.acquire(Priority.LOOKUP, max_wait=0)
+
+    for _ in range(4):
+        budget.acquire(Priority.TRADE, max_wait=0)
+
+def test_shed_call_reports_retry_after(budget):
+    """Test that a shed call reports how long until budget frees up."""
+    for _ in range(10):
+        budget.acquire(Priority.TRADE, max_wait=0)
+
+    assert budget.estimate_wait(Priority.TRADE) == pytest.approx(6.0)
+    with pytest.raises(BudgetExceeded) as exc_info:
+        budget.acquire(Priority.TRADE, max_wait=0)
+    assert exc_info.value.retry_after == pytest.approx(6.0)
+
+def test_budget_refills_over_time(budget, clock):
+    """Test that spent tokens come back at the per-minute rate."""
+    for _ in range(10):
+        budget.acquire(Priority.TRADE, max_wait=0)
+
+    clock.return_value = 1006.0
+
+    assert budget.acquire(Priority.TRADE, max_wait=0) == 0
+
+def test_user_fair_share(clock):
+    """Test that one user cannot spend more than their share on lookups."""
+    budget = CallBudget(calls_per_minute=100, user_share=0.05)
+    for _ in range(5):
+        budget.acquire(Priority.LOOKUP, user="spammer", max_wait=0)
+
+    with pytest.raises(BudgetExceeded):
+        budget.acquire(Priority.LOOKUP, user="spammer", max_wait=0)
+
+    assert budget.acquire(Priority.LOOKUP, user="someone_else", max_wait=0) == 0
+    assert budget.acquire(Priority.TRADE, user="spammer", max_wait=0) == 0
+
+def test_upstream_context_sets_defaults(budget):
+    """Test that acquire picks up the priority of the surrounding context."""
+    for _ in range(6):
+        budget.acquire(Priority.LOOKUP, max_wait=0)
+
+    with upstream_context(Priority.TRADE, "trader"):
+        assert budget.acquire(max_wait=0) == 0
@@ -0,0 +1,80 @@
+import pytest
+from flask import Flask
+
+from stockapp.utils.cache import response_cache
+from stockapp.utils import conditional
+from stockapp.utils.conditional import conditional_json, make_etag
+
+
+@pytest.fixture
+def app():
+    response_cache.clear()
+    yield Flask(__name__)
+    response_cache.clear()
+
+def test_make_etag_depends_on_every_part():
+    """Test that tags are stable for equal parts and differ otherwise."""
+    assert make_etag("portfolio", 1, 2) == make_etag("portfolio", 1, 2)
+    assert make_etag("portfolio", 1, 2) != make_etag("portfolio", 1, 3)
+
+def test_matching_tag_skips_rendering(app, mocker):
+    """Test that If-None-Match with the current tag answers 304 without a body."""
+    render = mocker.Mock(return_value={"status": "success"})
+    etag = make_etag("lookup", "AAPL")
+
+    with app.test_request_context(headers={"If-None-Match": f'W/"{etag}"'}):
+        response = conditional_json(etag, render)
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == f'"{etag}"'
+    render.assert_not_called()
+
+def test_rendered_body_is_cached_by_tag(app, mocker):
+    """Test that a body is rendered once per tag and served from the cache afterwards."""
+    render = mocker.Mock(return_value={"status": "success"})
+    etag = make_etag("lookup", "AAPL")
+
+    for _ in range(2):
+        with app.test_request_context(headers={"If-None-Match": '"older"'}):
+            response = conditional_json(etag, render, private=True)
+        assert response.status_code == 200
+        assert response.get_json() == {"status": "success"}
+        assert response.headers["Cache-Control"] == "private, no-cache"
+
+    render.assert_called_once()
+
+def test_untagged_body_is_always_rendered(app, mocker):
+    """Test that a response without a tag is neither cached nor tagged."""
+    render = mocker.Mock(return_value={"status": "success"})
+
+    with app.test_request_context():
+        response = conditional_json(None, render)
+
+    assert "ETag" not in response.headers
+    assert len(response_cache) == 0
+
+def test_untagged_body_can_be_tagged_once_rendered(app, mocker):
+    """Test that tag_rendered tags and caches a body rendered without a tag."""
+    render = mocker.Mock(return_value={"status": "success", "price": 1.0})
+    etag = make_etag("lookup", 1.0)
+
+    with app.test_request_context():
+        response = conditional_json(None, render, tag_rendered=lambda body: make_etag("lookup", body["price"]))
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] == f'"{etag}"'
+    assert response.get_json() == {"status": "success", "price": 1.0}
+    assert response_cache.get(etag) is not None
+
+def test_salt_comes_from_the_secret_key(app, monkeypatch):
+    """Test that workers sharing a SECRET_KEY hand out the same tags, and other keys do not."""
+    monkeypatch.setattr(conditional, "_salt", conditional._salt)
+    app.config["SECRET_KEY"] = "one"
+    conditional.init_app(app)
+    tag = make_etag("portfolio", 1)
+    conditional.init_app(app)
+    assert make_etag("portfolio", 1) == tag
+
+    app.config["SECRET_KEY"] = "two"
+    conditional.init_app(app)
+    assert make_etag("portfolio", 1) != tag
@@ -0,0 +1,75 @@
+import pytest
+import requests
+
+from stockapp.utils import http_client
+
+
+@pytest.fixture
+def mock_session(mocker):
+    session = mocker.Mock()
+    mocker.patch("stockapp.utils.http_client.get_session", return_value=session)
+    mocker.patch("stockapp.utils.http_client.time.sleep")
+    return session
+
+def make_response(mocker, status_code=200, body=None):
+    response = mocker.Mock(status_code=status_code, headers={})
+    response.json.return_value = body or {}
+    return response
+
+def test_get_uses_configured_timeouts(mock_session, mocker):
+    """Test that requests carry the configured (connect, read) timeouts."""
+    mock_session.get.return_value = make_response(mocker)
+
+    http_client.get("https://example.com", params={"q": "1"})
+
+    mock_session.get.assert_called_once_with(
+        "https://example.com",
+        params={"q": "1"},
+        timeout=(http_client.connect_timeout, http_client.read_timeout),
+    )
+
+def test_get_retries_server_errors(mock_session, mocker):
+    """Test that 5xx responses are retried until a good response arrives."""
+    ok = make_response(mocker)
+    mock_session.get.side_effect = [make_response(mocker, 503), make_response(mocker, 502), ok]
+
+    assert http_client.get("https://example.com") is ok
+    assert mock_session.get.call_count == 3
+    assert http_client.time.sleep.call_count == 2
+
+def test_get_returns_last_response_when_retries_exhausted(mock_session, mocker):
+    """Test that the final retryable response is returned after max_retries."""
+    mock_session.get.return_value = make_response(mocker, 429)
+
+    response = http_client.get("https://example.com")
+
+    assert response.status_code == 429
+    assert mock_session.get.call_count == http_client.max_retries + 1
+
+def test_get_acquires_before_every_attempt(mock_session, mocker):
+    """Test that each attempt, retries included, passes through the acquire hook."""
+    acquire = mocker.Mock()
+    mock_session.get.side_effect = [make_response(mocker, 503), make_response(mocker)]
+
+    http_client.get("https://example.com", acquire=acquire)
+
+    assert acquire.call_count == 2
+
+def test_get_stops_when_acquire_raises(mock_session, mocker):
+    """Test that an attempt the hook refuses is never sent."""
+    acquire = mocker.Mock(side_effect=[None, RuntimeError("budget exhausted")])
+    mock_session.get.return_value = make_response(mocker, 503)
+
+    with pytest.raises(RuntimeError):
+        http_client.get("https://example.com", acquire=acquire)
+
+    assert mock_session.get.call_count == 1
+
+def test_get_raises_after_repeated_connection_errors(mock_session):
+    """Test that connection errors are re-raised once retries run out."""
+    mock_session.get.side_effect = requests.exceptions.ConnectionError("refused")
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        http_client.get("https://example.com")
+
+    assert mock_session.get.call_count == http_client.max_retries + 1
@@ -0,0 +1,53 @@
+import threading
+
+import pytest
+
+from stockapp.utils.keyed_lock import KeyedLock
+
+
+@pytest.fixture
+def locks():
+    return KeyedLock()
+
+def test_same_key_is_serialized(locks):
+    """Test that a second holder of a key waits until the first releases it."""
+    inside = threading.Event()
+    release = threading.Event()
+    order = []
+
+    def first():
+        with locks.hold(1):
+            inside.set()
+            release.wait(5)
+            order.append("first")
+
+    def second():
+        with locks.hold(1):
+            order.append("second")
+
+    threads = [threading.Thread(target=first), threading.Thread(target=second)]
+    threads[0].start()
+    inside.wait(5)
+    threads[1].start()
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert order == ["first", "second"]
+
+def test_other_keys_do_not_wait(locks):
+    """Test that holding one key does not block another."""
+    acquired = threading.Event()
+
+    with locks.hold(1):
+        thread = threading.Thread(target=lambda: locks.hold(2).__enter__() and None or acquired.set())
+        thread.start()
+        assert acquired.wait(5)
+        thread.join(5)
+
+def test_locks_are_reentrant_and_dropped_when_unused(locks):
+    """Test that a holder can re-acquire its key and idle keys are forgotten."""
+    with locks.hold(1):
+        with locks.hold(1):
+            assert len(locks) == 1
+    assert len(locks) == 0
@@ -0,0 +1,24 @@
+from datetime import date, datetime, timezone
+
+from stockapp.utils.market_calendar import next_trading_day, seconds_until_next_bar
+
+
+def test_next_trading_day_skips_weekend():
+    """Test that the day after a Friday is the following Monday."""
+    assert next_trading_day(date(2025, 5, 2)) == date(2025, 5, 5)
+
+def test_next_trading_day_midweek():
+    """Test that the day after a Tuesday is Wednesday."""
+    assert next_trading_day(date(2025, 4, 29)) == date(2025, 4, 30)
+
+def test_seconds_until_next_bar():
+    """Test the wait until the next bar is published after the close."""
+    now = datetime(2025, 5, 1, 21, 0, tzinfo=timezone.utc)
+
+    assert seconds_until_next_bar(date(2025, 4, 30), now) == 30 * 60
+
+def test_seconds_until_next_bar_already_due():
+    """Test that an overdue bar yields zero rather than a negative wait."""
+    now = datetime(2025, 5, 6, 12, 0, tzinfo=timezone.utc)
+
+    assert seconds_until_next_bar(date(2025, 4, 30), now) == 0.0
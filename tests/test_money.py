@@ -0,0 +1,49 @@
+from decimal import Decimal
+
+import pytest
+
+from stockapp.utils.money import (
+    cents_to_dollars,
+    divide_rounded,
+    micros_to_cents,
+    micros_to_dollars,
+    to_cents,
+    to_micros,
+    value_cents,
+)
+
+
+def test_to_cents_reads_floats_by_their_decimal_form():
+    """Test that float artefacts do not leak into the cent count."""
+    assert to_cents(0.1 + 0.2) == 30
+    assert to_cents(1.005) == 101
+    assert to_cents("19.99") == 1999
+    assert to_cents(Decimal("-2.345")) == -235
+    assert to_cents(7) == 700
+
+def test_to_micros_keeps_sub_cent_prices():
+    """Test that prices keep their fractional cents."""
+    assert to_micros(178.5025) == 178_502_500
+    assert micros_to_dollars(to_micros(178.5025)) == 178.5025
+
+def test_non_finite_amounts_are_rejected():
+    """Test that NaN, infinity and text are not money."""
+    for amount in (float("nan"), float("inf"), "ten"):
+        with pytest.raises(ValueError):
+            to_cents(amount)
+
+def test_rounding_is_half_away_from_zero():
+    """Test integer rounding at and around the half."""
+    assert divide_rounded(5, 2) == 3
+    assert divide_rounded(-5, 2) == -3
+    assert divide_rounded(7, 3) == 2
+    assert micros_to_cents(12_345_000) == 1235
+    assert micros_to_cents(12_344_999) == 1234
+
+def test_value_cents_is_exact_over_many_trades():
+    """Test that repeated fills add up to the cent where floats drift."""
+    price = to_micros(0.1)
+    total = sum(value_cents(3, price) for _ in range(1000))
+
+    assert total == 30_000
+    assert cents_to_dollars(total) == 300.0
@@ -0,0 +1,103 @@
+import time
+
+import pytest
+
+from stockapp.models.portfolio_model import PortfolioModel
+from stockapp.utils.call_budget import BudgetExceeded
+from stockapp.utils.order_queue import FILLED, QUEUED, REJECTED, OrderQueue, QueueFull
+
+
+@pytest.fixture
+def queue(app, mocker):
+    mocker.patch(
+        "stockapp.models.stock_model.Stocks.get_stock_price",
+        side_effect=lambda symbol, max_age=None: {"symbol": symbol, "price": 100.0, "fetched_at": time.time()},
+    )
+    for user_id in (1, 2):
+        PortfolioModel(user_id=user_id).deposit_cash(1000)
+
+    queue = OrderQueue(max_pending=10)
+    queue.bind(app)
+    return queue
+
+def test_account_orders_run_in_order_and_accounts_take_turns(queue):
+    """Test that a sell waits for the buy before it, while another account goes in between."""
+    buy = queue.submit(1, "alice", "buy", "AAPL", 4)
+    sell = queue.submit(1, "alice", "sell", "AAPL", 4)
+    other = queue.submit(2, "bob", "buy", "MSFT", 1)
+
+    executed = [queue.run_next(timeout=0) for _ in range(3)]
+
+    assert executed == [buy, other, sell]
+    assert [order.status for order in executed] == [FILLED, FILLED, FILLED]
+    assert sell.fill == {
+        "symbol": "AAPL", "shares": 4, "price": 100.0, "total": 400.0, "total_cents": 40_000, "cash_balance": 1000.0
+    }
+    assert queue.run_next(timeout=0) is None
+    assert queue.pending == 0
+
+def test_rejected_order_does_not_block_the_account(queue):
+    """Test that an order the account cannot cover is rejected and the next one still runs."""
+    sell = queue.submit(1, "alice", "sell", "AAPL", 1)
+    buy = queue.submit(1, "alice", "buy", "AAPL", 20)
+    queue.run_next(timeout=0)
+    queue.run_next(timeout=0)
+
+    assert sell.status == REJECTED
+    assert "enough shares" in sell.message
+    assert buy.status == REJECTED
+    assert buy.message == "Insufficient funds for this purchase"
+
+def test_orders_are_bounded_private_and_forgotten(queue):
+    """Test the pending bound, owner-only lookups and expiry of finished orders."""
+    queue.max_pending = 1
+    queue.keep_seconds = 0
+    order = queue.submit(1, "alice", "buy", "AAPL", 1)
+
+    with pytest.raises(QueueFull):
+        queue.submit(2, "bob", "buy", "AAPL", 1)
+    assert queue.get(order.order_id, 2) is None
+    assert queue.get(order.order_id, 1) is order
+
+    queue.run_next(timeout=0)
+    queue.submit(1, "alice", "buy", "AAPL", 1)
+    assert queue.get(order.order_id, 1) is None
+
+def test_order_shed_by_the_budget_is_put_back_without_blocking(queue, mocker):
+    """Test that a budget-shed order waits in its lane while other accounts' orders run."""
+    mocker.patch(
+        "stockapp.models.stock_model.Stocks.get_stock_price",
+        side_effect=[
+            BudgetExceeded("shed", retry_after=60),
+            {"symbol": "MSFT", "price": 100.0, "fetched_at": time.time()},
+        ],
+    )
+    shed = queue.submit(1, "alice", "buy", "AAPL", 1)
+    behind = queue.submit(1, "alice", "buy", "MSFT", 1)
+    other = queue.submit(2, "bob", "buy", "MSFT", 1)
+
+    assert queue.run_next(timeout=0) is shed
+    assert shed.status == QUEUED
+    assert shed.not_before > time.time() + 50
+    assert queue.run_next(timeout=0) is other
+    assert other.status == FILLED
+    assert queue.run_next(timeout=0) is None
+    assert behind.status == QUEUED
+    assert queue.pending == 2
+
+def test_put_back_order_runs_once_due(queue, mocker):
+    """Test that a put-back order is retried after its not-before time and then fills."""
+    mocker.patch(
+        "stockapp.models.stock_model.Stocks.get_stock_price",
+        side_effect=[
+            BudgetExceeded("shed", retry_after=0),
+            {"symbol": "AAPL", "price": 100.0, "fetched_at": time.time()},
+        ],
+    )
+    order = queue.submit(1, "alice", "buy", "AAPL", 1)
+
+    queue.run_next(timeout=0)
+    assert queue.run_next(timeout=1) is order
+    assert order.status == FILLED
+    assert order.message is None
+    assert queue.pending == 0
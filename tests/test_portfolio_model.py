@@ -1,24 +1,27 @@
+import time
+
 import pytest
-from stockapp.models.portfolio_model import PortfolioModel
+from stockapp.db import db
+from stockapp.models.portfolio_model import PortfolioModel, PortfolioStore
 
 # Sample portfolio fixture for reuse across tests
 @pytest.fixture
 def portfolio():
     model = PortfolioModel()
     model.holdings = {
-        "AAPL": {"shares": 5, "buy_price": 150.0},
-        "MSFT": {"shares": 2, "buy_price": 300.0}
+        "AAPL": {"shares": 5, "total_cost_cents": 75_000},
+        "MSFT": {"shares": 2, "total_cost_cents": 60_000}
     }
-    model.cash_balance = 1000.0
-    model.original_cash_balance = 1000.0
+    model.cash_cents = 100_000
+    model.original_cash_cents = 100_000
     return model
 
 # Mock prices to avoid hitting the Alpha Vantage API
 @pytest.fixture
 def mock_price_cache(mocker):
     return mocker.patch(
-        "stockapp.models.portfolio_model.PortfolioModel._get_stock_from_cache_or_db",
-        side_effect=lambda symbol: 170.0 if symbol == "AAPL" else 320.0
+        "stockapp.models.portfolio_model.PortfolioModel.get_prices",
+        side_effect=lambda symbols=None: {"AAPL": 170.0, "MSFT": 320.0, "GOOG": 100.0}
     )
 
 # Basic test to make sure view_portfolio() returns all expected fields
@@ -30,6 +33,12 @@ def test_view_portfolio_basic(portfolio, mock_price_cache):
     assert result["portfolio"][0]["current_price"] == 170.0
     assert "percent_change" in result["portfolio"][0]
 
+# Holdings carry every amount in integer cents next to the dollar figure
+def test_view_portfolio_reports_cents(portfolio, mock_price_cache):
+    aapl = portfolio.view_portfolio()["portfolio"][0]
+    assert (aapl["buy_price_cents"], aapl["current_price_cents"], aapl["total_value_cents"]) == (15_000, 17_000, 85_000)
+    assert aapl["total_value"] == 850.0
+
 # Checks that portfolio value is calculated correctly including cash and % change
 def test_calculate_portfolio_value(portfolio, mock_price_cache):
     result = portfolio.calculate_portfolio_value()
@@ -92,8 +101,8 @@ def test_portfolio_with_zero_original_value():
 # Invalid stock ticker look up
 def test_stock_price_fetch_failure(portfolio, mocker):
     mocker.patch(
-        "stockapp.models.portfolio_model.PortfolioModel._get_stock_from_cache_or_db",
-        side_effect=Exception("API error")
+        "stockapp.models.portfolio_model.PortfolioModel.get_prices",
+        return_value={}
     )
     result = portfolio.calculate_portfolio_value()
 
@@ -102,10 +111,364 @@ def test_stock_price_fetch_failure(portfolio, mocker):
 
 # Simulating broken entry with 0 share holding
 def test_zero_shares_in_holding(portfolio, mock_price_cache):
-    portfolio.holdings["GOOG"] = {"shares": 0, "buy_price": 100.0}
+    portfolio.holdings["GOOG"] = {"shares": 0, "total_cost_cents": 0}
     result = portfolio.view_portfolio()
     
     goog = next((item for item in result["portfolio"] if item["symbol"] == "GOOG"), None)
     assert goog is not None
     assert goog["total_value"] == 0.0
-    assert goog["shares"] == 0
\ No newline at end of file
+    assert goog["shares"] == 0
+# Prices for every holding should be resolved in a single batched call
+def test_get_prices_batches_holdings(portfolio, mocker):
+    mock_batch = mocker.patch(
+        "stockapp.models.stock_model.Stocks.get_stock_prices",
+        return_value={"AAPL": {"price": 170.0}, "MSFT": {"price": 320.0}}
+    )
+    result = portfolio.get_prices()
+
+    assert result == {"AAPL": 170.0, "MSFT": 320.0}
+    mock_batch.assert_called_once()
+
+# Value history multiplies stored closes by holdings, carrying closes over missing days
+def test_get_value_history_from_stored_closes(app, portfolio, mocker):
+    from datetime import date
+    from stockapp.models.daily_price_model import DailyPrices
+
+    def bar(day, close):
+        return {"date": day, "open": close, "high": close, "low": close, "close": close, "volume": 1}
+
+    DailyPrices.store_bars("AAPL", [bar("2025-04-28", 100.0), bar("2025-04-29", 110.0), bar("2025-04-30", 120.0)])
+    DailyPrices.store_bars("MSFT", [bar("2025-04-28", 300.0), bar("2025-04-30", 330.0)])
+    sync = mocker.patch("stockapp.models.stock_model.Stocks.sync_price_histories")
+
+    history = portfolio.get_value_history(date(2025, 4, 29), date(2025, 4, 30))
+
+    sync.assert_called_once_with(["AAPL", "MSFT"])
+    assert history["dates"] == ["2025-04-29", "2025-04-30"]
+    # MSFT has no bar on the 29th, so its close from the 28th carries forward
+    assert history["holdings_value"] == [1150.0, 1260.0]
+    assert history["total_value"] == [2150.0, 2260.0]
+    assert history["missing"] == []
+
+# A saved portfolio's cash and positions survive a reload from the database
+def test_saved_portfolio_round_trip(app):
+    saved = PortfolioModel(user_id=1)
+    saved.deposit_cash(1000)
+    saved.buy_stock("aapl", 2, {"symbol": "AAPL", "price": 100.0, "fetched_at": time.time()})
+    saved.withdraw_cash(100)
+
+    loaded = PortfolioModel.load(1)
+    assert loaded.cash_balance == 700.0
+    assert loaded.original_cash_balance == 1000.0
+    assert loaded.holdings == {"AAPL": {"shares": 2, "total_cost_cents": 20_000}}
+
+# Users' portfolios are stored separately
+def test_saved_portfolios_are_isolated(app):
+    first = PortfolioModel(user_id=1)
+    first.deposit_cash(1000)
+    first.buy_stock("AAPL", 5, {"symbol": "AAPL", "price": 100.0, "fetched_at": time.time()})
+
+    second = PortfolioModel.load(2)
+    assert second.cash_balance == 0.0
+    assert second.holdings == {}
+    with pytest.raises(ValueError, match="don't own enough shares"):
+        second.sell_stock("AAPL", 1, {"symbol": "AAPL", "price": 100.0, "fetched_at": time.time()})
+
+# A failed purchase leaves the stored cash untouched
+def test_failed_buy_keeps_saved_cash(app):
+    saved = PortfolioModel(user_id=1)
+    saved.deposit_cash(100)
+
+    with pytest.raises(ValueError, match="Insufficient funds"):
+        saved.buy_stock("AAPL", 5, {"symbol": "AAPL", "price": 100.0, "fetched_at": time.time()})
+    with pytest.raises(ValueError):
+        saved.buy_stock("AAPL", 1, {"symbol": "MSFT", "price": 10.0, "fetched_at": time.time()})
+
+    assert PortfolioModel.load(1).cash_balance == 100.0
+
+# The store refreshes cached portfolios in place and lists held symbols from memory
+def test_portfolio_store_refresh_and_held_symbols(app):
+    store = PortfolioStore()
+    cached = store.get(1)
+    assert store.held_symbols() == []
+
+    writer = PortfolioModel(user_id=1)
+    writer.deposit_cash(1000)
+    writer.buy_stock("MSFT", 1, {"symbol": "MSFT", "price": 300.0, "fetched_at": time.time()})
+    assert store.get(1).cash_balance == 0.0
+
+    assert store.refresh(1) is cached
+    assert cached.cash_balance == 700.0
+    assert store.held_symbols() == ["MSFT"]
+    assert store.held_symbols(1) == ["MSFT"]
+    assert store.held_symbols(2) == []
+
+# Saved portfolios are valued with the holdings and cash they had on each day, from the ledger
+def test_get_value_history_uses_dated_holdings(app, mocker):
+    from datetime import date, datetime
+    from stockapp.models.daily_price_model import DailyPrices
+    from stockapp.models.trade_model import Trades
+
+    def bar(day, close):
+        return {"date": day, "open": close, "high": close, "low": close, "close": close, "volume": 1}
+
+    DailyPrices.store_bars("AAPL", [bar("2025-04-28", 100.0), bar("2025-04-29", 110.0), bar("2025-04-30", 120.0)])
+    mocker.patch("stockapp.models.stock_model.Stocks.sync_price_histories")
+    portfolio = PortfolioModel(user_id=1)
+    portfolio.holdings = {"AAPL": {"shares": 3, "total_cost_cents": 30_000}}
+    portfolio.cash_cents = 50_000
+    db.session.add_all([
+        # Bought during the 29th's session, sold after the 29th's bar was published
+        Trades(user_id=1, kind="buy", symbol="AAPL", shares=5, price_micros=105_000_000, cash_change_cents=-52_500,
+               executed_at=datetime(2025, 4, 29, 15, 0)),
+        Trades(user_id=1, kind="sell", symbol="AAPL", shares=2, price_micros=112_000_000, cash_change_cents=22_400,
+               executed_at=datetime(2025, 4, 29, 22, 0)),
+    ])
+    db.session.commit()
+
+    history = portfolio.get_value_history(date(2025, 4, 28), date(2025, 4, 30))
+
+    assert history["holdings_value"] == [0.0, 550.0, 360.0]
+    assert history["cash"] == [801.0, 276.0, 500.0]
+    assert history["total_value"] == [801.0, 826.0, 860.0]
+
+# The running valuation matches a full recompute at the same prices
+def test_get_valuation_matches_full_recompute(portfolio):
+    prices = {"AAPL": 170.0, "MSFT": 320.0}
+    portfolio.apply_prices(prices)
+
+    valuation = portfolio.get_valuation()
+
+    summary = portfolio.calculate_portfolio_value(prices)
+    assert {key: valuation[key] for key in summary} == summary
+    assert valuation["market_value"] == 5 * 170.0 + 2 * 320.0
+    assert valuation["cost_basis"] == 5 * 150.0 + 2 * 300.0
+    assert valuation["unrealized_pnl"] == 5 * 20.0 + 2 * 20.0
+    assert valuation["market_value_cents"] == 149_000
+    assert valuation["current_total_value_cents"] == 249_000
+    assert valuation["unpriced_symbols"] == []
+
+# A valuation missing prices says which holdings it left out
+def test_get_valuation_lists_unpriced_holdings(portfolio):
+    portfolio.apply_prices({"AAPL": 170.0})
+
+    assert portfolio.get_valuation()["unpriced_symbols"] == ["MSFT"]
+
+# New prices adjust the market value by the change alone, and unheld symbols are ignored
+def test_apply_prices_updates_running_value(portfolio):
+    portfolio.apply_prices({"AAPL": 170.0})
+    assert portfolio.unpriced_symbols == ["MSFT"]
+    assert portfolio.get_valuation()["unrealized_pnl"] == 100.0
+
+    portfolio.apply_prices({"AAPL": 160.0, "MSFT": 310.0, "GOOG": 100.0})
+
+    assert portfolio.unpriced_symbols == []
+    assert portfolio.get_valuation()["market_value"] == 5 * 160.0 + 2 * 310.0
+    assert portfolio.check_drift() == 0
+
+# Trades adjust the aggregates for the traded holding only
+def test_trades_keep_valuation_in_step(app):
+    saved = PortfolioModel(user_id=1)
+    saved.deposit_cash(1000)
+    saved.buy_stock("AAPL", 4, {"symbol": "AAPL", "price": 100.0, "fetched_at": time.time()})
+    saved.buy_stock("MSFT", 1, {"symbol": "MSFT", "price": 300.0, "fetched_at": time.time()})
+    saved.sell_stock("AAPL", 4, {"symbol": "AAPL", "price": 110.0, "fetched_at": time.time()})
+
+    valuation = saved.get_valuation()
+    assert valuation["market_value"] == 300.0
+    assert valuation["current_total_value"] == 1040.0
+    assert saved.check_drift() == 0
+
+# A drifted aggregate is found by the full recompute and reset
+def test_check_drift_resets_drifted_aggregates(portfolio):
+    portfolio.apply_prices({"AAPL": 170.0, "MSFT": 320.0})
+    portfolio._market_value += 12_500_000
+
+    assert portfolio.check_drift() == 1_250
+    assert portfolio.get_valuation()["market_value"] == 1490.0
+    assert portfolio.check_drift() == 0
+
+# The store passes fresh prices to cached holders and checks drift on reads once due
+def test_portfolio_store_applies_prices_and_checks_drift(app, mocker):
+    writer = PortfolioModel(user_id=1)
+    writer.deposit_cash(1000)
+    writer.buy_stock("AAPL", 2, {"symbol": "AAPL", "price": 100.0, "fetched_at": time.time()})
+    store = PortfolioStore(ttl_seconds=3600, drift_check_seconds=60)
+    cached = store.refresh(1)
+
+    store.apply_price("AAPL", 125.0)
+    store.apply_price("MSFT", 300.0)
+    assert cached.get_valuation()["market_value"] == 250.0
+
+    check = mocker.spy(cached, "check_drift")
+    store.get(1)
+    check.assert_not_called()
+    mocker.patch("stockapp.models.portfolio_model.time.time", return_value=cached.checked_at + 61)
+    store.get(1)
+    check.assert_called_once()
+
+# A batch is checked order by order against the running balance and committed once
+def test_execute_orders_in_one_transaction(app, mocker):
+    saved = PortfolioModel(user_id=1)
+    saved.deposit_cash(100)
+    saved.buy_stock("AAPL", 1, {"symbol": "AAPL", "price": 100.0, "fetched_at": time.time()})
+    quotes = {
+        "AAPL": {"symbol": "AAPL", "price": 110.0, "fetched_at": time.time()},
+        "MSFT": {"symbol": "MSFT", "price": 50.0, "fetched_at": time.time()},
+    }
+    commit = mocker.spy(db.session, "commit")
+
+    results = saved.execute_orders([
+        {"action": "sell", "symbol": "aapl", "shares": 1},
+        {"action": "buy", "symbol": "MSFT", "shares": 2},
+    ], quotes)
+
+    assert commit.call_count == 1
+    assert [(r["status"], r["symbol"], r["total"]) for r in results] == [("filled", "AAPL", 110.0), ("filled", "MSFT", 100.0)]
+    loaded = PortfolioModel.load(1)
+    assert loaded.cash_balance == saved.cash_balance == 10.0
+    assert loaded.holdings == saved.holdings == {"MSFT": {"shares": 2, "total_cost_cents": 10_000}}
+
+# One rejected order rejects the whole batch and nothing is written
+def test_execute_orders_rejects_whole_batch(app):
+    from stockapp.models.portfolio_model import BatchRejected
+    from stockapp.models.trade_model import Trades
+
+    saved = PortfolioModel(user_id=1)
+    saved.deposit_cash(100)
+    quotes = {"MSFT": {"symbol": "MSFT", "price": 50.0, "fetched_at": time.time()}}
+
+    with pytest.raises(BatchRejected) as rejected:
+        saved.execute_orders([
+            {"action": "buy", "symbol": "MSFT", "shares": 1},
+            {"action": "buy", "symbol": "MSFT", "shares": 2},
+            {"action": "sell", "symbol": "AAPL", "shares": 1},
+        ], quotes)
+
+    assert [r["status"] for r in rejected.value.results] == ["not_executed", "rejected", "rejected"]
+    assert rejected.value.results[1]["message"] == "Insufficient funds for this purchase"
+    assert rejected.value.results[2]["message"] == "Could not get a current price for AAPL"
+    assert PortfolioModel.load(1).holdings == {}
+    assert len(Trades.get_after(1)) == 1
+
+# A balance computed from a row another worker has since changed fails its version check
+def test_stale_account_update_is_rejected(app):
+    from sqlalchemy.orm.exc import StaleDataError
+
+    saved = PortfolioModel(user_id=1)
+    saved.deposit_cash(100)
+    saved.reload()
+    db.session.execute(db.text('UPDATE "Accounts" SET cash_cents = 5000, version = version + 1 WHERE user_id = 1'))
+    db.session.commit()
+
+    with pytest.raises(StaleDataError):
+        saved.withdraw_cash(80)
+    assert PortfolioModel.load(1).cash_balance == 50.0
+
+# The store retries a change that lost to another worker, on the reloaded portfolio
+def test_portfolio_store_update_retries_conflicts(app):
+    from stockapp.models.portfolio_model import ConcurrentUpdateError
+
+    PortfolioModel(user_id=1).deposit_cash(100)
+    store = PortfolioStore()
+    attempts = []
+
+    def withdraw(portfolio):
+        attempts.append(portfolio.cash_balance)
+        if len(attempts) == 1:
+            # Another worker withdraws after this one loaded the account
+            db.session.execute(db.text('UPDATE "Accounts" SET cash_cents = 7000, version = version + 1 WHERE user_id = 1'))
+            db.session.commit()
+        portfolio.withdraw_cash(60)
+        return portfolio.cash_balance
+
+    assert store.update(1, withdraw) == 10.0
+    assert attempts == [100.0, 70.0]
+    assert PortfolioModel.load(1).cash_balance == 10.0
+
+    def always_conflicts(portfolio):
+        db.session.execute(db.text('UPDATE "Accounts" SET version = version + 1 WHERE user_id = 1'))
+        db.session.commit()
+        portfolio.deposit_cash(1)
+
+    with pytest.raises(ConcurrentUpdateError):
+        store.update(1, always_conflicts)
+
+# Cash adds up to the cent over many small movements, where float balances drift
+def test_cash_stays_exact_over_many_movements(app):
+    saved = PortfolioModel(user_id=1)
+    for _ in range(10):
+        saved.deposit_cash(0.1)
+    saved.withdraw_cash(0.3)
+
+    loaded = PortfolioModel.load(1)
+    assert loaded.cash_cents == saved.cash_cents == 70
+    assert loaded.cash_balance == 0.7
+    with pytest.raises(ValueError, match="positive"):
+        saved.deposit_cash(0.001)
+
+# Holdings are paged in sort order, priced holdings first, and the cursor resumes after the last one
+def test_page_holdings_sorts_and_pages(portfolio):
+    portfolio.holdings = {**portfolio.holdings, "GOOG": {"shares": 1, "total_cost_cents": 10_000}}
+    portfolio.apply_prices({"AAPL": 170.0, "MSFT": 320.0})
+
+    page, cursor = portfolio.page_holdings("value", descending=True, limit=2)
+    assert page == ["AAPL", "MSFT"]
+    assert portfolio.page_holdings("value", descending=True, limit=2, cursor=cursor) == (["GOOG"], None)
+
+    assert portfolio.page_holdings("symbol", descending=True)[0] == ["MSFT", "GOOG", "AAPL"]
+    assert portfolio.page_holdings("percent_change", limit=3)[0] == ["MSFT", "AAPL", "GOOG"]
+    with pytest.raises(ValueError, match="different sort"):
+        portfolio.page_holdings("symbol", limit=2, cursor=cursor)
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        portfolio.page_holdings("value", cursor="not-a-cursor")
+
+# Only the requested holdings are priced and summarized
+def test_view_portfolio_prices_only_requested_symbols(portfolio, mock_price_cache):
+    result = portfolio.view_portfolio(symbols=["MSFT"])
+
+    mock_price_cache.assert_called_once_with(["MSFT"])
+    assert [holding["symbol"] for holding in result["portfolio"]] == ["MSFT"]
+
+# Holding and price changes move the state a response is tagged with, unchanged prices do not
+def test_state_changes_with_holdings_and_prices(portfolio):
+    portfolio.apply_prices({"AAPL": 170.0})
+    initial = portfolio.state
+
+    portfolio.apply_prices({"AAPL": 170.0, "GOOG": 100.0})
+    assert portfolio.state == initial
+
+    portfolio.apply_prices({"AAPL": 171.0})
+    repriced = portfolio.state
+    assert repriced != initial
+
+    portfolio.holdings = dict(portfolio.holdings, GOOG={"shares": 1, "total_cost_cents": 10_000})
+    assert portfolio.state != repriced
+
+# The state only holds content, so a portfolio reloaded elsewhere with the same prices matches it
+def test_state_is_the_same_for_equal_portfolios(portfolio):
+    portfolio.apply_prices({"AAPL": 170.0})
+    copy = PortfolioModel()
+    copy.holdings = {symbol: dict(info) for symbol, info in portfolio.holdings.items()}
+    copy.cash_cents = portfolio.cash_cents
+    assert copy.state != portfolio.state
+
+    copy.apply_prices({"AAPL": 170.0})
+    assert copy.state == portfolio.state
+
+# A price from an expired quote is shown with its age until a fresh one replaces it
+def test_stale_price_age_reaches_the_view(portfolio, mocker):
+    mocker.patch(
+        "stockapp.models.stock_model.Stocks.get_stock_prices",
+        return_value={"AAPL": {"symbol": "AAPL", "price": 170.0, "age_seconds": 90.0}},
+    )
+    portfolio.update_prices(["AAPL"])
+    initial = portfolio.state
+
+    holding = portfolio.view_portfolio(portfolio.prices, symbols=["AAPL"])["portfolio"][0]
+    assert holding["price_age_seconds"] >= 90.0
+
+    portfolio.apply_prices({"AAPL": 170.0})
+    holding = portfolio.view_portfolio(portfolio.prices, symbols=["AAPL"])["portfolio"][0]
+    assert holding["price_age_seconds"] is None
+    assert portfolio.state != initial
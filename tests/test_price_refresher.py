@@ -0,0 +1,68 @@
+import pytest
+
+from stockapp.utils.cache import quote_cache
+from stockapp.utils.price_refresher import PriceRefresher
+
+
+@pytest.fixture
+def refresher():
+    return PriceRefresher(refresh_ahead_seconds=10)
+
+@pytest.fixture
+def mock_refresh(mocker):
+    return mocker.patch(
+        "stockapp.models.stock_model.Stocks.refresh_stock_prices",
+        side_effect=lambda symbols: {symbol: {"price": 1.0} for symbol in symbols}
+    )
+
+def test_refreshes_tracked_symbols_without_fresh_quotes(refresher, mock_refresh):
+    """Test that tracked symbols missing from the cache are refreshed."""
+    refresher.track(["AAPL"])
+
+    assert refresher.refresh_due() == 1
+    assert mock_refresh.call_args.args[0] == ["AAPL"]
+
+def test_skips_symbols_far_from_expiry(refresher, mock_refresh):
+    """Test that quotes with plenty of TTL left are not refetched."""
+    quote_cache.set("AAPL", {"price": 150.0}, ttl=60)
+    refresher.track(["AAPL"])
+
+    assert refresher.refresh_due() == 0
+    mock_refresh.assert_not_called()
+
+def test_refreshes_quotes_about_to_expire(refresher, mock_refresh):
+    """Test that quotes expiring within refresh_ahead_seconds are refetched."""
+    quote_cache.set("AAPL", {"price": 150.0}, ttl=5)
+    refresher.track(["AAPL"])
+
+    assert refresher.refresh_due() == 1
+
+def test_includes_held_symbols(refresher, mock_refresh):
+    """Test that held symbols are refreshed even if never requested."""
+    refresher.set_held_symbols(lambda: ["msft"])
+
+    refresher.refresh_due()
+
+    assert mock_refresh.call_args.args[0] == ["MSFT"]
+
+def test_stale_quotes_served_while_refresher_runs(mocker):
+    """Test that get_stock_prices serves expired quotes with their age instead of blocking."""
+    from stockapp.models.stock_model import Stocks
+
+    mocker.patch("stockapp.utils.cache.time.time", return_value=1000.0)
+    quote_cache.configure(stale_seconds=300)
+    quote_cache.set("AAPL", {"symbol": "AAPL", "price": 150.0}, ttl=5)
+    mocker.patch("stockapp.utils.cache.time.time", return_value=1020.0)
+    mocker.patch("stockapp.utils.price_refresher.PriceRefresher.running", new_callable=mocker.PropertyMock, return_value=True)
+    mock_request = mocker.patch("stockapp.utils.price_refresher.PriceRefresher.request_refresh")
+    mock_fetch = mocker.patch("stockapp.models.stock_model.Stocks._fetch_quote")
+
+    try:
+        quotes = Stocks.get_stock_prices(["AAPL"])
+    finally:
+        quote_cache.configure(stale_seconds=0)
+
+    assert quotes["AAPL"]["price"] == 150.0
+    assert quotes["AAPL"]["age_seconds"] == 20.0
+    mock_request.assert_called_once_with(["AAPL"])
+    mock_fetch.assert_not_called()
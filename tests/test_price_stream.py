@@ -0,0 +1,59 @@
+import pytest
+
+from stockapp.utils.price_stream import PriceStream, Subscription
+
+
+@pytest.fixture
+def mock_prices(mocker):
+    return mocker.patch(
+        "stockapp.models.stock_model.Stocks.get_stock_prices",
+        side_effect=lambda symbols: {symbol: {"symbol": symbol, "price": 100.0} for symbol in symbols if symbol != "BAD"}
+    )
+
+
+def test_poll_fetches_each_symbol_once_for_all_subscribers(mock_prices):
+    """Test that overlapping subscriptions share one batched price fetch."""
+    stream = PriceStream()
+    first = stream.subscribe(lambda: ["aapl", "MSFT"])
+    second = stream.subscribe(lambda: ["AAPL", "BAD"])
+
+    assert stream.poll_once() == 2
+
+    mock_prices.assert_called_once()
+    assert mock_prices.call_args.args[0] == {"AAPL", "MSFT", "BAD"}
+    assert first.get(timeout=0)["prices"] == {"aapl": 100.0, "MSFT": 100.0}
+    assert second.get(timeout=0)["prices"] == {"AAPL": 100.0}
+
+
+def test_unchanged_prices_are_not_resent(mock_prices):
+    """Test that a subscriber only receives an update when a price changes."""
+    stream = PriceStream()
+    subscription = stream.subscribe(lambda: ["AAPL"])
+
+    stream.poll_once()
+    assert stream.poll_once() == 0
+
+    subscription.get(timeout=0)
+    assert subscription.get(timeout=0) is None
+
+
+def test_slow_subscriber_keeps_only_latest_updates():
+    """Test that a full queue drops the oldest update instead of blocking the poller."""
+    subscription = Subscription(lambda: ["AAPL"], queue_size=2)
+
+    for price in (1.0, 2.0, 3.0):
+        subscription.offer({"AAPL": price})
+
+    assert subscription.dropped == 1
+    assert subscription.get(timeout=0)["prices"] == {"AAPL": 2.0}
+    assert subscription.get(timeout=0)["prices"] == {"AAPL": 3.0}
+
+
+def test_unsubscribed_client_is_not_polled(mock_prices):
+    """Test that a removed subscription no longer contributes symbols."""
+    stream = PriceStream()
+    subscription = stream.subscribe(lambda: ["AAPL"])
+    stream.unsubscribe(subscription)
+
+    assert stream.poll_once() == 0
+    mock_prices.assert_not_called()
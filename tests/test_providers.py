@@ -0,0 +1,145 @@
+import pytest
+
+from stockapp.models.stock_model import Stocks
+from stockapp.providers import registry
+from stockapp.providers.alpha_vantage import AlphaVantageProvider, _is_throttled
+from stockapp.providers.base import parse_listing_csv
+from stockapp.providers.fixture_provider import FixtureProvider
+from stockapp.utils.call_budget import BudgetExceeded
+
+
+@pytest.fixture
+def fixture_provider():
+    return FixtureProvider()
+
+@pytest.fixture
+def use_fixture_provider(fixture_provider):
+    previous = registry.get_provider()
+    registry.set_provider(fixture_provider)
+    yield fixture_provider
+    registry.set_provider(previous)
+
+##########################################################
+# Fixture Provider
+##########################################################
+
+def test_fixture_quote_from_json(fixture_provider):
+    """Test that JSON fixtures serve their recorded quote."""
+    quote = fixture_provider.get_quote("AAPL")
+
+    assert quote["symbol"] == "AAPL"
+    assert quote["price"] > 0
+    assert quote["latest_trading_day"] == "2025-04-30"
+
+def test_fixture_quote_derived_from_csv(fixture_provider):
+    """Test that CSV fixtures are quoted at their latest close."""
+    quote = fixture_provider.get_quote("GOOG")
+    bars = fixture_provider.get_daily_bars("GOOG")
+
+    assert quote["price"] == bars[0]["close"]
+    assert bars[0]["date"] > bars[-1]["date"]
+
+def test_fixture_compact_outputsize_limits_bars(tmp_path):
+    """Test that compact output is capped at 100 bars."""
+    rows = ["date,open,high,low,close,volume"]
+    rows += [f"2025-01-{day:02d},1,1,1,1,10" for day in range(1, 29)] * 5
+    (tmp_path / "TEST.csv").write_text("\n".join(rows))
+    provider = FixtureProvider(fixtures_dir=str(tmp_path))
+
+    assert len(provider.get_daily_bars("TEST", "compact")) == 100
+    assert len(provider.get_daily_bars("TEST", "full")) == 140
+
+def test_fixture_unknown_symbol_raises(fixture_provider):
+    """Test that symbols without fixtures behave like unknown upstream symbols."""
+    with pytest.raises(ValueError, match="No price data found for symbol 'NOPE'"):
+        fixture_provider.get_quote("NOPE")
+    assert fixture_provider.get_daily_bars("NOPE") == []
+
+def test_fixture_latency(fixture_provider, mocker):
+    """Test that every call sleeps for the configured synthetic latency."""
+    mock_sleep = mocker.patch("stockapp.providers.fixture_provider.time.sleep")
+    fixture_provider.latency_ms = 25
+
+    fixture_provider.get_quote("AAPL")
+
+    mock_sleep.assert_called_once_with(0.025)
+
+def test_fixture_listing_covers_every_fixture(fixture_provider):
+    """Test that the fixture listing names each symbol with a fixture file."""
+    listing = fixture_provider.get_listing()
+
+    assert [entry["symbol"] for entry in listing] == ["AAPL", "GOOG", "MSFT"]
+
+def test_stocks_use_configured_provider(use_fixture_provider, mocker):
+    """Test that Stocks prices symbols through the selected provider without the network."""
+    mock_get = mocker.patch("stockapp.utils.http_client.get")
+
+    quote = Stocks.get_stock_price("msft")
+
+    assert quote["price"] == use_fixture_provider.get_quote("MSFT")["price"]
+    mock_get.assert_not_called()
+
+##########################################################
+# Registry
+##########################################################
+
+def test_init_app_selects_fixture_provider(app):
+    """Test that MARKET_DATA_PROVIDER chooses the provider."""
+    previous = registry.get_provider()
+    app.config["MARKET_DATA_PROVIDER"] = "fixtures"
+    app.config["MARKET_DATA_FIXTURE_LATENCY_MS"] = 5
+    try:
+        registry.init_app(app)
+        assert isinstance(registry.get_provider(), FixtureProvider)
+        assert registry.get_provider().latency_ms == 5
+    finally:
+        registry.set_provider(previous)
+
+def test_init_app_rejects_unknown_provider(app):
+    """Test that a misspelled provider name fails loudly."""
+    app.config["MARKET_DATA_PROVIDER"] = "bloomberg"
+    with pytest.raises(ValueError, match="Unknown market data provider 'bloomberg'"):
+        registry.init_app(app)
+
+##########################################################
+# Alpha Vantage Provider
+##########################################################
+
+def test_alpha_vantage_rate_limit_notice_is_throttled(mocker):
+    """Test that Alpha Vantage rate-limit notices are recognised."""
+    notice = mocker.Mock(json=lambda: {"Note": "Thank you for using Alpha Vantage!"})
+    data = mocker.Mock(json=lambda: {"Global Quote": {"05. price": "1.0"}})
+
+    assert _is_throttled(notice) is True
+    assert _is_throttled(data) is False
+
+def test_alpha_vantage_rate_limit_is_not_a_missing_symbol(mocker):
+    """Test that a rate-limit notice raises BudgetExceeded, not ValueError, without a retry."""
+    notice = mocker.Mock(status_code=200, headers={}, json=lambda: {"Note": "Thank you for using Alpha Vantage!"})
+    session = mocker.Mock(get=mocker.Mock(return_value=notice))
+    mocker.patch("stockapp.utils.http_client.get_session", return_value=session)
+
+    with pytest.raises(BudgetExceeded):
+        AlphaVantageProvider(api_key="demo").get_quote("AAPL")
+    assert session.get.call_count == 1
+
+def test_alpha_vantage_takes_a_token_per_attempt(mocker):
+    """Test that a retried request spends one budget token for each request sent."""
+    unavailable = mocker.Mock(status_code=503, headers={})
+    ok = mocker.Mock(status_code=200, headers={}, json=lambda: {"Global Quote": {"05. price": "1.0"}})
+    mocker.patch("stockapp.utils.http_client.get_session", return_value=mocker.Mock(get=mocker.Mock(side_effect=[unavailable, ok])))
+    mocker.patch("stockapp.utils.http_client.time.sleep")
+    acquire = mocker.patch("stockapp.providers.alpha_vantage.upstream_budget.acquire")
+
+    assert AlphaVantageProvider(api_key="demo").get_quote("AAPL")["price"] == 1.0
+    assert acquire.call_count == 2
+
+def test_parse_listing_csv_skips_inactive_rows():
+    """Test that only active listings are parsed from LISTING_STATUS CSV."""
+    listing = parse_listing_csv([
+        "symbol,name,exchange,assetType,ipoDate,delistingDate,status",
+        "aapl,Apple Inc,NASDAQ,Stock,1980-12-12,null,Active",
+        "OLD,Old Corp,NYSE,Stock,1990-01-01,2020-01-01,Delisted",
+    ])
+
+    assert listing == [{"symbol": "AAPL", "name": "Apple Inc", "exchange": "NASDAQ", "asset_type": "Stock"}]
@@ -0,0 +1,119 @@
+import threading
+
+import pytest
+
+from stockapp.utils.call_budget import BudgetExceeded, CallBudget, Priority, current_priority, upstream_context
+from stockapp.utils.single_flight import SingleFlight
+
+
+@pytest.fixture
+def flights():
+    return SingleFlight(failure_ttl_seconds=5)
+
+def failing_fetch():
+    raise ValueError("No price data")
+
+def test_concurrent_callers_share_one_call(flights):
+    """Test that callers arriving while a call is in flight reuse its result."""
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 150.0
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.do(("GLOBAL_QUOTE", "AAPL"), fetch)))
+    leader.start()
+    started.wait(5)
+
+    followers = [
+        threading.Thread(target=lambda: results.append(flights.do(("GLOBAL_QUOTE", "AAPL"), fetch)))
+        for _ in range(5)
+    ]
+    for follower in followers:
+        follower.start()
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert results == [150.0] * 6
+
+def test_failure_is_reraised_within_window(flights):
+    """Test that a failure is not retried until the failure window passes."""
+    with pytest.raises(ValueError):
+        flights.do("AAPL", failing_fetch)
+    with pytest.raises(ValueError):
+        flights.do("AAPL", lambda: 150.0)
+
+def test_failure_is_retried_after_window(flights, mocker):
+    """Test that a remembered failure expires after failure_ttl_seconds."""
+    mock_time = mocker.patch("stockapp.utils.single_flight.time.time", return_value=1000.0)
+
+    with pytest.raises(ValueError):
+        flights.do("AAPL", failing_fetch)
+
+    mock_time.return_value = 1006.0
+
+    assert flights.do("AAPL", lambda: 150.0) == 150.0
+
+def test_different_keys_do_not_share(flights):
+    """Test that calls for different keys run independently."""
+    assert flights.do("AAPL", lambda: 1) == 1
+    assert flights.do("MSFT", lambda: 2) == 2
+
+def test_shed_lookup_does_not_fail_a_trade():
+    """Test that a LOOKUP shed by the budget is neither remembered nor passed to a TRADE."""
+    budget = CallBudget(calls_per_minute=10, calls_per_day=0, user_share=1.0)
+    for _ in range(6):
+        budget.acquire(Priority.LOOKUP, max_wait=0)
+    flights = SingleFlight(failure_ttl_seconds=5, transient_errors=(BudgetExceeded,), scope=current_priority)
+
+    def fetch():
+        budget.acquire()
+        return 150.0
+
+    with upstream_context(Priority.LOOKUP):
+        with pytest.raises(BudgetExceeded):
+            flights.do(("GLOBAL_QUOTE", "AAPL"), fetch)
+    with upstream_context(Priority.TRADE):
+        assert flights.do(("GLOBAL_QUOTE", "AAPL"), fetch) == 150.0
+
+def test_waiters_retry_after_a_transient_error():
+    """Test that callers waiting on a shed call make their own attempt instead of sharing the error."""
+    flights = SingleFlight(failure_ttl_seconds=5, transient_errors=(BudgetExceeded,))
+    started = threading.Event()
+    release = threading.Event()
+    attempts = []
+
+    def fetch():
+        attempts.append(1)
+        if len(attempts) == 1:
+            started.set()
+            release.wait(5)
+            raise BudgetExceeded("shed", retry_after=1)
+        return 150.0
+
+    errors, results = [], []
+    def leader():
+        try:
+            flights.do("AAPL", fetch)
+        except BudgetExceeded as e:
+            errors.append(e)
+
+    leader_thread = threading.Thread(target=leader)
+    leader_thread.start()
+    started.wait(5)
+    follower = threading.Thread(target=lambda: results.append(flights.do("AAPL", fetch)))
+    follower.start()
+    release.set()
+    for thread in (leader_thread, follower):
+        thread.join(5)
+
+    assert len(errors) == 1
+    assert results == [150.0]
+    assert len(attempts) == 2
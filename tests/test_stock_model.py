@@ -1,5 +1,11 @@
+import time
+
 import pytest
-from stockapp.models.stock_model import Stocks
+from datetime import date
+
+from stockapp.models.daily_price_model import DailyPrices
+from stockapp.models import stock_model
+from stockapp.models.stock_model import Stocks, fill_to_dict
 from stockapp.models.portfolio_model import PortfolioModel
 from stockapp.db import db
 
@@ -31,8 +37,7 @@ def sample_stock1(session):
     stock = Stocks()
     stock.symbol = "AAPL"
     stock.number_shares = 2
-    stock.purchase_price=100.0
-    stock.total_cost = 200.0
+    stock.total_cost_cents = 20_000
     session.add(stock)
     session.commit()
     return stock
@@ -41,39 +46,47 @@ def sample_stock2(session):
     stock = Stocks()
     stock.symbol = "AAPL"
     stock.number_shares = 5
-    stock.purchase_price=100.0
-    stock.total_cost = 500.0
+    stock.total_cost_cents = 50_000
     session.add(stock)
     session.commit()
 
     return stock
 
-def test_look_up_stock_success(mocker):
-    # Setup mock chain of responses
-    mock_get = mocker.patch("stockapp.models.stock_model.requests.get")
-
-    mock_get.side_effect = [
-        mocker.Mock(json=lambda: {
-            "Global Quote": {"05. price": "150.0"}
-        }),
-        mocker.Mock(json=lambda: {
-            "Name": "Apple Inc.",
-            "Description": "Tech company",
-            "Sector": "Technology"
-        }),
-        mocker.Mock(json=lambda: {
-            "Time Series (Daily)": {
-                "2025-04-30": {
-                    "1. open": "145.0",
-                    "2. high": "151.0",
-                    "3. low": "144.0",
-                    "4. close": "150.0",
-                    "6. volume": "100000"
-                }
+LOOKUP_RESPONSES = {
+    "GLOBAL_QUOTE": {
+        "Global Quote": {"05. price": "150.0"}
+    },
+    "OVERVIEW": {
+        "Name": "Apple Inc.",
+        "Description": "Tech company",
+        "Sector": "Technology"
+    },
+    "TIME_SERIES_DAILY_ADJUSTED": {
+        "Time Series (Daily)": {
+            "2025-04-30": {
+                "1. open": "145.0",
+                "2. high": "151.0",
+                "3. low": "144.0",
+                "4. close": "150.0",
+                "6. volume": "100000"
             }
-        }),
-    ]
+        }
+    },
+}
+
+
+@pytest.fixture
+def mock_lookup_responses(mocker):
+    # The three lookups run concurrently, so answer by Alpha Vantage function
+    return mocker.patch(
+        "stockapp.utils.http_client.get",
+        side_effect=lambda url, params=None, **kwargs: mocker.Mock(
+            json=lambda: LOOKUP_RESPONSES[params["function"]]
+        )
+    )
+
 
+def test_look_up_stock_success(app, mock_lookup_responses):
     result = Stocks.look_up_stock("AAPL")
 
     assert result["symbol"] == "AAPL"
@@ -83,8 +96,16 @@ def test_look_up_stock_success(mocker):
     assert isinstance(result["historical_prices"], list)
 
 
-def test_look_up_stock_invalid_symbol_raises(mocker):
-    mocker.patch("stockapp.models.stock_model.requests.get", return_value=mocker.Mock(json=lambda: {"Global Quote": {}}))
+def test_look_up_stock_caches_each_dataset(app, mock_lookup_responses):
+    Stocks.look_up_stock("AAPL")
+    result = Stocks.look_up_stock("AAPL")
+
+    assert result["historical_prices"][0]["close"] == 150.0
+    assert mock_lookup_responses.call_count == 3
+
+
+def test_look_up_stock_invalid_symbol_raises(app, mocker):
+    mocker.patch("stockapp.utils.http_client.get", return_value=mocker.Mock(json=lambda: {"Global Quote": {}}))
 
     with pytest.raises(ValueError, match="No current price found for 'AAPL'"):
         Stocks.look_up_stock("AAPL")
@@ -95,7 +116,7 @@ def test_real_commit(app, session):
         Stocks.query.delete()
         session.commit()
 
-        stock = Stocks(symbol="AAPL", number_shares=1, purchase_price=100.0, total_cost=100.0)
+        stock = Stocks(symbol="AAPL", number_shares=1, total_cost_cents=10_000)
         session.add(stock)
         session.commit()
 
@@ -162,7 +183,191 @@ def test_sell_all_shares_deletes_stock(app, session, mock_stock_price):
         assert stock is None
 
 def test_lookup_invalid_stock_symbol_raises(mocker):
-    mocker.patch("stockapp.models.stock_model.requests.get", return_value=mocker.Mock(json=lambda: {}))
+    mocker.patch("stockapp.utils.http_client.get", return_value=mocker.Mock(json=lambda: {}))
     
     with pytest.raises(ValueError, match="No price data found for symbol 'INVALID'"):
         Stocks.get_stock_price("INVALID")
+
+def test_get_stock_price_uses_quote_cache(mocker):
+    mock_get = mocker.patch("stockapp.utils.http_client.get", return_value=mocker.Mock(json=lambda: {
+        "Global Quote": {"05. price": "150.0", "06. volume": "1000", "07. latest trading day": "2025-04-30"}
+    }))
+
+    first = Stocks.get_stock_price("aapl")
+    second = Stocks.get_stock_price("AAPL")
+
+    assert first == second
+    assert second["price"] == 150.0
+    assert mock_get.call_count == 1
+
+def test_get_stock_prices_fetches_misses_and_skips_failures(mocker):
+    def fake_get(url, params=None, **kwargs):
+        if params["symbol"] == "BAD":
+            return mocker.Mock(json=lambda: {})
+        return mocker.Mock(json=lambda: {"Global Quote": {"05. price": "10.0"}})
+
+    mock_get = mocker.patch("stockapp.utils.http_client.get", side_effect=fake_get)
+
+    quotes = Stocks.get_stock_prices(["aapl", "MSFT", "BAD"])
+
+    assert set(quotes) == {"AAPL", "MSFT"}
+    assert quotes["AAPL"]["price"] == 10.0
+    assert mock_get.call_count == 3
+
+def test_look_up_stock_stores_daily_bars(app, mock_lookup_responses):
+    Stocks.look_up_stock("AAPL")
+
+    stored = DailyPrices.get_history("AAPL")
+    assert [bar.date.isoformat() for bar in stored] == ["2025-04-30"]
+    assert stored[0].close == 150.0
+
+    fetch = next(
+        call for call in mock_lookup_responses.call_args_list
+        if call.kwargs["params"]["function"] == "TIME_SERIES_DAILY_ADJUSTED"
+    )
+    assert fetch.kwargs["params"]["outputsize"] == "full"
+
+def test_get_price_history_fetches_only_recent_days(app, mocker):
+    DailyPrices.store_bars("AAPL", [
+        {"date": "2025-04-29", "open": 1.0, "high": 1.0, "low": 1.0, "close": 1.0, "volume": 10},
+    ])
+    mocker.patch("stockapp.models.stock_model.date", **{"today.return_value": date(2025, 5, 1)})
+    mock_get = mocker.patch("stockapp.utils.http_client.get", return_value=mocker.Mock(json=lambda: LOOKUP_RESPONSES["TIME_SERIES_DAILY_ADJUSTED"]))
+
+    history = Stocks.get_price_history("AAPL")
+
+    assert [bar.date.isoformat() for bar in history] == ["2025-04-30", "2025-04-29"]
+    assert mock_get.call_args.kwargs["params"]["outputsize"] == "compact"
+
+def test_buy_stock_fills_at_supplied_quote(app, session, mocker):
+    mock_price = mocker.patch("stockapp.models.stock_model.Stocks.get_stock_price")
+    quote = {"symbol": "AAPL", "price": 120.0, "fetched_at": time.time()}
+
+    fill = Stocks.buy_stock("aapl", 2, quote=quote)
+
+    assert fill == {"symbol": "AAPL", "shares": 2, "price_micros": 120_000_000, "total_cents": 24_000}
+    assert fill_to_dict(fill) == {"symbol": "AAPL", "shares": 2, "price": 120.0, "total": 240.0, "total_cents": 24_000}
+    assert Stocks.query.filter_by(symbol="AAPL").first().total_cost_cents == 24_000
+    mock_price.assert_not_called()
+
+def test_sell_stock_rejects_stale_quote(app, session, mock_stock_price):
+    Stocks.buy_stock("AAPL", 2)
+    quote = {"symbol": "AAPL", "price": 120.0, "fetched_at": time.time() - Stocks.order_quote_max_age_seconds - 1}
+
+    with pytest.raises(ValueError, match="orders need one under"):
+        Stocks.sell_stock("AAPL", 1, quote=quote)
+    assert Stocks.query.filter_by(symbol="AAPL").first().number_shares == 2
+
+def test_buy_stock_rejects_quote_for_other_symbol(app, session):
+    quote = {"symbol": "MSFT", "price": 120.0, "fetched_at": time.time()}
+
+    with pytest.raises(ValueError, match="cannot fill an order for AAPL"):
+        Stocks.buy_stock("AAPL", 1, quote=quote)
+
+def test_positions_are_upserted_per_user(app, session):
+    for user_id, price in ((1, 100.0), (1, 200.0), (2, 50.0), (None, 10.0), (None, 30.0)):
+        Stocks.buy_stock("AAPL", 2, quote={"symbol": "AAPL", "price": price, "fetched_at": time.time()}, user_id=user_id)
+
+    assert Stocks.query.count() == 3
+    assert Stocks.get_position("AAPL", 1).total_cost_cents == 60_000
+    assert Stocks.get_position("AAPL", 1).number_shares == 4
+    assert Stocks.get_position("AAPL", 2).total_cost_cents == 10_000
+    assert Stocks.get_position("AAPL", None).total_cost_cents == 8_000
+
+def test_positions_are_added_to_without_an_upsert_dialect(app, session, mocker):
+    mocker.patch.dict("stockapp.models.stock_model._UPSERT_INSERTS", clear=True)
+    for user_id, price in ((1, 100.0), (1, 200.0), (None, 10.0), (None, 30.0)):
+        Stocks.buy_stock("AAPL", 2, quote={"symbol": "AAPL", "price": price, "fetched_at": time.time()}, user_id=user_id)
+
+    assert Stocks.query.count() == 2
+    assert Stocks.get_position("AAPL", 1).number_shares == 4
+    assert Stocks.get_position("AAPL", 1).total_cost_cents == 60_000
+    assert Stocks.get_position("AAPL", None).total_cost_cents == 8_000
+
+def test_sell_stock_other_users_position_not_touched(app, session):
+    Stocks.buy_stock("AAPL", 2, quote={"symbol": "AAPL", "price": 100.0, "fetched_at": time.time()}, user_id=1)
+
+    with pytest.raises(ValueError, match="don't own"):
+        Stocks.sell_stock("AAPL", 1, quote={"symbol": "AAPL", "price": 100.0, "fetched_at": time.time()}, user_id=2)
+    assert Stocks.get_position("AAPL", 1).number_shares == 2
+
+def test_duplicate_position_rejected_by_index(app, session):
+    from sqlalchemy.exc import IntegrityError
+
+    session.add(Stocks(user_id=1, symbol="AAPL", number_shares=1, total_cost_cents=100))
+    session.add(Stocks(user_id=1, symbol="AAPL", number_shares=1, total_cost_cents=100))
+    with pytest.raises(IntegrityError):
+        session.commit()
+    session.rollback()
+
+def test_position_lookup_uses_composite_index(app, session):
+    statement = Stocks.query.filter(*Stocks._position_key("AAPL", 1)).statement
+    sql = str(statement.compile(compile_kwargs={"literal_binds": True}))
+
+    plan = session.execute(db.text(f"EXPLAIN QUERY PLAN {sql}")).all()
+    assert "USING INDEX ix_stocks_user_symbol" in plan[0][-1]
+
+def test_get_stock_prices_refetches_quotes_older_than_max_age(mocker):
+    mock_get = mocker.patch("stockapp.utils.http_client.get", return_value=mocker.Mock(json=lambda: {
+        "Global Quote": {"05. price": "150.0"}
+    }))
+    first = Stocks.get_stock_prices(["AAPL"])["AAPL"]
+    mocker.patch("stockapp.models.stock_model.time.time", return_value=first["fetched_at"] + 30)
+
+    Stocks.get_stock_prices(["AAPL"])
+    assert mock_get.call_count == 1
+    Stocks.get_stock_prices(["AAPL"], max_age=15)
+    assert mock_get.call_count == 2
+
+def test_fresh_quotes_are_passed_to_price_listeners(mocker):
+    mocker.patch("stockapp.utils.http_client.get", return_value=mocker.Mock(json=lambda: {
+        "Global Quote": {"05. price": "150.0"}
+    }))
+    listener = mocker.Mock()
+    mocker.patch.object(stock_model, "_price_listeners", [])
+    stock_model.add_price_listener(listener)
+    stock_model.add_price_listener(listener)
+
+    Stocks.get_stock_price("AAPL")
+    Stocks.get_stock_price("AAPL")
+
+    listener.assert_called_once_with("AAPL", 150.0)
+
+def test_get_stock_price_refetches_quote_older_than_max_age(mocker):
+    mock_get = mocker.patch("stockapp.utils.http_client.get", return_value=mocker.Mock(json=lambda: {
+        "Global Quote": {"05. price": "150.0"}
+    }))
+    first = Stocks.get_stock_price("AAPL")
+    mocker.patch("stockapp.models.stock_model.time.time", return_value=first["fetched_at"] + 30)
+
+    Stocks.get_stock_price("AAPL")
+    Stocks.get_stock_price("AAPL", max_age=10)
+
+    assert mock_get.call_count == 2
+
+def test_unknown_symbol_is_not_fetched_again(mocker):
+    mock_get = mocker.patch("stockapp.utils.http_client.get", return_value=mocker.Mock(json=lambda: {"Global Quote": {}}))
+    mocker.patch("stockapp.models.stock_model.upstream_flights.failure_ttl_seconds", 0)
+
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            Stocks.get_stock_price("ZZZZ")
+
+    assert mock_get.call_count == 1
+
+def test_get_analytics_is_memoized_per_latest_bar(app, mocker):
+    bars = [
+        {"date": f"2025-04-{day:02d}", "open": 1.0, "high": price + 1, "low": price - 1, "close": price, "volume": 1}
+        for day, price in zip(range(1, 31), range(100, 130))
+    ]
+    DailyPrices.store_bars("AAPL", bars)
+    mocker.patch("stockapp.models.stock_model.seconds_until_next_bar", return_value=3600)
+    compute = mocker.spy(stock_model, "compute_analytics")
+
+    first = Stocks.get_analytics("aapl")
+    second = Stocks.get_analytics("AAPL")
+
+    assert first is second
+    assert first["as_of"] == "2025-04-30"
+    assert first["range_52_week"] == {"high": 130.0, "low": 99.0, "from": "2024-04-30"}
+    assert compute.call_count == 1
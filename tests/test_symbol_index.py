@@ -0,0 +1,57 @@
+import pytest
+
+from stockapp.utils.symbol_index import SymbolIndex
+
+
+LISTING = [
+    {"symbol": "AAPL", "name": "Apple Inc", "exchange": "NASDAQ", "asset_type": "Stock"},
+    {"symbol": "AA", "name": "Alcoa Corp", "exchange": "NYSE", "asset_type": "Stock"},
+    {"symbol": "AAL", "name": "American Airlines Group Inc", "exchange": "NASDAQ", "asset_type": "Stock"},
+    {"symbol": "MSFT", "name": "Microsoft Corporation", "exchange": "NASDAQ", "asset_type": "Stock"},
+    {"symbol": "APLE", "name": "Apple Hospitality REIT Inc", "exchange": "NYSE", "asset_type": "Stock"},
+]
+
+
+@pytest.fixture
+def index():
+    index = SymbolIndex()
+    index.load(LISTING)
+    return index
+
+
+def test_search_matches_symbol_prefix_in_order(index):
+    """Test that symbol prefix matches are returned sorted."""
+    assert [entry["symbol"] for entry in index.search("aa")] == ["AA", "AAL", "AAPL"]
+
+
+def test_search_falls_back_to_company_name(index):
+    """Test that company name matches follow symbol matches without duplicates."""
+    results = index.search("apl")
+
+    assert [entry["symbol"] for entry in results] == ["APLE"]
+    assert [entry["symbol"] for entry in index.search("apple")] == ["APLE", "AAPL"]
+
+
+def test_search_respects_limit(index):
+    """Test that search stops at the requested number of results."""
+    assert len(index.search("A", limit=2)) == 2
+    assert index.search("ZZZ") == []
+
+
+def test_validate_rejects_unlisted_and_malformed_symbols(index):
+    """Test that only listed, well-formed symbols pass validation."""
+    assert index.validate(" msft ") == "MSFT"
+    with pytest.raises(ValueError, match="Unknown stock symbol 'MSFTT'"):
+        index.validate("MSFTT")
+    with pytest.raises(ValueError, match="not a valid stock symbol"):
+        index.validate("DROP TABLE")
+
+
+def test_validate_before_load_only_rejects_remembered_symbols():
+    """Test that an unloaded index accepts symbols unless the provider reported them unknown."""
+    index = SymbolIndex()
+
+    assert index.validate("ZZZZ") == "ZZZZ"
+    index.remember_unknown("ZZZZ")
+    with pytest.raises(ValueError, match="Unknown stock symbol 'ZZZZ'"):
+        index.validate("ZZZZ")
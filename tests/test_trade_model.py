@@ -0,0 +1,124 @@
+import time
+
+import pytest
+
+from stockapp.db import db
+from stockapp.models import trade_model
+from stockapp.models.account_model import Accounts
+from stockapp.models.portfolio_model import PortfolioModel
+from stockapp.models.stock_model import Stocks
+from stockapp.models.trade_model import TradeSnapshots, Trades
+
+
+def quote(price):
+    return {"symbol": "AAPL", "price": price, "fetched_at": time.time()}
+
+
+@pytest.fixture
+def traded(app):
+    portfolio = PortfolioModel(user_id=1)
+    portfolio.deposit_cash(1000)
+    portfolio.buy_stock("AAPL", 4, quote(100.0))
+    portfolio.sell_stock("AAPL", 1, quote(120.0))
+    portfolio.withdraw_cash(20)
+    return portfolio
+
+
+def test_every_change_is_recorded_in_the_ledger(traded):
+    entries = Trades.get_after(1)
+
+    assert [(e.kind, e.symbol, e.shares, e.cash_change_cents) for e in entries] == [
+        ("deposit", None, 0, 100_000),
+        ("buy", "AAPL", 4, -40_000),
+        ("sell", "AAPL", 1, 12_000),
+        ("withdrawal", None, 0, -2_000),
+    ]
+    assert entries[1].to_dict()["price"] == 100.0
+    assert entries[1].to_dict()["cash_change"] == -400.0
+    assert [e.id for e in Trades.get_entries(1, limit=2)] == [entries[3].id, entries[2].id]
+
+
+def test_failed_trade_leaves_no_ledger_entry(traded):
+    with pytest.raises(ValueError):
+        traded.sell_stock("AAPL", 10, quote(120.0))
+
+    assert len(Trades.get_after(1)) == 4
+
+
+def test_ledger_entries_cannot_be_changed(traded):
+    entry = Trades.get_after(1)[0]
+    entry.cash_change_cents = 1
+
+    with pytest.raises(ValueError, match="cannot be changed"):
+        db.session.commit()
+    db.session.rollback()
+
+
+def test_replay_matches_projections(traded):
+    state, _ = trade_model.ledger_state(1)
+    position = Stocks.get_position("AAPL", 1)
+
+    assert state["cash_cents"] == traded.cash_cents == 70_000
+    assert state["original_cash_cents"] == 100_000
+    assert state["positions"] == {"AAPL": {"shares": position.number_shares, "total_cost_cents": position.total_cost_cents}}
+
+
+def test_partial_sell_at_a_gain_keeps_the_average_cost(app):
+    portfolio = PortfolioModel(user_id=1)
+    portfolio.deposit_cash(1000)
+    portfolio.buy_stock("AAPL", 2, quote(100.0))
+    portfolio.sell_stock("AAPL", 1, quote(300.0))
+
+    assert portfolio.holdings["AAPL"] == {"shares": 1, "total_cost_cents": 10_000}
+    portfolio.apply_prices({"AAPL": 300.0})
+    assert portfolio.view_portfolio(portfolio.prices)["portfolio"][0]["buy_price"] == 100.0
+    valuation = portfolio.get_valuation()
+    assert valuation["cost_basis"] == 100.0
+    assert valuation["unrealized_pnl"] == 200.0
+
+    state, _ = trade_model.ledger_state(1)
+    assert state["positions"] == {"AAPL": {"shares": 1, "total_cost_cents": 10_000}}
+
+
+def test_rebuild_replays_only_entries_after_the_snapshot(traded, mocker):
+    assert trade_model.take_snapshot(1) is True
+    assert trade_model.take_snapshot(1) is False
+    traded.buy_stock("AAPL", 1, quote(80.0))
+    snapshot_id = TradeSnapshots.latest(1).trade_id
+
+    Stocks.query.delete()
+    db.session.get(Accounts, 1).cash_cents = 0
+    db.session.commit()
+    get_after = mocker.spy(Trades, "get_after")
+
+    trade_model.rebuild_projections(1)
+
+    assert get_after.call_args_list[0].args == (1, snapshot_id)
+    rebuilt = PortfolioModel.load(1)
+    assert rebuilt.cash_balance == 620.0
+    assert rebuilt.holdings["AAPL"]["shares"] == 4
+    assert rebuilt.holdings["AAPL"]["total_cost_cents"] == 40_000 - 10_000 + 8_000
+
+
+def test_closed_positions_stay_closed_after_rebuild(traded):
+    assert trade_model.close_positions() == 1
+    Stocks.query.delete()
+    db.session.commit()
+
+    state = trade_model.rebuild_projections(1)
+
+    assert state["positions"] == {}
+    assert state["cash_cents"] == 70_000
+    assert Trades.get_entries(1, limit=1)[0].kind == "reset"
+
+def test_purge_users_keeps_the_shared_ledger(traded):
+    trade_model.take_snapshot(1)
+    shared = Trades(user_id=None, kind="deposit", cash_change_cents=100)
+    db.session.add(shared)
+    db.session.commit()
+
+    assert trade_model.purge_users() == 4
+    db.session.commit()
+
+    assert Trades.query.all() == [shared]
+    assert TradeSnapshots.query.count() == 0